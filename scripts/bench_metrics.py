@@ -0,0 +1,62 @@
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root / "src"))
+
+from hw4_tourguide.tools.metrics_collector import MetricsCollector, ShardedMetricsCollector
+
+
+def run(cls, threads: int, ops: int, path: Path) -> float:
+    """Return recording operations per second for `threads` threads doing `ops` calls each."""
+    MetricsCollector.reset()
+    metrics = cls(path=str(path), update_interval=3600)
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index: int) -> None:
+        barrier.wait()
+        for i in range(ops):
+            metrics.increment_counter("api_calls.youtube")
+            metrics.record_latency("agent.video.search_ms", float(i % 500))
+            metrics.set_gauge("queue.depth", index)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    snapshot = metrics.get_all()
+    assert snapshot["counters"]["api_calls.youtube"] == threads * ops
+    MetricsCollector.reset()
+    return threads * ops * 3 / elapsed
+
+
+def main() -> int:
+    """
+    Microbenchmark: global-lock MetricsCollector vs per-thread ShardedMetricsCollector
+    under many recording threads.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark metrics recording under thread contention.")
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--ops", type=int, default=5000, help="Recording rounds per thread (3 calls each)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = Path("/tmp/bench_metrics.json")
+    results = {}
+    for cls in (MetricsCollector, ShardedMetricsCollector):
+        results[cls.__name__] = max(run(cls, args.threads, args.ops, path) for _ in range(args.repeat))
+        print(f"{cls.__name__:<26} {results[cls.__name__]:>12,.0f} ops/s  ({args.threads} threads)")
+    speedup = results["ShardedMetricsCollector"] / results["MetricsCollector"]
+    print(f"speedup: {speedup:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
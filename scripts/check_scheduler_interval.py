@@ -42,7 +42,7 @@ def check_scheduler_interval(log_file_path: Path, config_file_path: Path = Path(
 
     # Regex to capture timestamp and step number for scheduler EMIT events
     # Example: 2025-12-01 16:10:36,155 | INFO | hw4_tourguide.scheduler | Scheduler_Emit | Scheduler_Emit | Step 1/4: Boston Common | ...
-    log_pattern = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) \| .*?Step (\d+)/\d+:.*")
+    log_pattern = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) \| .*?Step (\d+)/(?:\d+|\?):.*")
     
     timestamps = []
     
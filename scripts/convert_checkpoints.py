@@ -0,0 +1,37 @@
+import argparse
+import sys
+from pathlib import Path
+
+from hw4_tourguide.checkpoint_store import SegmentCheckpointBackend, directory_to_segment, segment_to_directory
+
+
+def main() -> int:
+    """
+    Convert checkpoints between the one-file-per-stage directory layout and the
+    append-only segment layout (checkpoints/<tid>/checkpoints.seg).
+    """
+    parser = argparse.ArgumentParser(description="Convert checkpoints between directory and segment layouts.")
+    parser.add_argument("direction", choices=["to-segment", "to-directory"])
+    parser.add_argument("checkpoint_dir", type=Path, help="Checkpoint root (e.g. output/<run>/checkpoints)")
+    parser.add_argument("transaction_id", help="Transaction ID (sub-directory of checkpoint_dir)")
+    parser.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none",
+                        help="Record compression when writing a segment (default: none)")
+    parser.add_argument("--remove", action="store_true",
+                        help="to-segment: delete the JSON files after they are appended")
+    parser.add_argument("--out", type=Path, default=None,
+                        help="to-directory: output root (default: checkpoint_dir)")
+    args = parser.parse_args()
+
+    backend = SegmentCheckpointBackend(base_dir=args.checkpoint_dir, compression=args.compression)
+    if args.direction == "to-segment":
+        count = directory_to_segment(args.checkpoint_dir, args.transaction_id, backend, remove=args.remove)
+        print(f"Appended {count} checkpoints to {backend.segment_path(args.transaction_id)}")
+    else:
+        out_dir = args.out or args.checkpoint_dir
+        count = segment_to_directory(backend, args.transaction_id, out_dir)
+        print(f"Wrote {count} checkpoints to {out_dir / args.transaction_id}")
+    return 0 if count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,23 +4,25 @@ Runs the full multi-agent, multi-threaded tour-guide system.
 """
 
 import argparse
+import json
 import sys
 import re
+import uuid
 from datetime import datetime
 from pathlib import Path
 from queue import Queue
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from hw4_tourguide import __version__
 from hw4_tourguide.config_loader import ConfigLoader
-from hw4_tourguide.logger import setup_logging, get_logger
+from hw4_tourguide.logger import flush_logging, get_logger, logging_stats, setup_logging
 from hw4_tourguide.stub_route_provider import StubRouteProvider
 from hw4_tourguide.route_provider import CachedRouteProvider, GoogleMapsProvider
 from hw4_tourguide.scheduler import Scheduler
 from hw4_tourguide.stub_agents import VideoStubAgent, SongStubAgent, KnowledgeStubAgent
 from hw4_tourguide.judge import JudgeAgent
 from hw4_tourguide.orchestrator import Orchestrator
-from hw4_tourguide.output_writer import OutputWriter
+from hw4_tourguide.output_writer import OutputWriter, StepStreamWriter
 from hw4_tourguide.agents.video_agent import VideoAgent
 from hw4_tourguide.agents.song_agent import SongAgent
 from hw4_tourguide.agents.knowledge_agent import KnowledgeAgent
@@ -29,8 +31,24 @@ from hw4_tourguide.tools.spotify_client import SpotifyClient
 from hw4_tourguide.tools.wikipedia_client import WikipediaClient, DuckDuckGoClient
 from hw4_tourguide.tools.circuit_breaker import CircuitBreaker
 from hw4_tourguide.tools.metrics_collector import MetricsCollector
+from hw4_tourguide.tools.metrics_registry import METRICS_REGISTRY
+from hw4_tourguide.tools.openmetrics import OpenMetricsExporter
+from hw4_tourguide import tracing
+from hw4_tourguide.tracing import Tracer
 from hw4_tourguide.tools.llm_client import llm_factory
-from hw4_tourguide.file_interface import CheckpointWriter
+from hw4_tourguide.tools.quota_ledger import QuotaLedger
+from hw4_tourguide.tools.response_cache import ResponseCache
+from hw4_tourguide.tools.spatial_store import SpatialStore
+from hw4_tourguide.tools.geocode_cache import GeocodeCache
+from hw4_tourguide.enrichment_cache import EnrichmentCache
+from hw4_tourguide.route_corpus import RouteCorpus
+from hw4_tourguide.task_planner import TaskPlanner
+from hw4_tourguide.replay import ReplayEngine, find_checkpoint_dir
+from hw4_tourguide.judge_eval import DEFAULT_WEIGHTS, evaluate_corpus
+from hw4_tourguide.critical_path import analyze_run
+from hw4_tourguide.tools.single_flight import SingleFlight
+from hw4_tourguide.file_interface import AsyncCheckpointWriter, CheckpointWriter
+from hw4_tourguide.checkpoint_store import SegmentCheckpointBackend
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -54,6 +72,15 @@ Output & logs:
 Cached vs live:
   - cached mode: uses data/routes/*.json (demo_boston_mit.json ships with repo)
   - live mode: requires GOOGLE_MAPS_API_KEY in .env (Directions + Geocoding APIs)
+
+Replay (re-judge a recorded run from its checkpoints, no agent API calls):
+  python -m hw4_tourguide replay <transaction_id> [--scoring-mode heuristic] [--weights presence=0.2,quality=0.3,relevance=0.5]
+
+Offline judge evaluation over every recorded run (heuristic scoring, process pool):
+  python -m hw4_tourguide evaluate-judge output/ --variant current --variant relevance_heavy:presence=0.2,quality=0.2,relevance=0.6
+
+Critical-path analysis of a run (per-step bottlenecks, top p95 contributors, JSON):
+  python -m hw4_tourguide analyze output/<run_dir> [--output critical_path.json]
         """,
     )
 
@@ -138,6 +165,13 @@ def run_pipeline(config: Dict[str, Any], args: argparse.Namespace, config_loader
         run_base_dir = output_path.parent # This is the custom base directory
         final_output_base_message = str(output_path) # For logging info message, show the user's explicit path
 
+    metrics = None
+    metrics_exporter = None
+    tracer = None
+    route_span = None
+    span_token = None
+    pipeline_error: Optional[str] = None
+
     # All pipeline logic moved here
     try:
         # ALWAYS set up logging to use run_base_dir as its anchor
@@ -151,6 +185,8 @@ def run_pipeline(config: Dict[str, Any], args: argparse.Namespace, config_loader
         metrics_full_path = run_base_dir / "logs" / metrics_filename
         metrics_full_path.parent.mkdir(parents=True, exist_ok=True) # Ensure the logs dir exists for metrics
         config["metrics"]["file"] = str(metrics_full_path)
+        timeseries_name = config.get("metrics", {}).get("timeseries_file", "")
+        timeseries_path = str(metrics_full_path.parent / Path(timeseries_name).name) if timeseries_name else None
 
         if use_run_specific_dir:
             logger.info(
@@ -163,20 +199,32 @@ def run_pipeline(config: Dict[str, Any], args: argparse.Namespace, config_loader
                 extra={"event_tag": "Setup"}
             )
             
-        metrics = MetricsCollector( # MetricsCollector initialization needs to be here
+        # One collector per run, so repeated runs in one process never share counters or files.
+        # Keyed by a uuid: two runs can share a run directory name (same second, custom --output).
+        metrics = METRICS_REGISTRY.create( # MetricsCollector initialization needs to be here
+            uuid.uuid4().hex,
+            label=run_base_dir.name or str(run_base_dir),
+            sharded=bool(config.get("metrics", {}).get("sharded", True)),
             path=config.get("metrics", {}).get("file", "logs/metrics.json"),
             update_interval=float(config.get("metrics", {}).get("update_interval", 5.0)),
+            reservoir_size=int(config.get("metrics", {}).get("reservoir_size", 0)),
+            timeseries_path=timeseries_path,
         ) if config.get("metrics", {}).get("enabled", True) else None
 
-        checkpoint_writer = CheckpointWriter(
-            base_dir=run_base_dir / "checkpoints",
-            retention_days=config["output"].get("checkpoint_retention_days", 7),
-        )
+        metrics_exporter = _build_metrics_exporter(config, metrics, run_base_dir)
+        checkpoint_writer = _build_checkpoint_writer(config, run_base_dir / "checkpoints", metrics)
+        quota_ledger = _build_quota_ledger(config, metrics)
+        response_cache = _build_response_cache(config, metrics)
+
+        tracer = _build_tracer(config)
+        route_span = tracer.start_span("route", origin=args.origin, destination=args.destination, mode=mode) if tracer else None
+        span_token = tracing.activate(route_span) if route_span else None
 
         # 4. Set up Route Provider
         route_provider = _select_route_provider(config, mode, config_loader, run_base_dir / "checkpoints", metrics)
         try:
-            route_payload = route_provider.get_route(args.origin, args.destination)
+            with tracing.span("route_provider", provider=type(route_provider).__name__):
+                route_payload = route_provider.get_route(args.origin, args.destination)
         except FileNotFoundError:
             logger.warning(
                 f"No cached route found for '{args.origin}' to '{args.destination}'. Falling back to stub provider.",
@@ -184,28 +232,38 @@ def run_pipeline(config: Dict[str, Any], args: argparse.Namespace, config_loader
             )
             route_payload = StubRouteProvider().get_route(args.origin, args.destination)
 
-        # 5. Initialize Scheduler
+        # 5. Plan (coalesce repeated locations) and initialize Scheduler
+        task_planner = _build_task_planner(config, metrics)
         tasks = route_payload.get("tasks", [])
+        if task_planner:
+            tasks = task_planner.plan(tasks)
         task_queue: Queue = Queue()
         scheduler = Scheduler(
             tasks=tasks,
             interval=config["scheduler"]["interval"],
             queue=task_queue,
-            checkpoints_enabled=config["output"].get("checkpoints_enabled", True),
+            # Scheduler queue snapshot duplicates the route; only kept at level "full"
+            checkpoints_enabled=_checkpoint_level(config) == "full",
             checkpoint_dir=run_base_dir / "checkpoints",
             metrics=metrics,
         )
 
         # 6. Build Agents and Judge
-        agents = _build_agents(config_loader, config, metrics, checkpoint_writer, mode)
+        agents = _build_agents(config_loader, config, metrics, checkpoint_writer, mode, quota_ledger=quota_ledger, response_cache=response_cache)
         judge = JudgeAgent(
             config=config.get("judge", {}),
             logger=get_logger("judge"),
             metrics_collector=metrics,
             secrets_fn=config_loader.get_secret,
+            quota_ledger=quota_ledger,
         )
 
         # 7. Initialize Orchestrator
+        enrichment_cache = _build_enrichment_cache(config, agents, metrics)
+        long_cfg = config["route_provider"].get("long_route", {})
+        step_stream = (
+            StepStreamWriter(run_base_dir / "steps.jsonl") if long_cfg.get("enabled", False) else None
+        )
         orchestrator = Orchestrator(
             queue=task_queue,
             agents=agents,
@@ -213,12 +271,29 @@ def run_pipeline(config: Dict[str, Any], args: argparse.Namespace, config_loader
             max_workers=config["orchestrator"]["max_workers"],
             checkpoint_writer=checkpoint_writer,
             metrics=metrics,
+            enrichment_cache=enrichment_cache,
+            max_in_flight=long_cfg.get("window_size", 10) if step_stream else None,
+            on_result=step_stream.write if step_stream else None,
         )
 
         # 8. Run pipeline
         scheduler.start()
         logger.info("Scheduler started, pipeline running...", extra={"event_tag": "Scheduler"})
         results = orchestrator.run()
+        if step_stream:
+            # Streamed steps stay on disk; the output writers iterate steps.jsonl lazily.
+            # Long routes are never coalesced, so there is nothing to expand.
+            results = step_stream
+        elif task_planner:
+            results = task_planner.expand(results)
+        if route_span:
+            if step_stream:
+                step_count, tid = step_stream.count, route_payload.get("metadata", {}).get("transaction_id")
+            else:
+                step_count, tid = len(results), results[0].get("transaction_id") if results else None
+            route_span.set(steps=step_count, transaction_id=tid)
+            _finish_trace(config, tracer, route_span, span_token, run_base_dir / "logs", logger)
+            route_span = span_token = None
 
         # 9. Write output and clean up
         if use_run_specific_dir:
@@ -245,10 +320,35 @@ def run_pipeline(config: Dict[str, Any], args: argparse.Namespace, config_loader
         output_writer.write_json(results)
         output_writer.write_report(results)
         output_writer.write_csv(results)
+
+        if isinstance(checkpoint_writer, AsyncCheckpointWriter):
+            # Flush-on-shutdown: every queued checkpoint reaches disk before exit
+            checkpoint_writer.close()
+
+        if enrichment_cache:
+            enrichment_cache.store.close()
+
+        if response_cache:
+            # Let background stale-while-revalidate refreshes land before shutdown
+            response_cache.close()
+
+        if quota_ledger:
+            logger.info(
+                f"Quota_Summary | {quota_ledger.snapshot()}",
+                extra={"event_tag": "Quota_Summary"},
+            )
+            quota_ledger.close()
         
+        logger.info(
+            f"Checkpoint_Summary | Level: {checkpoint_writer.level} | Bytes Written: {checkpoint_writer.bytes_written}",
+            extra={"event_tag": "Checkpoint", "bytes_written": checkpoint_writer.bytes_written},
+        )
+
+        _report_logging_stats(logger, metrics)
         if metrics:
-            metrics.flush()
-            metrics.stop()
+            METRICS_REGISTRY.retire(metrics.name)
+        if metrics_exporter:
+            metrics_exporter.stop()
 
         if use_run_specific_dir:
             logger.info(
@@ -263,11 +363,46 @@ def run_pipeline(config: Dict[str, Any], args: argparse.Namespace, config_loader
             )
         return 0
     except Exception as e: # Catch any exceptions that occur during pipeline execution
+        pipeline_error = f"{type(e).__name__}: {e}"
         logger.exception("An unexpected error occurred during pipeline execution.")
+        if metrics:
+            METRICS_REGISTRY.retire(metrics.name)
+        if metrics_exporter:
+            metrics_exporter.stop()
         return 1
+    finally:
+        # A failed run still gets a trace: the route span ends with the error
+        if route_span:
+            _finish_trace(config, tracer, route_span, span_token, run_base_dir / "logs", logger, error=pipeline_error)
+        flush_logging()
+
+
+def _report_logging_stats(logger: Any, metrics: Optional[MetricsCollector]) -> None:
+    """Surface records the async logging queue dropped and events sampled out during this run."""
+    stats = logging_stats()
+    if metrics and stats["async"]:
+        metrics.set_gauge("logging.queue_depth", stats["queue_depth"])
+        metrics.increment_counter("logging.dropped", stats["dropped"])
+    if stats["sampled_out"]:
+        logger.info(
+            f"Logging_Sampled | Suppressed per event: {stats['sampled_out']}",
+            extra={"event_tag": "Logging"},
+        )
+    if stats["dropped"]:
+        logger.warning(
+            f"Logging_Dropped | {stats['dropped']} log records dropped (queue full, size={stats['queue_size']})",
+            extra={"event_tag": "Logging", "dropped": stats["dropped"]},
+        )
 
 
 def _select_route_provider(config: Dict[str, Any], mode: str, config_loader: ConfigLoader, checkpoint_dir: Path, metrics: MetricsCollector):
+    corpus_cfg = config["route_provider"].get("corpus", {})
+    long_cfg = config["route_provider"].get("long_route", {})
+    corpus = RouteCorpus(
+        directory=Path(config["route_provider"].get("cache_dir", "data/routes")),
+        fuzzy_threshold=float(corpus_cfg.get("fuzzy_threshold", 0.85)),
+        geo_radius_m=float(corpus_cfg.get("geo_radius_m", 250.0)),
+    )
     if mode == "live":
         key = config_loader.get_secret("GOOGLE_MAPS_API_KEY")
         if key:
@@ -276,9 +411,20 @@ def _select_route_provider(config: Dict[str, Any], mode: str, config_loader: Con
                 retry_attempts=config["route_provider"].get("api_retry_attempts", 3),
                 timeout=config["route_provider"].get("api_timeout", 10.0),
                 max_steps=config["route_provider"].get("max_steps", 8),
-                checkpoints_enabled=config["output"].get("checkpoints_enabled", True),
+                checkpoints_enabled=_checkpoint_level(config) in ("decisions", "full"),
                 checkpoint_dir=checkpoint_dir,
                 metrics=metrics,
+                geocode_cache=_build_geocode_cache(config, metrics),
+                geocode_workers=config["route_provider"].get("geocode_workers", 4),
+                progressive_geocoding=config["route_provider"].get("progressive_geocoding", False),
+                route_corpus=corpus if corpus_cfg.get("enabled", True) else None,
+                corpus_ttl_seconds=float(corpus_cfg.get("ttl_days", 30)) * 86400 or None,
+                long_route=long_cfg.get("enabled", False),
+                sample_every_km=long_cfg.get("sample_every_km", 5.0),
+                sample_every_minutes=long_cfg.get("sample_every_minutes") or None,
+                max_route_points=long_cfg.get("max_points", 500),
+                window_size=long_cfg.get("window_size", 10),
+                sample_all_routes=long_cfg.get("sample_all_routes", False),
             )
         get_logger("route_provider.live").warning(
             "GOOGLE_MAPS_API_KEY missing; falling back to stub route provider",
@@ -288,8 +434,158 @@ def _select_route_provider(config: Dict[str, Any], mode: str, config_loader: Con
     
     return CachedRouteProvider(
         cache_dir=Path(config["route_provider"].get("cache_dir", "data/routes")),
-        checkpoints_enabled=config["output"].get("checkpoints_enabled", True),
+        checkpoints_enabled=_checkpoint_level(config) in ("decisions", "full"),
         checkpoint_dir=checkpoint_dir,
+        corpus=corpus,
+        strict_match=corpus_cfg.get("strict_match", False),
+        fuzzy_match=corpus_cfg.get("fuzzy_match", False),
+    )
+
+
+def _build_geocode_cache(config: Dict[str, Any], metrics: Optional[MetricsCollector]) -> Optional[GeocodeCache]:
+    geo_cfg = config.get("cache", {}).get("geocode", {})
+    if not geo_cfg.get("enabled", True):
+        return None
+    return GeocodeCache(
+        path=Path(geo_cfg.get("path", "data/cache/geocode.sqlite")),
+        radius_m=float(geo_cfg.get("radius_m", 15.0)),
+        max_age_seconds=float(geo_cfg.get("max_age_days", 30)) * 86400,
+        metrics=metrics,
+    )
+
+
+def _build_quota_ledger(config: Dict[str, Any], metrics: Optional[MetricsCollector]) -> Optional[QuotaLedger]:
+    quota_cfg = config.get("quota", {})
+    if not quota_cfg.get("enabled", True):
+        return None
+    return QuotaLedger(
+        path=Path(quota_cfg.get("ledger_file", "data/cache/quota_ledger.sqlite")),
+        daily_budgets=quota_cfg.get("daily_budgets", {}),
+        reserve_fraction=quota_cfg.get("reserve_fraction", 0.1),
+        metrics=metrics,
+    )
+
+
+def _build_response_cache(config: Dict[str, Any], metrics: Optional[MetricsCollector]) -> Optional[ResponseCache]:
+    cache_cfg = config.get("cache", {}).get("responses", {})
+    if not cache_cfg.get("enabled", True):
+        return None
+    return ResponseCache(
+        path=Path(cache_cfg.get("path", "data/cache/responses.sqlite")),
+        ttl_seconds=cache_cfg.get("ttl_seconds", {}),
+        negative_ttl_seconds=float(cache_cfg.get("negative_ttl_seconds", 900)),
+        max_bytes=int(float(cache_cfg.get("max_size_mb", 50)) * 1024 * 1024),
+        stale_while_revalidate=cache_cfg.get("stale_while_revalidate", True),
+        metrics=metrics,
+    )
+
+
+def _checkpoint_level(config: Dict[str, Any]) -> str:
+    """Effective checkpoint level; checkpoints_enabled: false still turns everything off."""
+    output_cfg = config.get("output", {})
+    if not output_cfg.get("checkpoints_enabled", True):
+        return "off"
+    return str(output_cfg.get("checkpoint_level", "full")).lower()
+
+
+def _build_tracer(config: Dict[str, Any]) -> Optional[Tracer]:
+    metrics_cfg = config.get("metrics", {})
+    if not metrics_cfg.get("enabled", True) or not metrics_cfg.get("tracing", {}).get("enabled", True):
+        return None
+    tracing_cfg = metrics_cfg.get("tracing", {})
+    return Tracer(max_spans=int(tracing_cfg.get("max_spans", 100000)))
+
+
+def _finish_trace(
+    config: Dict[str, Any],
+    tracer: Tracer,
+    route_span: Any,
+    span_token: Any,
+    logs_dir: Path,
+    logger: Any,
+    error: Optional[str] = None,
+) -> None:
+    if span_token:
+        tracing.deactivate(span_token)
+    route_span.end(error=error)
+    _write_trace(config, tracer, logs_dir, logger)
+
+
+def _write_trace(config: Dict[str, Any], tracer: Tracer, logs_dir: Path, logger: Any) -> None:
+    fmt = config.get("metrics", {}).get("tracing", {}).get("format", "chrome")
+    try:
+        paths = tracer.write(logs_dir, fmt)
+    except OSError as exc:
+        logger.warning(f"Trace_Write_Failed | Error: {exc}", extra={"event_tag": "Error"})
+        return
+    logger.info(
+        f"Trace_Written | Spans: {len(tracer.spans)} | Dropped: {tracer.dropped} | Files: {', '.join(p.name for p in paths)}",
+        extra={"event_tag": "Trace", "span_count": len(tracer.spans)},
+    )
+
+
+def _build_metrics_exporter(config: Dict[str, Any], metrics: Optional[MetricsCollector], run_base_dir: Path) -> Optional[OpenMetricsExporter]:
+    om_cfg = config.get("metrics", {}).get("openmetrics", {})
+    if not metrics or not om_cfg.get("enabled", False):
+        return None
+    textfile = om_cfg.get("textfile", "logs/metrics.prom")
+    if textfile and not Path(textfile).is_absolute():
+        textfile = run_base_dir / textfile
+    return OpenMetricsExporter(
+        metrics,
+        textfile=Path(textfile) if textfile else None,
+        port=int(om_cfg.get("port", 0)),
+        host=om_cfg.get("host", "127.0.0.1"),
+        interval=float(config.get("metrics", {}).get("update_interval", 5.0)),
+    ).start()
+
+
+def _build_checkpoint_writer(config: Dict[str, Any], base_dir: Path, metrics: Optional[MetricsCollector]) -> CheckpointWriter:
+    output_cfg = config.get("output", {})
+    retention_days = output_cfg.get("checkpoint_retention_days", 7)
+    levels = {"level": _checkpoint_level(config), "full_sample_rate": float(output_cfg.get("checkpoint_sample_rate", 1.0))}
+    backend = None
+    if output_cfg.get("checkpoint_backend", "directory") == "segment":
+        backend = SegmentCheckpointBackend(base_dir=base_dir, compression=output_cfg.get("checkpoint_compression", "none"))
+    async_cfg = output_cfg.get("async_checkpoints", {})
+    if not async_cfg.get("enabled", True):
+        return CheckpointWriter(base_dir=base_dir, retention_days=retention_days, backend=backend, metrics=metrics, **levels)
+    return AsyncCheckpointWriter(
+        base_dir=base_dir,
+        retention_days=retention_days,
+        max_queue=int(async_cfg.get("queue_size", 256)),
+        drop_policy=async_cfg.get("drop_policy", "block"),
+        metrics=metrics,
+        backend=backend,
+        **levels,
+    )
+
+
+def _build_task_planner(config: Dict[str, Any], metrics: Optional[MetricsCollector]) -> Optional[TaskPlanner]:
+    coalesce_cfg = config.get("scheduler", {}).get("coalesce", {})
+    if not coalesce_cfg.get("enabled", False):
+        return None
+    return TaskPlanner(merge_radius_m=float(coalesce_cfg.get("merge_radius_m", 100.0)), metrics=metrics)
+
+
+def _build_enrichment_cache(
+    config: Dict[str, Any], agents: Dict[str, Any], metrics: Optional[MetricsCollector]
+) -> Optional[EnrichmentCache]:
+    enrich_cfg = config.get("cache", {}).get("enrichment", {})
+    if not enrich_cfg.get("enabled", False):
+        return None
+    # Results are only interchangeable between runs with the same agents and scoring rules
+    scoring_mode = str(config.get("judge", {}).get("scoring_mode", "heuristic")).lower()
+    namespace = f"enrichment:{','.join(sorted(agents))}:{scoring_mode}"
+    return EnrichmentCache(
+        store=SpatialStore(
+            path=Path(enrich_cfg.get("path", "data/cache/enrichment.sqlite")),
+            cell_meters=float(enrich_cfg.get("cell_meters", 100.0)),
+        ),
+        namespace=namespace,
+        radius_m=float(enrich_cfg.get("radius_m", 150.0)),
+        max_age_seconds=float(enrich_cfg.get("max_age_hours", 24)) * 3600,
+        metrics=metrics,
     )
 
 
@@ -299,6 +595,8 @@ def _build_agents(
     metrics: MetricsCollector, 
     writer: CheckpointWriter,
     mode: str,
+    quota_ledger: Optional[QuotaLedger] = None,
+    response_cache: Optional[ResponseCache] = None,
 ) -> Dict[str, Any]:
     """
     Build agents using real clients when credentials are present; fall back to stubs otherwise.
@@ -311,6 +609,9 @@ def _build_agents(
     # Song CB will be determined based on active client
     knowledge_cb = CircuitBreaker("knowledge", failure_threshold=cb_fail, timeout=cb_timeout)
 
+    # One coalescer shared by every client: keys are namespaced by provider
+    single_flight = SingleFlight(metrics=metrics) if config.get("cache", {}).get("coalesce_inflight", True) else None
+
     youtube_key = config_loader.get_secret("YOUTUBE_API_KEY")
     spotify_id = config_loader.get_secret("SPOTIFY_CLIENT_ID")
     spotify_secret = config_loader.get_secret("SPOTIFY_CLIENT_SECRET")
@@ -318,6 +619,8 @@ def _build_agents(
     if config["agents"].get("use_llm_for_queries"):
         try:
             llm_client = llm_factory(config["agents"], config_loader.get_secret)
+            llm_client.quota_ledger = quota_ledger
+            llm_client.single_flight = single_flight
         except Exception as exc:  # pragma: no cover - defensive guard
             get_logger("llm").warning(
                 f"LLM client unavailable for agent queries: {exc}; using heuristics",
@@ -351,10 +654,11 @@ def _build_agents(
             video_cfg["use_live"] = False
             video_cfg["mock_mode"] = True
     if youtube_key and video_cfg.get("use_live", True) and not video_cfg.get("mock_mode", False):
-        video_client = YouTubeClient(api_key=youtube_key, timeout=video_cfg.get("timeout", 10.0))
+        video_client = YouTubeClient(api_key=youtube_key, timeout=video_cfg.get("timeout", 10.0), quota_ledger=quota_ledger, single_flight=single_flight, response_cache=response_cache)
         video_agent = VideoAgent(
             config=video_cfg, checkpoint_writer=writer, client=video_client,
             circuit_breaker=video_cb if cb_enabled else None, metrics=metrics, llm_client=llm_client,
+            quota_ledger=quota_ledger,
         )
     else:
         video_agent = VideoStubAgent()
@@ -370,13 +674,16 @@ def _build_agents(
 
     if spotify_id and spotify_secret and song_cfg.get("use_live", True) and not song_cfg.get("mock_mode", False):
         song_client = SpotifyClient(
-            client_id=spotify_id, client_secret=spotify_secret, timeout=song_cfg.get("timeout", 10.0)
+            client_id=spotify_id, client_secret=spotify_secret, timeout=song_cfg.get("timeout", 10.0),
+            quota_ledger=quota_ledger, single_flight=single_flight, response_cache=response_cache,
         )
     
     if youtube_key and song_cfg.get("use_youtube_secondary", True) and not song_cfg.get("mock_mode", False):
-        yt_client = YouTubeClient(api_key=youtube_key, timeout=song_cfg.get("timeout", 10.0))
+        yt_client = YouTubeClient(api_key=youtube_key, timeout=song_cfg.get("timeout", 10.0), quota_ledger=quota_ledger, single_flight=single_flight, response_cache=response_cache)
         
         class _YouTubeSongAdapter:
+            provider_name = "youtube"
+
             def search_tracks(self, query: str, limit: int) -> List[Dict[str, Any]]:
                 vids = yt_client.search_videos(f"{query} song", limit)
                 return [{"id": v["id"], "title": v["title"], "artist": v.get("channel"), "url": v["url"], "source": "youtube"} for v in vids]
@@ -399,6 +706,7 @@ def _build_agents(
         song_agent = SongAgent(
             config=song_cfg, checkpoint_writer=writer, client=song_client, secondary_client=secondary_song_client,
             circuit_breaker=current_song_cb if cb_enabled else None, metrics=metrics, llm_client=llm_client,
+            quota_ledger=quota_ledger,
         )
     else:
         song_agent = SongStubAgent()
@@ -412,9 +720,10 @@ def _build_agents(
     if knowledge_cfg.get("use_live", True) and not knowledge_cfg.get("mock_mode", False):
         knowledge_agent = KnowledgeAgent(
             config=knowledge_cfg, checkpoint_writer=writer,
-            client=WikipediaClient(timeout=knowledge_cfg.get("timeout", 10.0)),
-            secondary_client=DuckDuckGoClient(timeout=knowledge_cfg.get("timeout", 10.0)),
+            client=WikipediaClient(timeout=knowledge_cfg.get("timeout", 10.0), quota_ledger=quota_ledger, single_flight=single_flight, response_cache=response_cache),
+            secondary_client=DuckDuckGoClient(timeout=knowledge_cfg.get("timeout", 10.0), quota_ledger=quota_ledger, single_flight=single_flight, response_cache=response_cache),
             circuit_breaker=knowledge_cb if cb_enabled else None, metrics=metrics, llm_client=llm_client,
+            quota_ledger=quota_ledger,
         )
     else:
         knowledge_agent = KnowledgeStubAgent()
@@ -422,7 +731,186 @@ def _build_agents(
     return {"video": video_agent, "song": song_agent, "knowledge": knowledge_agent}
 
 
+def create_replay_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="hw4_tourguide replay",
+        description="Re-run judging and outputs for a recorded run from its checkpoints (no agent API calls).",
+    )
+    parser.add_argument("transaction_id", help="Transaction ID of the run to replay")
+    parser.add_argument(
+        "--checkpoints",
+        type=Path,
+        default=None,
+        help="Checkpoint root containing <transaction_id>/ (default: search under output.base_dir)",
+    )
+    parser.add_argument("--config", type=Path, default=Path("config/settings.yaml"), help="Path to YAML configuration file")
+    parser.add_argument(
+        "--scoring-mode",
+        choices=["heuristic", "llm", "hybrid"],
+        default="heuristic",
+        help="Judge scoring mode for the replay (default: heuristic; llm/hybrid call the LLM)",
+    )
+    parser.add_argument(
+        "--weights",
+        type=str,
+        default=None,
+        help="Heuristic weights override, e.g. presence=0.2,quality=0.3,relevance=0.5 (omitted keys keep judge.heuristic_weights)",
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Steps judged in parallel (default: 8)")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Output directory (default: <run dir>/replay_<timestamp>)",
+    )
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO")
+    return parser
+
+
+def _parse_weights(text: Optional[str]) -> Optional[Dict[str, float]]:
+    if not text:
+        return None
+    weights: Dict[str, float] = {}
+    for part in text.split(","):
+        key, _, value = part.partition("=")
+        if key.strip() not in ("presence", "quality", "relevance") or not value:
+            raise ValueError(f"Invalid weight '{part}' (expected presence|quality|relevance=<float>)")
+        weights[key.strip()] = float(value)
+    return weights
+
+
+def replay_main(argv: List[str]) -> int:
+    args = create_replay_parser().parse_args(argv)
+    try:
+        config_loader = ConfigLoader(config_path=args.config, cli_overrides={"logging.level": args.log_level})
+        config = config_loader.get_all()
+        checkpoint_dir = args.checkpoints or find_checkpoint_dir(
+            args.transaction_id, Path(config["output"].get("base_dir", "output"))
+        )
+        if checkpoint_dir is None or not (Path(checkpoint_dir) / args.transaction_id).is_dir():
+            print(f"ERROR: No checkpoints found for transaction '{args.transaction_id}'", file=sys.stderr)
+            return 1
+        checkpoint_dir = Path(checkpoint_dir)
+        out_dir = args.output or checkpoint_dir.parent / f"replay_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+        setup_logging(config.get("logging", {}), reset_existing=True, log_base_dir=out_dir)
+        logger = get_logger("main")
+
+        judge_cfg = dict(config.get("judge", {}))
+        judge_cfg["scoring_mode"] = args.scoring_mode
+        if args.scoring_mode == "heuristic":
+            judge_cfg["use_llm"] = False
+            judge_cfg.pop("llm_scoring", None)
+        weights = _parse_weights(args.weights)
+        if weights:
+            # Override only the given keys; the rest come from config, as in evaluate_main
+            judge_cfg["heuristic_weights"] = {**DEFAULT_WEIGHTS, **judge_cfg.get("heuristic_weights", {}), **weights}
+        judge = JudgeAgent(config=judge_cfg, logger=get_logger("judge"), secrets_fn=config_loader.get_secret)
+
+        # Read-only: the writer is only used for read/list (directory or segment layout)
+        output_cfg = config.get("output", {})
+        backend = None
+        if (checkpoint_dir / args.transaction_id / "checkpoints.seg").exists():
+            backend = SegmentCheckpointBackend(base_dir=checkpoint_dir, compression=output_cfg.get("checkpoint_compression", "none"))
+        reader = CheckpointWriter(base_dir=checkpoint_dir, retention_days=0, backend=backend)
+        results = ReplayEngine(reader, judge, max_workers=args.workers).run(args.transaction_id)
+
+        output_writer = OutputWriter(
+            json_path=out_dir / Path(output_cfg.get("json_file", "output/final_route.json")).name,
+            report_path=out_dir / Path(output_cfg.get("markdown_file", "output/summary.md")).name,
+            csv_path=out_dir / Path(output_cfg.get("csv_file", "output/tour_export.csv")).name,
+        )
+        output_writer.write_json(results)
+        output_writer.write_report(results)
+        output_writer.write_csv(results)
+        logger.info(
+            f"Replay written | TID: {args.transaction_id} | Steps: {len(results)} | Output: {out_dir}",
+            extra={"event_tag": "Replay", "run_directory": str(out_dir)},
+        )
+        print(f"Replayed {len(results)} steps for {args.transaction_id} -> {out_dir}")
+        return 0
+    except (FileNotFoundError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+
+def create_evaluate_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="hw4_tourguide evaluate-judge",
+        description="Re-score historical steps with judge heuristic weight variants and report agreement statistics.",
+    )
+    parser.add_argument("root", type=Path, nargs="?", default=None, help="Corpus root (default: output.base_dir)")
+    parser.add_argument(
+        "--variant",
+        action="append",
+        default=None,
+        help='Weight variant "name" (configured weights) or "name:presence=0.2,quality=0.3,relevance=0.5"; repeatable',
+    )
+    parser.add_argument("--config", type=Path, default=Path("config/settings.yaml"), help="Path to YAML configuration file")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Steps per worker task (default: 200)")
+    parser.add_argument("--output", type=Path, default=None, help="Also write the JSON report to this path")
+    return parser
+
+
+def evaluate_main(argv: List[str]) -> int:
+    args = create_evaluate_parser().parse_args(argv)
+    try:
+        config = ConfigLoader(config_path=args.config).get_all()
+        configured = {**DEFAULT_WEIGHTS, **config.get("judge", {}).get("heuristic_weights", {})}
+        variants: Dict[str, Dict[str, float]] = {}
+        for spec in args.variant or ["configured"]:
+            name, _, weights = spec.partition(":")
+            variants[name] = {**configured, **(_parse_weights(weights) or {})}
+        root = args.root or Path(config["output"].get("base_dir", "output"))
+        json_name = Path(config["output"].get("json_file", "output/final_route.json")).name
+        report = evaluate_corpus(
+            root, variants=variants, processes=args.processes, chunk_size=args.chunk_size,
+            json_names=tuple({json_name, "final_route.json"}),
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+    print(text)
+    return 0 if report["steps"] else 1
+
+
+def create_analyze_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="hw4_tourguide analyze",
+        description="Per-step critical path and route-level bottlenecks of a recorded run (from its trace or logs).",
+    )
+    parser.add_argument("run_dir", type=Path, help="Run directory (contains logs/trace.json or logs/system.log)")
+    parser.add_argument("--top", type=int, default=10, help="Number of p95 contributors to report (default: 10)")
+    parser.add_argument("--output", type=Path, default=None, help="Also write the JSON report to this path")
+    return parser
+
+
+def analyze_main(argv: List[str]) -> int:
+    args = create_analyze_parser().parse_args(argv)
+    try:
+        report = analyze_run(args.run_dir, top=args.top)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+    print(text)
+    return 0
+
+
 def main() -> int:
+    if len(sys.argv) > 1 and sys.argv[1] == "replay":
+        return replay_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "evaluate-judge":
+        return evaluate_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "analyze":
+        return analyze_main(sys.argv[2:])
     parser = create_parser()
     args = parser.parse_args()
 
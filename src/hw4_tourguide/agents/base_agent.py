@@ -4,15 +4,18 @@ Concrete agents override `search` and `fetch`.
 """
 
 import json
+import logging
 import time
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Callable
 
-from hw4_tourguide.logger import get_logger
+from hw4_tourguide import tracing
+from hw4_tourguide.logger import get_logger, log_event
 from hw4_tourguide.file_interface import CheckpointWriter
 from hw4_tourguide.tools.circuit_breaker import CircuitBreaker, CircuitBreakerOpenError
 from hw4_tourguide.tools.metrics_collector import MetricsCollector
 from hw4_tourguide.tools.llm_client import LLMClient, LLMError
+from hw4_tourguide.tools.quota_ledger import QuotaExceededError, QuotaLedger
 from hw4_tourguide.tools.prompt_loader import load_prompt_with_context
 
 
@@ -28,6 +31,7 @@ class BaseAgent:
         mock_mode: bool = False,
         sleep_fn: Callable[[float], None] = time.sleep,
         llm_client: Optional[LLMClient] = None,
+        quota_ledger: Optional[QuotaLedger] = None,
    ) -> None:
         self.config = config
         self.checkpoint_writer = checkpoint_writer
@@ -37,6 +41,7 @@ class BaseAgent:
         self.sleep_fn = sleep_fn
         self.logger = get_logger(f"agent.{self.agent_type}")
         self.llm_client = llm_client
+        self.quota_ledger = quota_ledger
         # cache task context for ranking hooks
         self._task_context: Dict[str, Any] = {}
         self._queries: List[str] = []
@@ -53,51 +58,88 @@ class BaseAgent:
 
     # --- Public entrypoint ---
     def run(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        with tracing.span("agent", agent=self.agent_type, step=task.get("step_number")) as agent_span:
+            result = self._run(task)
+            if agent_span:
+                agent_span.set(status=result.get("status"))
+            return result
+
+    def _run(self, task: Dict[str, Any]) -> Dict[str, Any]:
         run_start = time.time()
         tid = task.get("transaction_id", "unknown_tid")
         step = task.get("step_number", "?")
 
         # Log input details
-        self.logger.info(
-            f"Agent_Input | TID: {tid} | Step {step} | Location: {task.get('location_name', 'N/A')} | "
-            f"Search Hint: {task.get('search_hint', 'N/A')[:50]} | Route Context: {task.get('route_context', 'N/A')[:30]}",
-            extra={"event_tag": "Agent_Input", "transaction_id": tid, "step": step}
+        log_event(
+            self.logger, logging.INFO, "Agent_Input",
+            "TID: {transaction_id} | Step {step} | Location: {location} | "
+            "Search Hint: {search_hint:.50} | Route Context: {route_context:.30}",
+            transaction_id=tid, step=step, location=task.get("location_name", "N/A"),
+            search_hint=task.get("search_hint", "N/A"), route_context=task.get("route_context", "N/A"),
         )
 
+        # Consult the daily quota ledger before spending any API/LLM budget
+        quota_mode = self._quota_mode()
+        if quota_mode == QuotaLedger.EXHAUSTED:
+            log_event(
+                self.logger, logging.WARNING, "Agent_QuotaExhausted",
+                "TID: {transaction_id} | Step {step} | Provider: {provider} | Skipping live search",
+                transaction_id=tid, step=step, provider=self.quota_provider,
+            )
+            self._increment_counter(f"quota_degraded.{self.agent_type}")
+            return self._result_unavailable(task, reason=f"Daily {self.quota_provider} quota exhausted")
+
         self._task_context = task
-        self._queries = self._build_queries(task)
+        with tracing.span("query_gen", agent=self.agent_type) as query_span:
+            self._queries = self._build_queries(task)
+            if query_span:
+                query_span.set(query_count=len(self._queries))
+        if quota_mode == QuotaLedger.REDUCED and len(self._queries) > 1:
+            # Inside the reserve: keep only the most specific query
+            log_event(
+                self.logger, logging.INFO, "Agent_QuotaReduced",
+                "TID: {transaction_id} | Step {step} | Provider: {provider} | Queries: {query_count} -> 1",
+                transaction_id=tid, step=step, provider=self.quota_provider, query_count=len(self._queries),
+            )
+            self._queries = self._queries[:1]
 
         # Log query generation
         query_mode = "LLM" if (self.config.get("use_llm_for_queries") and self.llm_client) else "Heuristic"
-        self.logger.info(
-            f"Agent_Queries | TID: {tid} | Mode: {query_mode} | Count: {len(self._queries)} | Queries: {self._queries}",
-            extra={"event_tag": "Agent_Queries", "query_mode": query_mode, "query_count": len(self._queries)}
+        log_event(
+            self.logger, logging.INFO, "Agent_Queries",
+            "TID: {transaction_id} | Mode: {query_mode} | Count: {query_count} | Queries: {queries}",
+            transaction_id=tid, query_mode=query_mode, query_count=len(self._queries), queries=self._queries,
         )
 
         search_candidates_map: Dict[str, Any] = {}
         for idx, query in enumerate(self._queries, 1):
             # Note: self.search is a hook implemented by concrete agent subclasses
             if self._exceeds_search_cap():
-                self.logger.warning(
-                    f"Agent_SearchCap | TID: {tid} | {self.agent_type.title()} search cap reached at query {idx}/{len(self._queries)}",
-                    extra={"event_tag": "Agent_SearchCap"},
+                log_event(
+                    self.logger, logging.WARNING, "Agent_SearchCap",
+                    "TID: {transaction_id} | {agent} search cap reached at query {query_index}/{query_count}",
+                    transaction_id=tid, agent=self.agent_type.title(), query_index=idx, query_count=len(self._queries),
                 )
                 break
 
             search_start = time.time()
-            candidates = self._with_retries(
-                "search",
-                lambda step_number=None, q=query: self.search(q, task, step_number=step_number),
-                task_context=task # Pass task context
-            )
+            with tracing.span("search", agent=self.agent_type, query_index=idx) as search_span:
+                candidates = self._with_retries(
+                    "search",
+                    lambda step_number=None, q=query: self.search(q, task, step_number=step_number),
+                    task_context=task # Pass task context
+                )
+                if search_span:
+                    search_span.set(candidates=len(candidates) if candidates else 0)
             search_time_ms = (time.time() - search_start) * 1000
 
             # Log search results
-            cand_count = len(candidates) if candidates else 0
-            self.logger.info(
-                f"Agent_Search | TID: {tid} | Query {idx}/{len(self._queries)}: \"{query[:60]}\" | "
-                f"Found: {cand_count} candidates | Time: {search_time_ms:.0f}ms",
-                extra={"event_tag": "Agent_Search", "candidates_found": cand_count, "search_time_ms": search_time_ms}
+            log_event(
+                self.logger, logging.INFO, "Agent_Search",
+                "TID: {transaction_id} | Query {query_index}/{query_count}: \"{query:.60}\" | "
+                "Found: {candidates_found} candidates | Time: {search_time_ms:.0f}ms",
+                transaction_id=tid, query_index=idx, query_count=len(self._queries), query=query,
+                candidates_found=len(candidates) if candidates else 0, search_time_ms=search_time_ms,
             )
 
             if candidates:
@@ -113,9 +155,10 @@ class BaseAgent:
         self._write_checkpoint(tid, f"02_agent_search_{self.agent_type}_step_{step}.json", search_candidates)
 
         if search_candidates is None or len(search_candidates) == 0:
-            self.logger.warning(
-                f"Agent_NoResults | TID: {tid} | Step {step} | No candidates found after {len(self._queries)} queries",
-                extra={"event_tag": "Agent_NoResults"}
+            log_event(
+                self.logger, logging.WARNING, "Agent_NoResults",
+                "TID: {transaction_id} | Step {step} | No candidates found after {query_count} queries",
+                transaction_id=tid, step=step, query_count=len(self._queries),
             )
             return self._result_unavailable(
                 task,
@@ -125,33 +168,37 @@ class BaseAgent:
         # Log candidate selection
         selected = self.select_candidate(search_candidates)
         selected_title = selected.get("title", selected.get("name", "unknown"))
-        self.logger.info(
-            f"Agent_Select | TID: {tid} | Selected: \"{selected_title[:60]}\" from {total_unique} candidates",
-            extra={"event_tag": "Agent_Select", "total_candidates": total_unique}
+        log_event(
+            self.logger, logging.INFO, "Agent_Select",
+            "TID: {transaction_id} | Selected: \"{title:.60}\" from {total_candidates} candidates",
+            transaction_id=tid, title=selected_title, total_candidates=total_unique,
         )
 
         # Log fetch attempt
         fetch_start = time.time()
-        fetch_payload = self._with_retries(
-            "fetch",
-            lambda step_number=None: self.fetch(selected, task, step_number=step_number),
-            task_context=task # Pass task context
-        )
+        with tracing.span("fetch", agent=self.agent_type):
+            fetch_payload = self._with_retries(
+                "fetch",
+                lambda step_number=None: self.fetch(selected, task, step_number=step_number),
+                task_context=task # Pass task context
+            )
         fetch_time_ms = (time.time() - fetch_start) * 1000
 
         if fetch_payload is None:
-            self.logger.error(
-                f"Agent_FetchFailed | TID: {tid} | Failed to fetch: \"{selected_title[:60]}\" | Time: {fetch_time_ms:.0f}ms",
-                extra={"event_tag": "Agent_FetchFailed", "fetch_time_ms": fetch_time_ms}
+            log_event(
+                self.logger, logging.ERROR, "Agent_FetchFailed",
+                "TID: {transaction_id} | Failed to fetch: \"{title:.60}\" | Time: {fetch_time_ms:.0f}ms",
+                transaction_id=tid, title=selected_title, fetch_time_ms=fetch_time_ms,
             )
             return self._result_unavailable(
                 task,
                 reason="Failed to fetch candidate",
             )
 
-        self.logger.info(
-            f"Agent_Fetch | TID: {tid} | Success: \"{selected_title[:60]}\" | Time: {fetch_time_ms:.0f}ms",
-            extra={"event_tag": "Agent_Fetch", "fetch_time_ms": fetch_time_ms, "status": "success"}
+        log_event(
+            self.logger, logging.INFO, "Agent_Fetch",
+            "TID: {transaction_id} | Success: \"{title:.60}\" | Time: {fetch_time_ms:.0f}ms",
+            transaction_id=tid, title=selected_title, fetch_time_ms=fetch_time_ms, status="success",
         )
 
         self._write_checkpoint(tid, f"03_agent_fetch_{self.agent_type}_step_{step}.json", fetch_payload)
@@ -169,10 +216,12 @@ class BaseAgent:
 
         # Log completion
         total_time_ms = (time.time() - run_start) * 1000
-        self.logger.info(
-            f"Agent_Complete | TID: {tid} | Status: ok | Total Time: {total_time_ms:.0f}ms | "
-            f"Queries: {len(self._queries)} | Candidates: {total_unique} | Selected: \"{selected_title[:40]}\"",
-            extra={"event_tag": "Agent_Complete", "status": "ok", "total_time_ms": total_time_ms}
+        log_event(
+            self.logger, logging.INFO, "Agent_Complete",
+            "TID: {transaction_id} | Status: {status} | Total Time: {total_time_ms:.0f}ms | "
+            "Queries: {query_count} | Candidates: {total_candidates} | Selected: \"{title:.40}\"",
+            transaction_id=tid, status="ok", total_time_ms=total_time_ms, query_count=len(self._queries),
+            total_candidates=total_unique, title=selected_title,
         )
 
         return result
@@ -381,7 +430,8 @@ class BaseAgent:
         ctx = dict(task)
         ctx.setdefault("search_limit", self.config.get("search_limit"))
         prompt = load_prompt_with_context(self.agent_type, ctx)
-        llm_resp = self.llm_client.query(prompt)
+        with tracing.span("llm", purpose="query_generation", agent=self.agent_type):
+            llm_resp = self.llm_client.query(prompt)
         duration_ms = (time.monotonic() - start) * 1000
         self._record_latency("llm.query_generation_ms", start)
         self._record_latency(f"agent.{self.agent_type}.llm_query_ms", start)
@@ -442,12 +492,11 @@ class BaseAgent:
         )
 
         # DEBUG: Log actual queries generated by LLM
-        queries_str = " | ".join(f'"{q}"' for q in cleaned)
-        step = task.get('step_number', 'unknown')
-        self.logger.info(
-            f"Agent_LLM_Queries | {self.agent_type} | Step {step} | location={task.get('location_name')} | "
-            f"source=LLM | queries=[{queries_str}]",
-            extra={"event_tag": "Agent_LLM_Queries"}
+        log_event(
+            self.logger, logging.INFO, "Agent_LLM_Queries",
+            "{agent} | Step {step} | location={location} | source=LLM | queries={queries}",
+            agent=self.agent_type, step=task.get("step_number", "unknown"),
+            location=task.get("location_name"), queries=cleaned,
         )
 
         return cleaned
@@ -481,6 +530,14 @@ class BaseAgent:
                     extra=log_extra,
                 )
                 return None
+            except QuotaExceededError as exc:
+                # Retrying cannot help until the daily budget resets
+                self.logger.warning(
+                    f"{self.agent_type.title()} {phase} skipped: {exc}",
+                    extra=log_extra,
+                )
+                self._increment_counter(f"quota_degraded.{self.agent_type}")
+                return None
             except Exception as exc:
                 self.logger.warning(
                     f"{self.agent_type.title()} {phase} failed (attempt {attempt+1}/{attempts}): {exc}",
@@ -499,7 +556,7 @@ class BaseAgent:
         return min(timeout, 0.5 * (2 ** attempt))
 
     def _write_checkpoint(self, transaction_id: str, filename: str, payload: Any) -> None:
-        if not self.checkpoint_writer:
+        if not self.checkpoint_writer or not self.checkpoint_writer.should_write(transaction_id, filename):
             return
         try:
             self.checkpoint_writer.write(transaction_id, filename, payload)
@@ -538,6 +595,20 @@ class BaseAgent:
         except Exception:
             pass
 
+    @property
+    def quota_provider(self) -> Optional[str]:
+        """Ledger key of the primary client (e.g. "youtube"); None for stub clients."""
+        return getattr(getattr(self, "client", None), "provider_name", None)
+
+    def _quota_mode(self) -> str:
+        if not self.quota_ledger:
+            return QuotaLedger.NORMAL
+        try:
+            return self.quota_ledger.mode(self.quota_provider)
+        except Exception:
+            # Ledger failures should not block enrichment
+            return QuotaLedger.NORMAL
+
     def _exceeds_search_cap(self) -> bool:
         cap = self.config.get("max_search_calls_per_run")
         if cap is None:
@@ -77,6 +77,7 @@ class KnowledgeAgent(BaseAgent):
         search_tool: Optional[SearchTool] = None,
         fetch_tool: Optional[FetchTool] = None,
         llm_client=None,
+        quota_ledger=None,
     ) -> None:
         self.client = client or _DefaultKnowledgeClient()
         self.secondary_client = secondary_client
@@ -89,6 +90,7 @@ class KnowledgeAgent(BaseAgent):
             circuit_breaker=circuit_breaker,
             mock_mode=mock_mode,
             llm_client=llm_client,
+            quota_ledger=quota_ledger,
         )
 
     def search(self, query: str, task: Dict[str, Any], step_number: Optional[int] = None) -> List[Dict[str, Any]]:
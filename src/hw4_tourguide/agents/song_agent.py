@@ -74,6 +74,7 @@ class SongAgent(BaseAgent):
         search_tool: Optional[SearchTool] = None,
         fetch_tool: Optional[FetchTool] = None,
         llm_client=None,
+        quota_ledger=None,
     ) -> None:
         # Smart client selection: 
         # 1. If primary (Spotify) exists, use it.
@@ -98,6 +99,7 @@ class SongAgent(BaseAgent):
             circuit_breaker=circuit_breaker,
             mock_mode=mock_mode,
             llm_client=llm_client,
+            quota_ledger=quota_ledger,
         )
 
     def search(self, query: str, task: Dict[str, Any], step_number: Optional[int] = None) -> List[Dict[str, Any]]:
@@ -57,6 +57,7 @@ class VideoAgent(BaseAgent):
         search_tool: Optional[SearchTool] = None,
         fetch_tool: Optional[FetchTool] = None,
         llm_client=None,
+        quota_ledger=None,
     ) -> None:
         self.client = client or _DefaultVideoClient()
         self.search_tool = search_tool or SearchTool(timeout=config.get("timeout", 10.0))
@@ -68,6 +69,7 @@ class VideoAgent(BaseAgent):
             circuit_breaker=circuit_breaker,
             mock_mode=mock_mode,
             llm_client=llm_client,
+            quota_ledger=quota_ledger,
         )
 
     def search(self, query: str, task: Dict[str, Any], step_number: Optional[int] = None) -> List[Dict[str, Any]]:
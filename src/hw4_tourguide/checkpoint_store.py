@@ -0,0 +1,203 @@
+"""
+Append-only segment backend for checkpoints.
+
+Instead of one pretty-printed JSON file per stage/step/agent, every
+checkpoint of a transaction is appended as a compact record to a single
+segment file (`<base_dir>/<tid>/checkpoints.seg`). Each record is framed as
+
+    MAGIC(4) | codec(1) | name_len(2) | payload_len(4) | name | payload
+
+where `name` is the stage filename the directory layout would have used
+(e.g. `02_agent_search_video_step_3.json`) and `payload` is compact JSON,
+optionally gzip- or zstd-compressed. A rewrite of the same stage appends a
+new record; the latest one wins.
+
+The index (stage name -> offset/length) is rebuilt by scanning record
+headers only, so opening a segment never decompresses payloads, and is kept
+in memory for random access by stage and step. A corrupt or truncated tail
+left by an interrupted append is ignored on read and cut off before the next
+append, so later records stay readable. zstd needs the optional
+`zstandard` package; without it the backend falls back to gzip.
+
+`directory_to_segment` / `segment_to_directory` convert between this layout
+and the classic one-file-per-stage directory layout.
+"""
+
+import gzip
+import json
+import re
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from hw4_tourguide.logger import get_logger
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+SEGMENT_FILENAME = "checkpoints.seg"
+MAGIC = b"CKP1"
+_HEADER = struct.Struct(">4sBHI")
+CODECS = {"none": 0, "gzip": 1, "zstd": 2}
+_CODEC_NAMES = {v: k for k, v in CODECS.items()}
+_STEP_RE = re.compile(r"_step_(\d+)\.json$")
+
+
+class SegmentCheckpointBackend:
+    def __init__(self, base_dir: Path = Path("output/checkpoints"), compression: str = "none") -> None:
+        if compression not in CODECS:
+            raise ValueError(f"Unknown compression '{compression}' (expected one of {sorted(CODECS)})")
+        self.logger = get_logger("checkpoint")
+        if compression == "zstd" and zstandard is None:
+            self.logger.warning(
+                "Checkpoint_Segment | zstandard not installed, falling back to gzip",
+                extra={"event_tag": "Checkpoint"},
+            )
+            compression = "gzip"
+        self.base_dir = Path(base_dir)
+        self.compression = compression
+        self._lock = threading.Lock()
+        # tid -> stage name -> (payload offset, payload length, codec)
+        self._indexes: Dict[str, Dict[str, Tuple[int, int, int]]] = {}
+        # tid -> offset just past the last valid record
+        self._ends: Dict[str, int] = {}
+
+    def segment_path(self, transaction_id: str) -> Path:
+        return self.base_dir / transaction_id / SEGMENT_FILENAME
+
+    # --- Write ---
+    def append(self, transaction_id: str, stage_filename: str, data: Any) -> Path:
+        return self.write_record(transaction_id, stage_filename, data)[0]
+
+    def write_record(self, transaction_id: str, stage_filename: str, data: Any) -> Tuple[Path, int]:
+        """Append one record; returns (virtual stage path, bytes appended)."""
+        codec = CODECS[self.compression]
+        payload = _encode(json.dumps(data, separators=(",", ":")).encode("utf-8"), codec)
+        name = stage_filename.encode("utf-8")
+        path = self.segment_path(transaction_id)
+        with self._lock:
+            index = self._index_locked(transaction_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            record = _HEADER.pack(MAGIC, codec, len(name), len(payload)) + name + payload
+            end = self._ends.get(transaction_id, 0)
+            with open(path, "ab") as handle:
+                if handle.tell() > end:
+                    self.logger.warning(
+                        f"Checkpoint_Segment | Truncating {handle.tell() - end} unreadable bytes at offset {end} in {path}",
+                        extra={"event_tag": "Checkpoint"},
+                    )
+                    handle.truncate(end)
+                offset = end
+                handle.write(record)
+            index[stage_filename] = (offset + _HEADER.size + len(name), len(payload), codec)
+            self._ends[transaction_id] = offset + len(record)
+        return self.base_dir / transaction_id / stage_filename, len(record)
+
+    # --- Read ---
+    def read(self, transaction_id: str, stage_filename: str) -> Any:
+        with self._lock:
+            entry = self._index_locked(transaction_id).get(stage_filename)
+        if entry is None:
+            raise FileNotFoundError(f"Checkpoint not found: {transaction_id}/{stage_filename}")
+        offset, length, codec = entry
+        with open(self.segment_path(transaction_id), "rb") as handle:
+            handle.seek(offset)
+            raw = handle.read(length)
+        try:
+            return json.loads(_decode(raw, codec))
+        except (ValueError, OSError) as exc:
+            raise ValueError(f"Checkpoint record corrupt: {transaction_id}/{stage_filename}") from exc
+
+    def stages(self, transaction_id: str, prefix: Optional[str] = None, step: Optional[int] = None) -> List[str]:
+        """Stage names in this segment, optionally filtered by stage prefix (e.g. "02") and step number."""
+        with self._lock:
+            names = list(self._index_locked(transaction_id))
+        if prefix is not None:
+            names = [n for n in names if n.startswith(prefix)]
+        if step is not None:
+            names = [n for n in names if (m := _STEP_RE.search(n)) and int(m.group(1)) == step]
+        return sorted(names)
+
+    def transaction_ids(self) -> List[str]:
+        if not self.base_dir.exists():
+            return []
+        return sorted(p.parent.name for p in self.base_dir.glob(f"*/{SEGMENT_FILENAME}"))
+
+    # --- Index ---
+    def _index_locked(self, transaction_id: str) -> Dict[str, Tuple[int, int, int]]:
+        index = self._indexes.get(transaction_id)
+        if index is None:
+            index, self._ends[transaction_id] = self._scan(self.segment_path(transaction_id))
+            self._indexes[transaction_id] = index
+        return index
+
+    def _scan(self, path: Path) -> Tuple[Dict[str, Tuple[int, int, int]], int]:
+        """Index the valid records; returns (index, offset just past the last valid record)."""
+        index: Dict[str, Tuple[int, int, int]] = {}
+        if not path.exists():
+            return index, 0
+        size = path.stat().st_size
+        with open(path, "rb") as handle:
+            offset = 0
+            while True:
+                header = handle.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                magic, codec, name_len, payload_len = _HEADER.unpack(header)
+                name = handle.read(name_len)
+                if magic != MAGIC or len(name) < name_len:
+                    self.logger.warning(
+                        f"Checkpoint_Segment | Corrupt record at offset {offset} in {path}; ignoring the rest",
+                        extra={"event_tag": "Checkpoint"},
+                    )
+                    break
+                start = offset + _HEADER.size + name_len
+                if start + payload_len > size:
+                    break  # truncated tail from an interrupted append
+                handle.seek(payload_len, 1)
+                index[name.decode("utf-8")] = (start, payload_len, codec)
+                offset = start + payload_len
+        return index, offset
+
+
+def _encode(raw: bytes, codec: int) -> bytes:
+    if codec == CODECS["gzip"]:
+        return gzip.compress(raw, compresslevel=6)
+    if codec == CODECS["zstd"]:  # pragma: no cover - requires zstandard
+        return zstandard.ZstdCompressor().compress(raw)
+    return raw
+
+
+def _decode(raw: bytes, codec: int) -> bytes:
+    if codec == CODECS["gzip"]:
+        return gzip.decompress(raw)
+    if codec == CODECS["zstd"]:  # pragma: no cover - requires zstandard
+        if zstandard is None:
+            raise ValueError(f"Record uses {_CODEC_NAMES[codec]} but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(raw)
+    return raw
+
+
+# --- Layout conversion ---
+def directory_to_segment(base_dir: Path, transaction_id: str, backend: SegmentCheckpointBackend, remove: bool = False) -> int:
+    """Append every `<base_dir>/<tid>/*.json` checkpoint to the backend's segment; returns records written."""
+    count = 0
+    for path in sorted((Path(base_dir) / transaction_id).glob("*.json")):
+        backend.append(transaction_id, path.name, json.loads(path.read_text()))
+        count += 1
+        if remove:
+            path.unlink()
+    return count
+
+
+def segment_to_directory(backend: SegmentCheckpointBackend, transaction_id: str, out_dir: Path) -> int:
+    """Write each stage of a segment back out as `<out_dir>/<tid>/<stage>` pretty-printed JSON."""
+    target = Path(out_dir) / transaction_id
+    target.mkdir(parents=True, exist_ok=True)
+    stages = backend.stages(transaction_id)
+    for stage in stages:
+        (target / stage).write_text(json.dumps(backend.read(transaction_id, stage), indent=2))
+    return len(stages)
@@ -37,6 +37,10 @@ class ConfigLoader:
         "scheduler": {
             "interval": 2.0,
             "enabled": True,
+            "coalesce": {
+                "enabled": False,
+                "merge_radius_m": 100.0,
+            },
         },
         "orchestrator": {
             "max_workers": 5,
@@ -63,6 +67,16 @@ class ConfigLoader:
             "backup_count": 5,
             "format": "%(asctime)s | %(levelname)-8s | %(name)s | %(event_tag)s | %(message)s",
             "console_enabled": True,
+            "async_logging": {
+                "enabled": True,
+                "queue_size": 10000,
+                "block_timeout": 1.0,
+            },
+            "events": {
+                "jsonl_file": "logs/events.jsonl",
+                "sampling": {},
+                "rate_limits": {},
+            },
         },
         "output": {
             "json_file": "output/final_route.json",
@@ -71,12 +85,39 @@ class ConfigLoader:
             "checkpoint_dir": "output/checkpoints",
             "checkpoints_enabled": True,
             "checkpoint_retention_days": 7,
+            "checkpoint_level": "full",
+            "checkpoint_sample_rate": 1.0,
+            "checkpoint_backend": "directory",
+            "checkpoint_compression": "none",
+            "async_checkpoints": {
+                "enabled": True,
+                "queue_size": 256,
+                "drop_policy": "block",
+            },
         },
         "route_provider": {
             "mode": "cached",
             "cache_dir": "data/routes",
             "api_retry_attempts": 3,
             "api_timeout": 20.0,
+            "geocode_workers": 4,
+            "progressive_geocoding": False,
+            "corpus": {
+                "enabled": True,
+                "ttl_days": 30,
+                "fuzzy_match": False,
+                "fuzzy_threshold": 0.85,
+                "geo_radius_m": 250.0,
+                "strict_match": False,
+            },
+            "long_route": {
+                "enabled": False,
+                "sample_every_km": 5.0,
+                "sample_every_minutes": 0,
+                "max_points": 500,
+                "window_size": 10,
+                "sample_all_routes": False,
+            },
         },
         "circuit_breaker": {
             "enabled": True,
@@ -87,6 +128,55 @@ class ConfigLoader:
             "enabled": True,
             "file": "logs/metrics.json",
             "update_interval": 5.0,
+            "reservoir_size": 0,
+            "sharded": True,
+            "timeseries_file": "",
+            "openmetrics": {
+                "enabled": False,
+                "textfile": "logs/metrics.prom",
+                "port": 0,
+                "host": "127.0.0.1",
+            },
+            "tracing": {
+                "enabled": True,
+                "format": "chrome",
+                "max_spans": 100000,
+            },
+        },
+        "cache": {
+            "coalesce_inflight": True,
+            "responses": {
+                "enabled": True,
+                "path": "data/cache/responses.sqlite",
+                "max_size_mb": 50,
+                "stale_while_revalidate": True,
+                "negative_ttl_seconds": 900,
+                "ttl_seconds": {
+                    "youtube": 21600,
+                    "spotify": 86400,
+                    "wikipedia": 604800,
+                    "duckduckgo": 86400,
+                },
+            },
+            "enrichment": {
+                "enabled": False,
+                "path": "data/cache/enrichment.sqlite",
+                "radius_m": 150.0,
+                "cell_meters": 100.0,
+                "max_age_hours": 24,
+            },
+            "geocode": {
+                "enabled": True,
+                "path": "data/cache/geocode.sqlite",
+                "radius_m": 15.0,
+                "max_age_days": 30,
+            },
+        },
+        "quota": {
+            "enabled": True,
+            "ledger_file": "data/cache/quota_ledger.sqlite",
+            "reserve_fraction": 0.1,
+            "daily_budgets": {"youtube": 10000, "llm_tokens": 200000},
         },
     }
 
@@ -94,6 +184,8 @@ class ConfigLoader:
     SCHEMA_RULES: Dict[str, Dict[str, Any]] = {
         "scheduler.interval": {"type": (int, float), "min": 0.5, "max": 10.0},
         "scheduler.enabled": {"type": bool},
+        "scheduler.coalesce.enabled": {"type": bool},
+        "scheduler.coalesce.merge_radius_m": {"type": (int, float), "min": 0.0, "max": 5000.0},
         "orchestrator.max_workers": {"type": int, "min": 1, "max": 20},
         "orchestrator.queue_timeout": {"type": (int, float), "min": 0.1, "max": 5.0},
         "orchestrator.shutdown_timeout": {"type": (int, float), "min": 5.0, "max": 120.0},
@@ -115,13 +207,64 @@ class ConfigLoader:
         "judge.llm_timeout": {"type": (int, float), "min": 10.0, "max": 60.0},
         "agents.llm_provider": {"type": str, "choices": ["ollama", "openai", "claude", "gemini", "mock", "auto"], "normalize": "lower"},
         "logging.level": {"type": str, "choices": ["DEBUG", "INFO", "WARNING", "ERROR"], "normalize": "upper"},
+        "logging.async_logging.enabled": {"type": bool},
+        "logging.async_logging.queue_size": {"type": int, "min": 100, "max": 1000000},
+        "logging.async_logging.block_timeout": {"type": (int, float), "min": 0.0, "max": 10.0},
+        "logging.events.jsonl_file": {"type": str},
+        "logging.events.sampling": {"type": dict},
+        "logging.events.rate_limits": {"type": dict},
         "output.checkpoint_retention_days": {"type": int, "min": 0, "max": 30},
+        "output.checkpoint_level": {"type": str, "choices": ["off", "final", "decisions", "full"], "normalize": "lower"},
+        "output.checkpoint_sample_rate": {"type": (int, float), "min": 0.0, "max": 1.0},
+        "output.checkpoint_backend": {"type": str, "choices": ["directory", "segment"], "normalize": "lower"},
+        "output.checkpoint_compression": {"type": str, "choices": ["none", "gzip", "zstd"], "normalize": "lower"},
+        "output.async_checkpoints.enabled": {"type": bool},
+        "output.async_checkpoints.queue_size": {"type": int, "min": 1, "max": 10000},
+        "output.async_checkpoints.drop_policy": {"type": str, "choices": ["block", "drop_oldest", "drop_newest"]},
         "route_provider.mode": {"type": str, "choices": ["live", "cached"], "normalize": "lower"},
         "route_provider.api_retry_attempts": {"type": int, "min": 1, "max": 5},
         "route_provider.api_timeout": {"type": (int, float), "min": 5.0, "max": 30.0},
+        "route_provider.geocode_workers": {"type": int, "min": 1, "max": 16},
+        "route_provider.progressive_geocoding": {"type": bool},
+        "route_provider.corpus.enabled": {"type": bool},
+        "route_provider.corpus.ttl_days": {"type": (int, float), "min": 0.0, "max": 365.0},
+        "route_provider.corpus.fuzzy_match": {"type": bool},
+        "route_provider.corpus.fuzzy_threshold": {"type": (int, float), "min": 0.5, "max": 1.0},
+        "route_provider.corpus.geo_radius_m": {"type": (int, float), "min": 1.0, "max": 5000.0},
+        "route_provider.corpus.strict_match": {"type": bool},
+        "route_provider.long_route.enabled": {"type": bool},
+        "route_provider.long_route.sample_every_km": {"type": (int, float), "min": 0.1, "max": 500.0},
+        "route_provider.long_route.sample_every_minutes": {"type": (int, float), "min": 0.0, "max": 600.0},
+        "route_provider.long_route.max_points": {"type": int, "min": 1, "max": 10000},
+        "route_provider.long_route.window_size": {"type": int, "min": 1, "max": 100},
+        "route_provider.long_route.sample_all_routes": {"type": bool},
         "circuit_breaker.failure_threshold": {"type": int, "min": 3, "max": 10},
         "circuit_breaker.timeout": {"type": (int, float), "min": 30.0, "max": 300.0},
         "metrics.update_interval": {"type": (int, float), "min": 1.0, "max": 30.0},
+        "metrics.reservoir_size": {"type": int, "min": 0, "max": 10000},
+        "metrics.sharded": {"type": bool},
+        "metrics.timeseries_file": {"type": str},
+        "metrics.openmetrics.enabled": {"type": bool},
+        "metrics.openmetrics.textfile": {"type": str},
+        "metrics.openmetrics.port": {"type": int, "min": 0, "max": 65535},
+        "metrics.openmetrics.host": {"type": str},
+        "metrics.tracing.enabled": {"type": bool},
+        "metrics.tracing.format": {"type": str, "choices": ["chrome", "otlp", "both"], "normalize": "lower"},
+        "metrics.tracing.max_spans": {"type": int, "min": 100, "max": 1000000},
+        "cache.coalesce_inflight": {"type": bool},
+        "cache.responses.enabled": {"type": bool},
+        "cache.responses.max_size_mb": {"type": (int, float), "min": 1, "max": 2048},
+        "cache.responses.stale_while_revalidate": {"type": bool},
+        "cache.responses.negative_ttl_seconds": {"type": (int, float), "min": 0, "max": 86400},
+        "cache.enrichment.enabled": {"type": bool},
+        "cache.enrichment.radius_m": {"type": (int, float), "min": 1.0, "max": 5000.0},
+        "cache.enrichment.cell_meters": {"type": (int, float), "min": 10.0, "max": 5000.0},
+        "cache.enrichment.max_age_hours": {"type": (int, float), "min": 0.0, "max": 720.0},
+        "cache.geocode.enabled": {"type": bool},
+        "cache.geocode.radius_m": {"type": (int, float), "min": 0.5, "max": 200.0},
+        "cache.geocode.max_age_days": {"type": (int, float), "min": 0.0, "max": 365.0},
+        "quota.enabled": {"type": bool},
+        "quota.reserve_fraction": {"type": (int, float), "min": 0.0, "max": 0.5},
     }
 
     # Secret keys that should be redacted in logs
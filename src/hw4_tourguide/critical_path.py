@@ -0,0 +1,278 @@
+"""
+Critical-path and bottleneck analysis for a recorded run ("why was step 7 slow?").
+
+Reads the run's span trace (`logs/trace.json` or `logs/trace.otlp.json`,
+see tracing.py) and, per step, walks the path that decided its latency:
+queue wait -> dispatch -> the agent that finished last (LLM query
+generation, each search query, fetch) -> judge (incl. its LLM call).
+Every segment is attributed to a phase and a provider (video -> youtube,
+song -> spotify, knowledge -> wikipedia, LLM calls -> llm).
+
+Route-level output: p50/p95 of end-to-end step latency (queue wait + step
+time), totals per phase/provider, and the segments contributing most to
+the steps at or above p95. Latency summaries from `logs/metrics.json` are
+attached when present. Runs without a trace fall back to per-step totals
+from `Orchestrator_Task_Complete` events in `logs/events.jsonl` (or, for
+older runs, parsed from the same lines in `logs/system.log`).
+The report is plain JSON so two runs can be diffed.
+"""
+
+import json
+import math
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+AGENT_PROVIDERS = {"video": "youtube", "song": "spotify", "knowledge": "wikipedia"}
+
+_TASK_COMPLETE_RE = re.compile(r"Orchestrator_Task_Complete \| TID: (\S+) \| Step (\S+) \| Total Time: (\d+)ms")
+
+
+# --- Loading ---
+def load_spans(run_dir: Path) -> List[Dict[str, Any]]:
+    """Normalized spans {id, parent, name, start_ms, end_ms, attrs} from the run's trace ([] when none)."""
+    logs = Path(run_dir) / "logs"
+    if (logs / "trace.json").exists():
+        return _chrome_spans(json.loads((logs / "trace.json").read_text()))
+    if (logs / "trace.otlp.json").exists():
+        return _otlp_spans(json.loads((logs / "trace.otlp.json").read_text()))
+    return []
+
+
+def _chrome_spans(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    spans = []
+    for event in data.get("traceEvents", []):
+        if event.get("ph") != "X":
+            continue
+        attrs = dict(event.get("args") or {})
+        start = float(event.get("ts", 0.0)) / 1000.0
+        spans.append({
+            "id": attrs.pop("span_id", None),
+            "parent": attrs.pop("parent_id", None),
+            "name": event.get("name"),
+            "start_ms": start,
+            "end_ms": start + float(event.get("dur", 0.0)) / 1000.0,
+            "attrs": attrs,
+        })
+    return spans
+
+
+def _otlp_spans(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    raw = [
+        span
+        for resource in data.get("resourceSpans", [])
+        for scope in resource.get("scopeSpans", [])
+        for span in scope.get("spans", [])
+    ]
+    origin = min((int(s["startTimeUnixNano"]) for s in raw), default=0)
+    spans = []
+    for s in raw:
+        attrs = {a["key"]: _otlp_value(a.get("value", {})) for a in s.get("attributes", [])}
+        spans.append({
+            "id": s.get("spanId"),
+            "parent": s.get("parentSpanId"),
+            "name": s.get("name"),
+            "start_ms": (int(s["startTimeUnixNano"]) - origin) / 1e6,
+            "end_ms": (int(s["endTimeUnixNano"]) - origin) / 1e6,
+            "attrs": attrs,
+        })
+    return spans
+
+
+def _otlp_value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    for key in ("doubleValue", "boolValue", "stringValue"):
+        if key in value:
+            return value[key]
+    return None
+
+
+# --- Per-step critical path ---
+def _duration(span: Dict[str, Any]) -> float:
+    return max(0.0, span["end_ms"] - span["start_ms"])
+
+
+def _segment(segments: List[Dict[str, Any]], name: str, phase: str, provider: str, ms: float) -> None:
+    if ms > 0:
+        segments.append({"segment": name, "phase": phase, "provider": provider, "ms": round(ms, 3)})
+
+
+def analyze_step(step: Dict[str, Any], children: Dict[Optional[str], List[Dict[str, Any]]]) -> Dict[str, Any]:
+    attrs = step["attrs"]
+    segments: List[Dict[str, Any]] = []
+    queue_wait = float(attrs.get("queue_wait_ms") or 0.0)
+    _segment(segments, "queue_wait", "queue_wait", "scheduler", queue_wait)
+
+    kids = children.get(step["id"], [])
+    agents = [k for k in kids if k["name"] == "agent"]
+    judges = [k for k in kids if k["name"] == "judge"]
+    critical = max(agents, key=lambda a: a["end_ms"], default=None)
+    agents_end = step["start_ms"]
+    if critical is not None:
+        agent = str(critical["attrs"].get("agent", "agent"))
+        provider = AGENT_PROVIDERS.get(agent, agent)
+        _segment(segments, "dispatch", "overhead", "orchestrator", critical["start_ms"] - step["start_ms"])
+        accounted = 0.0
+        for child in sorted(children.get(critical["id"], []), key=lambda c: c["start_ms"]):
+            ms = _duration(child)
+            accounted += ms
+            if child["name"] == "query_gen":
+                llm_ms = sum(_duration(g) for g in children.get(child["id"], []) if g["name"] == "llm")
+                _segment(segments, f"{agent}.llm_query_gen", "llm", "llm", llm_ms)
+                _segment(segments, f"{agent}.query_gen", "query_gen", provider, ms - llm_ms)
+            elif child["name"] == "search":
+                index = child["attrs"].get("query_index", "?")
+                _segment(segments, f"{agent}.search[{index}]", "search", provider, ms)
+            elif child["name"] == "fetch":
+                _segment(segments, f"{agent}.fetch", "fetch", provider, ms)
+            else:
+                _segment(segments, f"{agent}.{child['name']}", child["name"], provider, ms)
+        _segment(segments, f"{agent}.other", "overhead", provider, _duration(critical) - accounted)
+        agents_end = critical["end_ms"]
+
+    judge_ms = 0.0
+    for judge in judges:
+        judge_ms += _duration(judge)
+        llm_ms = sum(_duration(g) for g in children.get(judge["id"], []) if g["name"] == "llm")
+        _segment(segments, "judge.llm", "llm", "llm", llm_ms)
+        _segment(segments, "judge", "judge", "judge", _duration(judge) - llm_ms)
+    _segment(segments, "step.other", "overhead", "orchestrator", step["end_ms"] - agents_end - judge_ms)
+
+    return {
+        "transaction_id": attrs.get("transaction_id"),
+        "step": attrs.get("step"),
+        "location": attrs.get("location"),
+        "total_ms": round(queue_wait + _duration(step), 3),
+        "step_ms": round(_duration(step), 3),
+        "queue_wait_ms": round(queue_wait, 3),
+        "critical_agent": critical["attrs"].get("agent") if critical else None,
+        "agents_ms": {str(a["attrs"].get("agent")): round(_duration(a), 3) for a in agents},
+        "enrichment_cache": attrs.get("enrichment_cache"),
+        "critical_path": segments,
+    }
+
+
+# --- Route level ---
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100.0 * len(ordered)) - 1)]
+
+
+def _totals(steps: List[Dict[str, Any]], key: str) -> Dict[str, float]:
+    totals: Dict[str, float] = defaultdict(float)
+    for step in steps:
+        for seg in step["critical_path"]:
+            totals[seg[key]] += seg["ms"]
+    return {k: round(v, 3) for k, v in sorted(totals.items(), key=lambda kv: -kv[1])}
+
+
+def analyze_run(run_dir: Path, top: int = 10) -> Dict[str, Any]:
+    run_dir = Path(run_dir)
+    spans = load_spans(run_dir)
+    if spans:
+        source = "trace"
+        children: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+        for span in spans:
+            children[span["parent"]].append(span)
+        steps = [analyze_step(s, children) for s in spans if s["name"] == "step"]
+    else:
+        source = "logs"
+        steps = _steps_from_logs(run_dir)
+    if not steps:
+        raise FileNotFoundError(f"No trace or step timings found under {run_dir}")
+    steps.sort(key=lambda s: (str(s["transaction_id"]), _step_key(s["step"])))
+
+    totals = [s["total_ms"] for s in steps]
+    p95 = percentile(totals, 95)
+    tail = [s for s in steps if s["total_ms"] >= p95]
+    tail_ms = sum(s["total_ms"] for s in tail) or 1.0
+    contributors: Dict[Tuple[str, str], float] = defaultdict(float)
+    for step in tail:
+        for seg in step["critical_path"]:
+            # Per-query indices collapse so repeated searches rank as one contributor
+            contributors[(re.sub(r"\[\d+\]$", "", seg["segment"]), seg["provider"])] += seg["ms"]
+    ranked = sorted(contributors.items(), key=lambda kv: -kv[1])[: max(1, int(top))]
+    slowest = max(steps, key=lambda s: s["total_ms"])
+
+    return {
+        "run_dir": str(run_dir),
+        "source": source,
+        "route": {
+            "step_count": len(steps),
+            "p50_ms": round(percentile(totals, 50), 3),
+            "p95_ms": round(p95, 3),
+            "max_ms": round(max(totals), 3),
+            "slowest_step": slowest["step"],
+            "by_phase_ms": _totals(steps, "phase"),
+            "by_provider_ms": _totals(steps, "provider"),
+        },
+        "p95_contributors": [
+            {"segment": seg, "provider": provider, "ms": round(ms, 3), "share": round(ms / tail_ms, 4)}
+            for (seg, provider), ms in ranked
+        ],
+        "steps": steps,
+        "metrics": _metrics_latencies(run_dir),
+    }
+
+
+def _step_key(step: Any) -> Tuple[int, str]:
+    try:
+        return int(step), ""
+    except (TypeError, ValueError):
+        return 0, str(step)
+
+
+def _steps_from_logs(run_dir: Path) -> List[Dict[str, Any]]:
+    events_path = run_dir / "logs" / "events.jsonl"
+    if events_path.exists():
+        steps = []
+        with open(events_path, errors="replace") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                fields = record.get("fields") or {}
+                if record.get("event") == "Orchestrator_Task_Complete" and "task_time_ms" in fields:
+                    steps.append(_log_step(fields.get("transaction_id"), fields.get("step"), float(fields["task_time_ms"])))
+        if steps:
+            return steps
+    log_path = run_dir / "logs" / "system.log"
+    if not log_path.exists():
+        return []
+    steps = []
+    with open(log_path, errors="replace") as handle:
+        for line in handle:
+            match = _TASK_COMPLETE_RE.search(line)
+            if match:
+                steps.append(_log_step(match.group(1), match.group(2), float(match.group(3))))
+    return steps
+
+
+def _log_step(transaction_id: Any, step: Any, total: float) -> Dict[str, Any]:
+    total = round(total, 3)
+    return {
+        "transaction_id": transaction_id,
+        "step": step,
+        "location": None,
+        "total_ms": total,
+        "step_ms": total,
+        "queue_wait_ms": None,
+        "critical_agent": None,
+        "agents_ms": {},
+        "enrichment_cache": None,
+        "critical_path": [{"segment": "step", "phase": "step", "provider": "unknown", "ms": total}],
+    }
+
+
+def _metrics_latencies(run_dir: Path) -> Dict[str, Any]:
+    path = run_dir / "logs" / "metrics.json"
+    try:
+        return json.loads(path.read_text()).get("latencies", {})
+    except (OSError, ValueError, AttributeError):
+        return {}
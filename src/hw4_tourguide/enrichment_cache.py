@@ -0,0 +1,143 @@
+"""
+Location-keyed enrichment cache (agent results + judge decision per place).
+
+City routes overlap heavily, so a step whose coordinates fall within
+`radius_m` of a fresh cached step reuses that step's agent outputs and judge
+decision instead of running the agents again. Entries live in a SpatialStore
+(grid-cell index) namespaced by the agent set and scoring mode, so a config
+change never serves results produced under different rules.
+
+Freshness rules:
+- entries older than `max_age_seconds` are ignored, and deleted when the
+  cache is opened and every `prune_every` stores;
+- only decisions whose chosen agent returned status "ok" are stored, so
+  degraded/unavailable steps are always retried on the next run.
+"""
+
+import copy
+import threading
+from typing import Any, Dict, Optional
+
+from hw4_tourguide.logger import get_logger
+from hw4_tourguide.tools.spatial_store import SpatialStore
+
+
+class EnrichmentCache:
+    def __init__(
+        self,
+        store: SpatialStore,
+        namespace: str = "enrichment",
+        radius_m: float = 150.0,
+        max_age_seconds: float = 86400.0,
+        metrics: Optional[Any] = None,
+        prune_every: int = 500,
+    ) -> None:
+        self.store = store
+        self.namespace = namespace
+        self.radius_m = float(radius_m)
+        self.max_age_seconds = float(max_age_seconds)
+        self.metrics = metrics
+        self.prune_every = max(1, int(prune_every))
+        self.logger = get_logger("enrichment_cache")
+        self._lock = threading.Lock()
+        self._stores_since_prune = 0
+        self.prune()
+
+    def lookup(self, task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return {"agents", "judge", "source"} from the nearest fresh entry, or None."""
+        coords = self._coords(task)
+        if coords is None:
+            return None
+        try:
+            hit = self.store.nearest(self.namespace, coords[0], coords[1], self.radius_m, self.max_age_seconds)
+        except Exception as exc:
+            self.logger.warning(
+                f"Enrichment_Cache_Error | Lookup failed: {type(exc).__name__}: {exc}",
+                extra={"event_tag": "Enrichment_Cache"},
+            )
+            return None
+        if hit is None:
+            self._increment_counter("enrichment_cache.misses")
+            return None
+
+        self._increment_counter("enrichment_cache.hits")
+        value = hit["value"]
+        judge = copy.deepcopy(value.get("judge", {}))
+        judge["transaction_id"] = task.get("transaction_id", judge.get("transaction_id"))
+        source = {
+            "transaction_id": value.get("transaction_id"),
+            "step_number": value.get("step_number"),
+            "location": value.get("location"),
+            "distance_m": round(hit["distance_m"], 1),
+            "age_seconds": round(hit["age_seconds"], 1),
+        }
+        self.logger.info(
+            f"Enrichment_Cache_Hit | TID: {task.get('transaction_id')} | Step {task.get('step_number')} | "
+            f"Reusing {source['location']} ({source['distance_m']}m away, {source['age_seconds']:.0f}s old)",
+            extra={"event_tag": "Enrichment_Cache", "transaction_id": task.get("transaction_id")},
+        )
+        return {"agents": value.get("agents", {}), "judge": judge, "source": source}
+
+    def store_result(self, task: Dict[str, Any], agent_outputs: Dict[str, Any], judge_decision: Dict[str, Any]) -> bool:
+        """Cache a step's outputs if it has coordinates and a successful chosen agent."""
+        coords = self._coords(task)
+        chosen = judge_decision.get("chosen_agent")
+        if coords is None or not chosen or (agent_outputs.get(chosen) or {}).get("status") != "ok":
+            return False
+        value = {
+            "transaction_id": task.get("transaction_id"),
+            "step_number": task.get("step_number"),
+            "location": task.get("location_name"),
+            "agents": agent_outputs,
+            "judge": judge_decision,
+        }
+        try:
+            self.store.put(self.namespace, coords[0], coords[1], value)
+        except Exception as exc:
+            self.logger.warning(
+                f"Enrichment_Cache_Error | Store failed: {type(exc).__name__}: {exc}",
+                extra={"event_tag": "Enrichment_Cache"},
+            )
+            return False
+        self._increment_counter("enrichment_cache.stores")
+        with self._lock:
+            self._stores_since_prune += 1
+            due = self._stores_since_prune >= self.prune_every
+            if due:
+                self._stores_since_prune = 0
+        if due:
+            self.prune()
+        return True
+
+    def prune(self) -> int:
+        """Delete expired entries in this namespace; returns the number removed."""
+        try:
+            removed = self.store.prune(self.max_age_seconds, namespace=self.namespace)
+        except Exception as exc:
+            self.logger.warning(
+                f"Enrichment_Cache_Error | Prune failed: {type(exc).__name__}: {exc}",
+                extra={"event_tag": "Enrichment_Cache"},
+            )
+            return 0
+        if removed:
+            self._increment_counter("enrichment_cache.pruned", removed)
+        return removed
+
+    @staticmethod
+    def _coords(task: Dict[str, Any]) -> Optional[tuple]:
+        coords = task.get("coordinates") or {}
+        lat, lng = coords.get("lat"), coords.get("lng")
+        if lat is None or lng is None:
+            return None
+        try:
+            return float(lat), float(lng)
+        except (TypeError, ValueError):
+            return None
+
+    def _increment_counter(self, name: str, value: int = 1) -> None:
+        if not self.metrics:
+            return
+        try:
+            self.metrics.increment_counter(name, value)
+        except Exception:
+            pass
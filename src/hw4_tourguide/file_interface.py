@@ -4,11 +4,21 @@ File-based interfaces and checkpoint writer (Mission M7.7a).
 Provides lightweight JSON read/write utilities with basic schema key checks, plus
 checkpoint helpers for ADR-009. Avoids extra dependencies by validating required
 keys listed in the schema's "required" array only.
+
+AsyncCheckpointWriter moves checkpoint serialization and disk I/O off agent
+worker threads onto a single background writer thread. JsonListStream writes
+a JSON list (optionally inside an object) one item at a time, for checkpoints
+of streamed long routes that are never held in memory as a whole.
 """
 
+import atexit
 import json
 import os
+import re
+import threading
 import time
+import zlib
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -52,25 +62,134 @@ class FileInterface:
                 raise ValueError(f"Schema validation failed, missing keys: {missing}")
 
 
+CHECKPOINT_LEVELS = ("off", "final", "decisions", "full")
+_STEP_RE = re.compile(r"_step_(\d+)\.json$")
+
+
+class JsonListStream:
+    """
+    Append items to a JSON list on disk as they arrive.
+
+    With `key`, the file is an object `{**fields, key: [items...]}`; otherwise
+    it is a bare list. The document is valid JSON once `close()` is called.
+    """
+
+    def __init__(self, path: Path, key: Optional[str] = None, fields: Optional[Dict[str, Any]] = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._key = key
+        self._handle = open(self.path, "w", encoding="utf-8")
+        self.count = 0
+        self.bytes_written = 0
+        if key is None:
+            self._write("[")
+        else:
+            head = "".join(f"\n  {json.dumps(k)}: {json.dumps(v, default=str)}," for k, v in (fields or {}).items())
+            self._write("{" + head + f"\n  {json.dumps(key)}: [")
+
+    def append(self, item: Any) -> None:
+        text = json.dumps(item, indent=2, default=str).replace("\n", "\n    " if self._key else "\n  ")
+        self._write(("," if self.count else "") + ("\n    " if self._key else "\n  ") + text)
+        self.count += 1
+
+    def close(self) -> int:
+        """Finish the document; returns the bytes written."""
+        if self._handle.closed:
+            return self.bytes_written
+        if self._key is None:
+            self._write("\n]" if self.count else "]")
+        else:
+            self._write("\n  ]\n}" if self.count else "]\n}")
+        self._handle.close()
+        return self.bytes_written
+
+    def _write(self, text: str) -> None:
+        self._handle.write(text)
+        self.bytes_written += len(text.encode("utf-8"))
+
+
+def stage_level(stage_filename: str) -> str:
+    """Lowest checkpoint level that writes this stage (05 final output, 00/04 route and judge, rest full)."""
+    if stage_filename.startswith("05"):
+        return "final"
+    if stage_filename.startswith(("00", "04")):
+        return "decisions"
+    return "full"
+
+
 class CheckpointWriter:
     def __init__(
         self,
         base_dir: Path = Path("output/checkpoints"),
         retention_days: int = 7,
         logger_name: str = "checkpoint",
+        backend: Optional[Any] = None,
+        level: str = "full",
+        full_sample_rate: float = 1.0,
+        metrics: Optional[Any] = None,
     ) -> None:
+        if level not in CHECKPOINT_LEVELS:
+            raise ValueError(f"Unknown checkpoint level '{level}' (expected one of {CHECKPOINT_LEVELS})")
         self.base_dir = base_dir
         self.retention_days = retention_days
         self.logger = get_logger(logger_name)
+        # Optional storage backend (e.g. SegmentCheckpointBackend); None = one JSON file per stage
+        self.backend = backend
+        self.level = level
+        # Fraction of steps whose "full" checkpoints (search/fetch candidates) are kept
+        self.full_sample_rate = max(0.0, min(1.0, float(full_sample_rate)))
+        self.metrics = metrics
+        self.bytes_written = 0
+        self._bytes_lock = threading.Lock()
+
+    def should_write(self, transaction_id: str, stage_filename: str) -> bool:
+        """Whether the configured level (and full-checkpoint sampling) keeps this stage."""
+        required = stage_level(stage_filename)
+        if CHECKPOINT_LEVELS.index(self.level) < CHECKPOINT_LEVELS.index(required):
+            return False
+        if required != "full" or self.full_sample_rate >= 1.0:
+            return True
+        # Sample whole steps (all agents' search/fetch for a step together), deterministically per run
+        match = _STEP_RE.search(stage_filename)
+        key = f"{transaction_id}:{match.group(1) if match else stage_filename}"
+        return zlib.crc32(key.encode("utf-8")) / 2**32 < self.full_sample_rate
 
     def write(self, transaction_id: str, stage_filename: str, data: Any) -> Path:
-        path = self.base_dir / transaction_id / stage_filename
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(data, indent=2))
+        if not self.should_write(transaction_id, stage_filename):
+            self._increment_counter("checkpoint.skipped")
+            return self.base_dir / transaction_id / stage_filename
+        path = self._persist(transaction_id, stage_filename, data)
         self.logger.info(f"Wrote checkpoint {path}", extra={"event_tag": "Config"})
         return path
 
+    def _persist(self, transaction_id: str, stage_filename: str, data: Any) -> Path:
+        if self.backend is not None:
+            path, size = self.backend.write_record(transaction_id, stage_filename, data)
+        else:
+            path = self.base_dir / transaction_id / stage_filename
+            path.parent.mkdir(parents=True, exist_ok=True)
+            text = json.dumps(data, indent=2)
+            path.write_text(text)
+            size = len(text.encode("utf-8"))
+        with self._bytes_lock:
+            self.bytes_written += size
+        self._increment_counter("checkpoint.bytes_written", size)
+        return path
+
+    def _increment_counter(self, name: str, value: int = 1) -> None:
+        if not self.metrics:
+            return
+        try:
+            self.metrics.increment_counter(name, value)
+        except Exception:
+            pass
+
     def read(self, transaction_id: str, stage_filename: str) -> Any:
+        if self.backend is not None:
+            try:
+                return self.backend.read(transaction_id, stage_filename)
+            except FileNotFoundError:
+                pass  # stages written directly as files (route, scheduler) live beside the segment
         path = self.base_dir / transaction_id / stage_filename
         if not path.exists():
             raise FileNotFoundError(f"Checkpoint not found: {path}")
@@ -81,9 +200,12 @@ class CheckpointWriter:
 
     def list(self, transaction_id: str) -> List[Path]:
         tid_dir = self.base_dir / transaction_id
-        if not tid_dir.exists():
-            return []
-        return sorted([p for p in tid_dir.glob("*.json") if p.is_file()])
+        paths = set()
+        if self.backend is not None:
+            paths.update(tid_dir / stage for stage in self.backend.stages(transaction_id))
+        if tid_dir.exists():
+            paths.update(p for p in tid_dir.glob("*.json") if p.is_file())
+        return sorted(paths)
 
     def cleanup_old(self) -> List[Path]:
         if self.retention_days <= 0:
@@ -96,7 +218,7 @@ class CheckpointWriter:
         for tid_dir in self.base_dir.iterdir():
             if not tid_dir.is_dir():
                 continue
-            for f in tid_dir.glob("*.json"):
+            for f in [*tid_dir.glob("*.json"), *tid_dir.glob("*.seg")]:
                 try:
                     if f.stat().st_mtime < cutoff:
                         f.unlink()
@@ -109,3 +231,169 @@ class CheckpointWriter:
                 extra={"event_tag": "Config"},
             )
         return removed
+
+
+class AsyncCheckpointWriter(CheckpointWriter):
+    """
+    CheckpointWriter whose `write` only enqueues; a daemon thread serializes
+    and writes to disk.
+
+    - Bounded: at most `max_queue` distinct checkpoints are pending.
+    - Coalesced: a second write to the same (tid, stage) before the first one
+      reaches disk replaces the pending payload (one disk write).
+    - Policy when full: "block" (default; wait for room, so no checkpoint is
+      lost). "drop_oldest" (evict the oldest pending write) and "drop_newest"
+      (discard the incoming write) trade completeness for agent latency and
+      are opt-in.
+    - `flush()` waits for the queue to drain; `close()` flushes and stops the
+      thread and is also registered with atexit, so pending checkpoints are
+      not lost on normal shutdown.
+
+    Payloads are handed over, not copied: callers must not mutate a payload
+    after passing it to `write`. Reads of pending checkpoints are served from
+    the queue, so `read`/`list` see writes that have not reached disk yet.
+    """
+
+    DROP_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+    def __init__(
+        self,
+        base_dir: Path = Path("output/checkpoints"),
+        retention_days: int = 7,
+        logger_name: str = "checkpoint",
+        max_queue: int = 256,
+        drop_policy: str = "block",
+        metrics: Optional[Any] = None,
+        backend: Optional[Any] = None,
+        level: str = "full",
+        full_sample_rate: float = 1.0,
+    ) -> None:
+        super().__init__(
+            base_dir=base_dir, retention_days=retention_days, logger_name=logger_name, backend=backend,
+            level=level, full_sample_rate=full_sample_rate, metrics=metrics,
+        )
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"Unknown drop_policy '{drop_policy}' (expected one of {self.DROP_POLICIES})")
+        self.max_queue = max(1, int(max_queue))
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self.coalesced = 0
+        self._pending: "OrderedDict[Path, Any]" = OrderedDict()
+        self._writing: Dict[Path, Any] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, transaction_id: str, stage_filename: str, data: Any) -> Path:
+        path = self.base_dir / transaction_id / stage_filename
+        if not self.should_write(transaction_id, stage_filename):
+            self._increment_counter("checkpoint.skipped")
+            return path
+        with self._cond:
+            if self._closed:
+                return super().write(transaction_id, stage_filename, data)
+            if path in self._pending:
+                self._pending[path] = data
+                self.coalesced += 1
+                self._increment_counter("checkpoint.coalesced")
+                return path
+            while len(self._pending) >= self.max_queue:
+                if self.drop_policy == "block":
+                    self._cond.wait()
+                    continue
+                if self.drop_policy == "drop_newest":
+                    self._record_drop(path)
+                    return path
+                dropped_path, _ = self._pending.popitem(last=False)
+                self._record_drop(dropped_path)
+            self._pending[path] = data
+            self._set_gauge("checkpoint.queue_depth", len(self._pending))
+            self._cond.notify_all()
+        return path
+
+    def read(self, transaction_id: str, stage_filename: str) -> Any:
+        path = self.base_dir / transaction_id / stage_filename
+        with self._cond:
+            for pending in (self._pending, self._writing):
+                if path in pending:
+                    return json.loads(json.dumps(pending[path]))
+        return super().read(transaction_id, stage_filename)
+
+    def list(self, transaction_id: str) -> List[Path]:
+        tid_dir = self.base_dir / transaction_id
+        with self._cond:
+            queued = {p for p in list(self._pending) + list(self._writing) if p.parent == tid_dir}
+        return sorted(set(super().list(transaction_id)) | queued)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every pending checkpoint is on disk (or timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self.dropped:
+            self.logger.warning(
+                f"Checkpoint_Dropped | {self.dropped} checkpoint writes dropped (queue full, policy={self.drop_policy})",
+                extra={"event_tag": "Checkpoint"},
+            )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return  # closed and drained
+                path, data = self._pending.popitem(last=False)
+                self._writing[path] = data
+                self._set_gauge("checkpoint.queue_depth", len(self._pending))
+                self._cond.notify_all()
+            start = time.perf_counter()
+            try:
+                self._persist(path.parent.name, path.name, data)
+            except Exception as exc:
+                self.logger.warning(
+                    f"Checkpoint_Write_Failed | {path} | {type(exc).__name__}: {exc}",
+                    extra={"event_tag": "Checkpoint"},
+                )
+            else:
+                self.logger.debug(f"Wrote checkpoint {path}", extra={"event_tag": "Config"})
+                self._record_latency("checkpoint.write_ms", (time.perf_counter() - start) * 1000)
+            with self._cond:
+                self._writing.pop(path, None)
+                self._cond.notify_all()
+
+    def _record_drop(self, path: Path) -> None:
+        self.dropped += 1
+        self._increment_counter("checkpoint.dropped")
+        self.logger.debug(f"Checkpoint_Dropped | {path}", extra={"event_tag": "Checkpoint"})
+
+    def _set_gauge(self, name: str, value: float) -> None:
+        if not self.metrics:
+            return
+        try:
+            self.metrics.set_gauge(name, value)
+        except Exception:
+            pass
+
+    def _record_latency(self, name: str, value_ms: float) -> None:
+        if not self.metrics:
+            return
+        try:
+            self.metrics.record_latency(name, value_ms)
+        except Exception:
+            pass
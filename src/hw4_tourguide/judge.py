@@ -3,9 +3,11 @@
 import logging
 import time
 import re
+from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional
 
-from hw4_tourguide.logger import get_logger
+from hw4_tourguide.logger import get_logger, log_event
+from hw4_tourguide import tracing
 from hw4_tourguide.tools.llm_client import llm_factory, LLMClient, LLMError
 from hw4_tourguide.tools.prompt_loader import load_prompt_with_context
 
@@ -24,7 +26,7 @@ class JudgeAgent:
     The JudgeAgent evaluates the content fetched by worker agents and selects the best one.
     """
 
-    def __init__(self, config: Dict[str, Any], logger: logging.Logger, metrics_collector: Optional[Any] = None, secrets_fn: Optional[Any] = None):
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger, metrics_collector: Optional[Any] = None, secrets_fn: Optional[Any] = None, quota_ledger: Optional[Any] = None):
         """
         Initializes the JudgeAgent.
 
@@ -32,6 +34,7 @@ class JudgeAgent:
             config: The configuration dictionary for the judge agent.
             logger: The logger instance.
             metrics_collector: The metrics collector instance for tracking performance.
+            quota_ledger: Optional QuotaLedger charged with the judge's LLM tokens.
         """
         self.config = config
         self.logger = logger
@@ -69,6 +72,8 @@ class JudgeAgent:
                     extra={"event_tag": "Judge"},
                 )
                 self.llm_client = None
+        if self.llm_client is not None and quota_ledger is not None:
+            self.llm_client.quota_ledger = quota_ledger
         self.logger.info(
             f"JudgeAgent initialized. LLM scoring: {'Enabled' if self.llm_enabled else 'Disabled'}",
             extra={"event_tag": "Judge"},
@@ -90,20 +95,19 @@ class JudgeAgent:
         step = task.get('step_number', '?')
 
         # Log input: Agent results summary
-        agent_summary = ", ".join(
-            f"{r.get('agent_type', '?')}({r.get('status', 'unknown')})"
-            for r in agent_results
-        )
-        self.logger.info(
-            f"Judge_Input | TID: {transaction_id} | Step {step} | Agents: {agent_summary}",
-            extra={"event_tag": "Judge_Input", "transaction_id": transaction_id, "step": step}
+        log_event(
+            self.logger, logging.INFO, "Judge_Input",
+            "TID: {transaction_id} | Step {step} | Agents: {agents}",
+            transaction_id=transaction_id, step=step,
+            agents={r.get("agent_type", "?"): r.get("status", "unknown") for r in agent_results},
         )
 
         # Log scoring mode
-        self.logger.info(
-            f"Judge_Mode | TID: {transaction_id} | Scoring: {self.scoring_mode} | "
-            f"LLM: {'enabled' if self.llm_client else 'disabled'}",
-            extra={"event_tag": "Judge_Mode", "scoring_mode": self.scoring_mode}
+        log_event(
+            self.logger, logging.INFO, "Judge_Mode",
+            "TID: {transaction_id} | Scoring: {scoring_mode} | LLM: {llm}",
+            transaction_id=transaction_id, scoring_mode=self.scoring_mode,
+            llm="enabled" if self.llm_client else "disabled",
         )
 
         if self.metrics_collector:
@@ -115,10 +119,10 @@ class JudgeAgent:
         heuristic_time_ms = (time.time() - heuristic_start) * 1000
 
         # Log heuristic scores
-        heuristic_summary = ", ".join(f"{agent}: {score:.1f}" for agent, score in heuristic_scores.items())
-        self.logger.info(
-            f"Judge_Heuristic | TID: {transaction_id} | Scores: {heuristic_summary} | Time: {heuristic_time_ms:.0f}ms",
-            extra={"event_tag": "Judge_Heuristic", "heuristic_scores": heuristic_scores}
+        log_event(
+            self.logger, logging.INFO, "Judge_Heuristic",
+            "TID: {transaction_id} | Scores: {heuristic_scores:.1f} | Time: {heuristic_time_ms:.0f}ms",
+            transaction_id=transaction_id, heuristic_scores=heuristic_scores, heuristic_time_ms=heuristic_time_ms,
         )
 
         # Default to heuristic
@@ -131,22 +135,25 @@ class JudgeAgent:
             if self.metrics_collector:
                 self.metrics_collector.increment_counter("judge.llm_calls_attempted")
 
-            self.logger.info(
-                f"Judge_LLM_Call | TID: {transaction_id} | Attempting LLM scoring",
-                extra={"event_tag": "Judge_LLM_Call"}
+            log_event(
+                self.logger, logging.INFO, "Judge_LLM_Call",
+                "TID: {transaction_id} | Attempting LLM scoring",
+                transaction_id=transaction_id,
             )
 
             try:
                 llm_start = time.time()
-                llm_result = self._llm_score(task, agent_results)
+                with tracing.span("llm", purpose="judge_scoring"):
+                    llm_result = self._llm_score(task, agent_results)
                 llm_time_ms = (time.time() - llm_start) * 1000
 
                 if self.metrics_collector:
                     self.metrics_collector.increment_counter("judge.llm_calls_success")
 
-                self.logger.info(
-                    f"Judge_LLM_Response | TID: {transaction_id} | Status: SUCCESS | Time: {llm_time_ms:.0f}ms",
-                    extra={"event_tag": "Judge_LLM_Response", "llm_time_ms": llm_time_ms, "status": "success"}
+                log_event(
+                    self.logger, logging.INFO, "Judge_LLM_Response",
+                    "TID: {transaction_id} | Status: SUCCESS | Time: {llm_time_ms:.0f}ms",
+                    transaction_id=transaction_id, llm_time_ms=llm_time_ms, status="success",
                 )
 
                 # Use LLM scores if available and mode is "llm" or "hybrid"
@@ -175,13 +182,12 @@ class JudgeAgent:
                             hybrid_scores[agent_type] = (h_score + l_score) / 2.0
                         scores = hybrid_scores
 
-                        hybrid_summary = ", ".join(
-                            f"{agent}: {score:.1f}(H:{heuristic_scores.get(agent, 0):.1f}+L:{llm_result['individual_scores'].get(agent, 0):.1f})"
-                            for agent, score in hybrid_scores.items()
-                        )
-                        self.logger.info(
-                            f"Judge_Hybrid | TID: {transaction_id} | Scores: {hybrid_summary}",
-                            extra={"event_tag": "Judge_Hybrid", "hybrid_scores": hybrid_scores}
+                        log_event(
+                            self.logger, logging.INFO, "Judge_Hybrid",
+                            "TID: {transaction_id} | Scores: {hybrid_scores:.1f} | "
+                            "Heuristic: {heuristic_scores:.1f} | LLM: {llm_scores:.1f}",
+                            transaction_id=transaction_id, hybrid_scores=hybrid_scores,
+                            heuristic_scores=heuristic_scores, llm_scores=llm_result["individual_scores"],
                         )
 
                 # Use LLM rationale if available
@@ -226,7 +232,7 @@ class JudgeAgent:
             "individual_scores": scores,
             "rationale": rationales.get(best_agent, "No suitable content found."),
             "per_agent_rationales": rationales,
-            "timestamp": time.time()
+            "timestamp": datetime.now(timezone.utc).isoformat(),
         }
 
         # Add the chosen content to the decision
@@ -246,10 +252,11 @@ class JudgeAgent:
         margin = highest_score - second_best_score
 
         # Log final decision with margin
-        self.logger.info(
-            f"Judge_Decision | TID: {transaction_id} | CHOSEN: {best_agent} ({highest_score:.1f}) | "
-            f"Margin: +{margin:.1f} over second | All Scores: {', '.join(f'{a}:{s:.1f}' for a,s in scores.items())}",
-            extra={"event_tag": "Judge_Decision", "chosen_agent": best_agent, "margin": margin}
+        log_event(
+            self.logger, logging.INFO, "Judge_Decision",
+            "TID: {transaction_id} | CHOSEN: {chosen_agent} ({score:.1f}) | "
+            "Margin: +{margin:.1f} over second | All Scores: {scores:.1f}",
+            transaction_id=transaction_id, chosen_agent=best_agent, score=highest_score, margin=margin, scores=scores,
         )
 
         if self.metrics_collector:
@@ -265,10 +272,12 @@ class JudgeAgent:
 
         # Log overall completion
         total_time_ms = (time.time() - start_time) * 1000
-        self.logger.info(
-            f"Judge_Complete | TID: {transaction_id} | Step {step} | Total Time: {total_time_ms:.0f}ms | "
-            f"Mode: {self.scoring_mode} | Chosen: {best_agent}",
-            extra={"event_tag": "Judge_Complete", "total_time_ms": total_time_ms}
+        log_event(
+            self.logger, logging.INFO, "Judge_Complete",
+            "TID: {transaction_id} | Step {step} | Total Time: {total_time_ms:.0f}ms | "
+            "Mode: {scoring_mode} | Chosen: {chosen_agent}",
+            transaction_id=transaction_id, step=step, total_time_ms=total_time_ms,
+            scoring_mode=self.scoring_mode, chosen_agent=best_agent,
         )
 
         return decision
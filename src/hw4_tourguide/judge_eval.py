@@ -0,0 +1,262 @@
+"""
+Offline judge evaluation over a corpus of recorded runs.
+
+Streams historical steps (agent results + the judge decision actually made)
+from every run under an output root, re-scores them with JudgeAgent's
+heuristic path under one or more weight variants, and reports choice
+distributions and agreement (with the original decision and between
+variants).
+
+Sources, found by walking the root (deduplicated by transaction/step within
+each run directory; records without a transaction id are skipped):
+- final outputs: `final_route.json` (or `json_names`) and `05_final_output.json`;
+- judge checkpoints: `04_judge_decision_step_*.json`;
+- segment checkpoints: 04/05 records inside `checkpoints.seg`.
+Replayed outputs (`"replayed": true`) are skipped: they are not history.
+
+Memory stays bounded: files are read one at a time, steps are shipped to a
+multiprocessing pool in fixed-size chunks with at most `2 * processes`
+chunks in flight, and workers return aggregate counts, not per-step results.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter, OrderedDict, deque
+from itertools import combinations, islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from hw4_tourguide.checkpoint_store import SEGMENT_FILENAME, SegmentCheckpointBackend
+from hw4_tourguide.logger import get_logger
+
+DEFAULT_WEIGHTS = {"presence": 0.3, "quality": 0.3, "relevance": 0.4}
+
+# Per-process judges, built once by the pool initializer
+_WORKER_JUDGES: Dict[str, Any] = {}
+
+# Run directories whose (tid, step) keys are remembered at once; the walk visits
+# each run's files together, so this only has to cover nested run directories
+_DEDUP_RUNS = 8
+
+
+# --- Corpus streaming ---
+def iter_corpus_steps(root: Path, json_names: Sequence[str] = ("final_route.json",)) -> Iterator[Dict[str, Any]]:
+    """Yield compact step records {tid, step, task, agents, original} from every run under root."""
+    seen_by_run: "OrderedDict[Path, set]" = OrderedDict()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = Path(dirpath) / name
+            if name == SEGMENT_FILENAME:
+                entries = _segment_entries(path)
+            elif name in json_names or name == "05_final_output.json" or name.startswith("04_judge_decision_step_"):
+                entries = _json_entries(path)
+            else:
+                continue
+            run_dir = _run_dir(path)
+            if run_dir not in seen_by_run:
+                seen_by_run[run_dir] = set()
+                if len(seen_by_run) > _DEDUP_RUNS:
+                    seen_by_run.popitem(last=False)
+            seen_by_run.move_to_end(run_dir)
+            seen = seen_by_run[run_dir]
+            missing_tid = 0
+            for entry in entries:
+                record = _to_record(entry)
+                if record is None:
+                    continue
+                if record["tid"] is None:
+                    missing_tid += 1
+                    continue
+                key = (record["tid"], record["step"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield record
+            if missing_tid:
+                get_logger("judge_eval").warning(
+                    f"Judge_Eval_Skipped | {missing_tid} step(s) without transaction_id in {path}",
+                    extra={"event_tag": "Judge_Eval"},
+                )
+
+
+def _run_dir(path: Path) -> Path:
+    """Run directory a corpus file belongs to (the parent of its `checkpoints/` dir, else its own dir)."""
+    for parent in path.parents:
+        if parent.name == "checkpoints":
+            return parent.parent
+    return path.parent
+
+
+def _json_entries(path: Path) -> List[Dict[str, Any]]:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError):
+        return []
+    if isinstance(data, dict):
+        data = [data]
+    return [d for d in data if isinstance(d, dict)] if isinstance(data, list) else []
+
+
+def _segment_entries(path: Path) -> Iterator[Dict[str, Any]]:
+    backend = SegmentCheckpointBackend(base_dir=path.parent.parent)
+    tid = path.parent.name
+    for stage in backend.stages(tid):
+        if stage.startswith(("04_judge_decision_step_", "05_final_output")):
+            try:
+                yield from _as_list(backend.read(tid, stage))
+            except (OSError, ValueError):
+                continue
+
+
+def _as_list(data: Any) -> List[Dict[str, Any]]:
+    items = data if isinstance(data, list) else [data]
+    return [d for d in items if isinstance(d, dict)]
+
+
+def _to_record(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    agents = entry.get("agents")
+    if not isinstance(agents, dict) or not agents or entry.get("replayed"):
+        return None
+    return {
+        "tid": entry.get("transaction_id"),
+        "step": entry.get("step_number"),
+        "task": {
+            "transaction_id": entry.get("transaction_id"),
+            "step_number": entry.get("step_number"),
+            "location_name": entry.get("location"),
+            "instructions": entry.get("instructions"),
+        },
+        "agents": list(agents.values()),
+        "original": (entry.get("judge") or {}).get("chosen_agent"),
+    }
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- Scoring (runs in worker processes) ---
+def _init_worker(variants: Dict[str, Dict[str, float]]) -> None:
+    from hw4_tourguide.judge import JudgeAgent
+
+    quiet = logging.getLogger("hw4_tourguide.judge_eval.worker")
+    quiet.setLevel(logging.WARNING)
+    _WORKER_JUDGES.clear()
+    for name, weights in variants.items():
+        _WORKER_JUDGES[name] = JudgeAgent(
+            config={"scoring_mode": "heuristic", "use_llm": False, "heuristic_weights": weights},
+            logger=quiet,
+        )
+
+
+def _empty_stats(variant_names: Iterable[str]) -> Dict[str, Any]:
+    names = list(variant_names)
+    return {
+        "steps": 0,
+        "original": Counter(),
+        "variants": {n: {"choices": Counter(), "agree": 0, "compared": 0, "score_sum": 0.0} for n in names},
+        "pairs": {f"{a}|{b}": 0 for a, b in combinations(names, 2)},
+    }
+
+
+def _score_chunk(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    stats = _empty_stats(_WORKER_JUDGES)
+    for record in records:
+        stats["steps"] += 1
+        original = record.get("original")
+        stats["original"][str(original)] += 1
+        chosen: Dict[str, Any] = {}
+        for name, judge in _WORKER_JUDGES.items():
+            decision = judge.evaluate(record["task"], record["agents"])
+            choice = decision.get("chosen_agent")
+            chosen[name] = choice
+            variant = stats["variants"][name]
+            variant["choices"][str(choice)] += 1
+            variant["score_sum"] += max(0.0, float(decision.get("overall_score") or 0.0))
+            if original is not None:
+                variant["compared"] += 1
+                variant["agree"] += int(choice == original)
+        for pair in stats["pairs"]:
+            a, b = pair.split("|")
+            stats["pairs"][pair] += int(chosen[a] == chosen[b])
+    return stats
+
+
+def _merge(total: Dict[str, Any], part: Dict[str, Any]) -> None:
+    total["steps"] += part["steps"]
+    total["original"].update(part["original"])
+    for name, variant in part["variants"].items():
+        into = total["variants"][name]
+        into["choices"].update(variant["choices"])
+        for key in ("agree", "compared", "score_sum"):
+            into[key] += variant[key]
+    for pair, count in part["pairs"].items():
+        total["pairs"][pair] += count
+
+
+# --- Driver ---
+def evaluate_corpus(
+    root: Path,
+    variants: Optional[Dict[str, Dict[str, float]]] = None,
+    processes: Optional[int] = None,
+    chunk_size: int = 200,
+    json_names: Sequence[str] = ("final_route.json",),
+) -> Dict[str, Any]:
+    """Re-judge every recorded step under root with each weight variant and return summary statistics."""
+    variants = variants or {"default": dict(DEFAULT_WEIGHTS)}
+    processes = processes or os.cpu_count() or 1
+    logger = get_logger("judge_eval")
+    start = time.time()
+    total = _empty_stats(variants)
+    chunks = _chunks(iter_corpus_steps(Path(root), json_names), max(1, int(chunk_size)))
+
+    if processes <= 1:
+        _init_worker(variants)
+        for chunk in chunks:
+            _merge(total, _score_chunk(chunk))
+    else:
+        with multiprocessing.get_context().Pool(processes, initializer=_init_worker, initargs=(variants,)) as pool:
+            in_flight: deque = deque()
+            for chunk in chunks:
+                in_flight.append(pool.apply_async(_score_chunk, (chunk,)))
+                if len(in_flight) >= 2 * processes:
+                    _merge(total, in_flight.popleft().get())
+            while in_flight:
+                _merge(total, in_flight.popleft().get())
+
+    report = _report(total, variants, time.time() - start)
+    logger.info(
+        f"Judge_Eval_Complete | Steps: {report['steps']} | Variants: {', '.join(variants)} | "
+        f"Processes: {processes} | Time: {report['elapsed_s']:.2f}s",
+        extra={"event_tag": "Judge_Eval", "steps": report["steps"]},
+    )
+    return report
+
+
+def _report(total: Dict[str, Any], variants: Dict[str, Dict[str, float]], elapsed: float) -> Dict[str, Any]:
+    steps = total["steps"]
+    return {
+        "steps": steps,
+        "elapsed_s": round(elapsed, 3),
+        "steps_per_second": round(steps / elapsed, 1) if elapsed > 0 else None,
+        "original_choice_distribution": dict(total["original"]),
+        "variants": {
+            name: {
+                "weights": variants[name],
+                "choice_distribution": dict(v["choices"]),
+                "agreement_with_original": round(v["agree"] / v["compared"], 4) if v["compared"] else None,
+                "mean_overall_score": round(v["score_sum"] / steps, 2) if steps else None,
+            }
+            for name, v in total["variants"].items()
+        },
+        "pairwise_agreement": {pair: round(count / steps, 4) if steps else None for pair, count in total["pairs"].items()},
+    }
@@ -4,12 +4,47 @@ Logging Infrastructure (Mission M3.2)
 Provides structured logging with rotating file handlers, optional error-only stream,
 and console output. Ensures every LogRecord has an `event_tag` attribute to satisfy
 the configured log format.
+
+With `async_logging.enabled`, the package logger only enqueues records on a
+bounded queue (QueueHandler); a single QueueListener thread does the
+formatting and file/console I/O. When the queue is full, records below
+WARNING are dropped and counted rather than stalling the caller; WARNING and
+above wait up to `block_timeout` seconds for room first. Pending records are
+drained by `flush_logging()` / `shutdown_logging()` (also run at exit).
+
+Hot paths log structured events via `log_event(logger, level, "Agent_Search",
+"TID: {tid} | Found: {count}", tid=..., count=...)`: the message is only
+rendered when a handler emits the record (on the listener thread in async
+mode), and is skipped entirely when the level is disabled or the event is
+sampled out (`events.sampling` / `events.rate_limits`; WARNING and above are
+never sampled). The fields are also written unrendered to the JSON-lines sink
+(`events.jsonl_file`), one object per record.
 """
 
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import math
+import queue
+import string
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+MODULE_LOGGERS = {
+    "agents": ["agent.video", "agent.song", "agent.knowledge"],
+    "judge": ["judge"],
+    "apis": ["api"],
+    "route_provider": ["route_provider.google", "route_provider.cached", "route_provider.live"],
+}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["_DroppingQueueHandler"] = None
+_module_handlers: List[logging.Handler] = []
+_atexit_registered = False
+_sampler: Optional["_EventSampler"] = None
 
 
 class _EventTagFilter(logging.Filter):
@@ -25,6 +60,176 @@ class _EventTagFilter(logging.Filter):
         return True
 
 
+class _LoggerPrefixFilter(logging.Filter):
+    """Pass records from the given loggers (and their children) only."""
+
+    def __init__(self, names: List[str]) -> None:
+        super().__init__()
+        self.names = tuple(names)
+        self.prefixes = tuple(f"{name}." for name in names)
+
+    def filter(self, record: logging.LogRecord) -> bool:  # type: ignore[override]
+        return record.name in self.names or record.name.startswith(self.prefixes)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks on INFO/DEBUG: a full queue drops (and counts) the record."""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]", block_timeout: float = 1.0) -> None:
+        super().__init__(log_queue)
+        self.block_timeout = max(0.0, float(block_timeout))
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same process, so keep exc_info and skip full formatting; only bind args
+        # now so later mutation of the arguments cannot change the message.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno >= logging.WARNING and self.block_timeout:
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                pass
+        with self._lock:
+            self.dropped += 1
+
+
+class _EventFieldFormatter(string.Formatter):
+    """str.format, plus mappings rendered as `key: value, ...` with the spec applied to each value."""
+
+    def format_field(self, value: Any, format_spec: str) -> str:
+        if isinstance(value, Mapping):
+            return ", ".join(f"{k}: {format(v, format_spec)}" for k, v in value.items())
+        return format(value, format_spec)
+
+
+_FIELD_FORMATTER = _EventFieldFormatter()
+
+
+class LogEvent:
+    """Deferred message of a structured event; rendered on first str(), i.e. only when emitted."""
+
+    __slots__ = ("event", "template", "fields", "_text")
+
+    def __init__(self, event: str, template: str, fields: Dict[str, Any]) -> None:
+        self.event = event
+        self.template = template
+        self.fields = fields
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            try:
+                body = _FIELD_FORMATTER.vformat(self.template, (), self.fields) if self.template else ""
+            except (KeyError, IndexError, TypeError, ValueError):
+                # A field that does not fit the template must not cost the record
+                body = " | ".join(f"{k}: {v}" for k, v in self.fields.items())
+            self._text = f"{self.event} | {body}" if body else self.event
+        return self._text
+
+
+class _EventSampler:
+    """Per-event sampling (keep a fraction) and rate limits (max records/second) below WARNING."""
+
+    def __init__(self, sampling: Mapping[str, float], rate_limits: Mapping[str, float]) -> None:
+        self.sampling = {k: min(1.0, max(0.0, float(v))) for k, v in sampling.items()}
+        self.rate_limits = {k: float(v) for k, v in rate_limits.items() if float(v) > 0}
+        self.suppressed: Dict[str, int] = {}
+        self._seen: Dict[str, int] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, event: str, level: int) -> bool:
+        if level >= logging.WARNING or (event not in self.sampling and event not in self.rate_limits):
+            return True
+        with self._lock:
+            rate = self.sampling.get(event)
+            if rate is not None:
+                seen = self._seen.get(event, 0) + 1
+                self._seen[event] = seen
+                # Deterministic 1-in-N: keeps the first event, then every time the quota ticks over
+                if math.ceil(seen * rate) == math.ceil((seen - 1) * rate):
+                    return self._suppress(event)
+            limit = self.rate_limits.get(event)
+            if limit is not None:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(event, (max(1.0, limit), now))
+                tokens = min(max(1.0, limit), tokens + (now - last) * limit)
+                if tokens < 1.0:
+                    self._buckets[event] = (tokens, now)
+                    return self._suppress(event)
+                self._buckets[event] = (tokens - 1.0, now)
+        return True
+
+    def _suppress(self, event: str) -> bool:
+        self.suppressed[event] = self.suppressed.get(event, 0) + 1
+        return False
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record; structured events carry their raw fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event_tag", None),
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "event_fields", None)
+        if fields:
+            data["fields"] = fields
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+def log_event(
+    logger: logging.Logger,
+    level: int,
+    event: str,
+    template: str = "",
+    /,
+    *,
+    event_tag: Optional[str] = None,
+    **fields: Any,
+) -> None:
+    """
+    Log a structured event whose message is rendered lazily.
+
+    Args:
+        logger: Logger to emit on.
+        level: logging level (e.g. logging.INFO).
+        event: Event name; prefixes the message and keys sampling/rate limits.
+        template: str.format template over the fields (mappings render as `k: v, ...`).
+        event_tag: Record event_tag, if different from the event name.
+        **fields: Event fields, kept unrendered for the JSON-lines sink.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    sampler = _sampler
+    if sampler is not None and not sampler.allow(event, level):
+        return
+    logger.log(
+        level,
+        LogEvent(event, template, fields),
+        extra={"event_tag": event_tag or event, "event_fields": fields},
+        stacklevel=2,
+    )
+
+
 def _ensure_parent(path: Path) -> None:
     """Create parent directories for the given file path."""
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -44,12 +249,20 @@ def setup_logging(config: Dict[str, Any], reset_existing: bool = True, log_base_
     Returns:
         Configured package logger.
     """
+    global _sampler
     logger = logging.getLogger("hw4_tourguide")
     logger.setLevel(_parse_level(config.get("level", "INFO")))
     logger.propagate = False
 
     if reset_existing:
+        shutdown_logging()
         logger.handlers.clear()
+        for handler in _module_handlers:
+            for logger_names in MODULE_LOGGERS.values():
+                for logger_name in logger_names:
+                    logging.getLogger(f"hw4_tourguide.{logger_name}").removeHandler(handler)
+            handler.close()
+        _module_handlers.clear()
 
     fmt = config.get(
         "format",
@@ -57,6 +270,9 @@ def setup_logging(config: Dict[str, Any], reset_existing: bool = True, log_base_
     )
     formatter = logging.Formatter(fmt)
     filter_with_tag = _EventTagFilter()
+    async_cfg = config.get("async_logging", {})
+    use_queue = bool(async_cfg.get("enabled", False))
+    handlers: List[logging.Handler] = []
 
     # Main rotating file handler
     if log_base_dir:
@@ -72,7 +288,7 @@ def setup_logging(config: Dict[str, Any], reset_existing: bool = True, log_base_
     )
     main_handler.setFormatter(formatter)
     main_handler.addFilter(filter_with_tag)
-    logger.addHandler(main_handler)
+    handlers.append(main_handler)
 
     # Error-only handler (file)
     if log_base_dir:
@@ -89,28 +305,112 @@ def setup_logging(config: Dict[str, Any], reset_existing: bool = True, log_base_
     error_handler.setLevel(logging.WARNING)
     error_handler.setFormatter(formatter)
     error_handler.addFilter(filter_with_tag)
-    logger.addHandler(error_handler)
+    handlers.append(error_handler)
 
     # Optional console handler
     if config.get("console_enabled", True):
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
         console_handler.addFilter(filter_with_tag)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+
+    # Structured events: sampling and JSON-lines sink
+    events_cfg = config.get("events", {})
+    sampling = events_cfg.get("sampling") or {}
+    rate_limits = events_cfg.get("rate_limits") or {}
+    _sampler = _EventSampler(sampling, rate_limits) if (sampling or rate_limits) else None
+    jsonl_file = events_cfg.get("jsonl_file", "")
+    if jsonl_file:
+        jsonl_path = log_base_dir / "logs" / Path(jsonl_file).name if log_base_dir else Path(jsonl_file)
+        _ensure_parent(jsonl_path)
+        jsonl_handler = RotatingFileHandler(
+            filename=jsonl_path,
+            maxBytes=int(config.get("max_file_size_mb", 10)) * 1024 * 1024,
+            backupCount=int(config.get("backup_count", 5)),
+            encoding="utf-8",
+        )
+        jsonl_handler.setFormatter(_JsonLinesFormatter())
+        jsonl_handler.addFilter(filter_with_tag)
+        handlers.append(jsonl_handler)
 
     # Module-specific log files (agents, judge, apis, route_provider)
     modules_config = config.get("modules", {})
-    _setup_module_loggers(modules_config, formatter, filter_with_tag, log_base_dir)
+    module_handlers = _setup_module_loggers(
+        modules_config, formatter, filter_with_tag, log_base_dir, attach=not use_queue
+    )
+
+    if use_queue:
+        _start_listener(
+            logger,
+            handlers + module_handlers,
+            queue_size=int(async_cfg.get("queue_size", 10000)),
+            block_timeout=float(async_cfg.get("block_timeout", 1.0)),
+        )
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     return logger
 
 
+def _start_listener(
+    logger: logging.Logger, handlers: List[logging.Handler], queue_size: int, block_timeout: float
+) -> None:
+    """Route the package logger through a bounded queue drained by one listener thread."""
+    global _listener, _queue_handler, _atexit_registered
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max(1, queue_size))
+    _queue_handler = _DroppingQueueHandler(log_queue, block_timeout=block_timeout)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    logger.addHandler(_queue_handler)
+    if not _atexit_registered:
+        atexit.register(shutdown_logging)
+        _atexit_registered = True
+
+
+def flush_logging() -> None:
+    """Block until every queued record has been written (no-op for synchronous logging)."""
+    if _listener is not None and _listener._thread is not None:
+        _listener.queue.join()
+    for handler in logging.getLogger("hw4_tourguide").handlers:
+        handler.flush()
+
+
+def shutdown_logging() -> None:
+    """Drain the queue, stop the listener thread and close its handlers."""
+    global _listener, _queue_handler
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    if listener._thread is not None:
+        listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    if _queue_handler is not None:
+        logging.getLogger("hw4_tourguide").removeHandler(_queue_handler)
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Queue state of the async logging pipeline (dropped records, depth) and per-event sampled-out counts."""
+    sampled_out = dict(_sampler.suppressed) if _sampler is not None else {}
+    if _queue_handler is None:
+        return {"async": False, "dropped": 0, "queue_depth": 0, "queue_size": 0, "sampled_out": sampled_out}
+    return {
+        "async": _listener is not None,
+        "dropped": _queue_handler.dropped,
+        "queue_depth": _queue_handler.queue.qsize(),
+        "queue_size": _queue_handler.queue.maxsize,
+        "sampled_out": sampled_out,
+    }
+
+
 def _setup_module_loggers(
     modules_config: Dict[str, Any],
     formatter: logging.Formatter,
     filter_with_tag: _EventTagFilter,
-    log_base_dir: Optional[Path] = None
-) -> None:
+    log_base_dir: Optional[Path] = None,
+    attach: bool = True,
+) -> List[logging.Handler]:
     """
     Set up module-specific loggers with dedicated log files.
 
@@ -119,15 +419,14 @@ def _setup_module_loggers(
         formatter: Log formatter to use
         filter_with_tag: Event tag filter to apply
         log_base_dir: Optional base directory for log files
-    """
-    module_mappings = {
-        "agents": ["agent.video", "agent.song", "agent.knowledge"],
-        "judge": ["judge"],
-        "apis": ["api"],
-        "route_provider": ["route_provider.google", "route_provider.cached", "route_provider.live"],
-    }
+        attach: Attach handlers to the module loggers. When False (queue mode)
+                they get a logger-name filter and run on the queue listener.
 
-    for module_key, logger_names in module_mappings.items():
+    Returns:
+        The created handlers.
+    """
+    created: List[logging.Handler] = []
+    for module_key, logger_names in MODULE_LOGGERS.items():
         module_cfg = modules_config.get(module_key, {})
         if not module_cfg.get("enabled", True):
             continue
@@ -152,14 +451,21 @@ def _setup_module_loggers(
         handler.setLevel(level)
         handler.setFormatter(formatter)
         handler.addFilter(filter_with_tag)
+        created.append(handler)
+
+        if not attach:
+            handler.addFilter(_LoggerPrefixFilter([f"hw4_tourguide.{name}" for name in logger_names]))
+            continue
 
         # Attach handler to each module logger
+        _module_handlers.append(handler)
         for logger_name in logger_names:
             full_name = f"hw4_tourguide.{logger_name}"
             child_logger = logging.getLogger(full_name)
             # Don't propagate to parent to avoid duplicate log entries
             child_logger.propagate = True  # Keep propagation for system.log
             child_logger.addHandler(handler)
+    return created
 
 
 def get_logger(name: Optional[str] = None) -> logging.Logger:
@@ -4,13 +4,15 @@ Consumes queued tasks, dispatches workers, runs agents concurrently per task,
 calls judge, aggregates results, and optionally writes checkpoints/metrics.
 """
 
+import logging
 import time
 import threading
-from concurrent.futures import ThreadPoolExecutor, Future
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, Future, wait
 from queue import Queue
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Set
 
-from hw4_tourguide.logger import get_logger
+from hw4_tourguide import tracing
+from hw4_tourguide.logger import get_logger, log_event
 from hw4_tourguide.file_interface import CheckpointWriter
 from hw4_tourguide.validators import Validator
 
@@ -24,6 +26,9 @@ class Orchestrator:
         max_workers: int = 5,
         checkpoint_writer: Optional[CheckpointWriter] = None,
         metrics: Optional[Any] = None,
+        enrichment_cache: Optional[Any] = None,
+        max_in_flight: Optional[int] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
     ):
         self.queue = queue
         self.agents = agents
@@ -31,8 +36,13 @@ class Orchestrator:
         self.max_workers = max_workers
         self.checkpoint_writer = checkpoint_writer
         self.metrics = metrics
+        self.enrichment_cache = enrichment_cache
+        # Window: stop pulling new tasks while this many are still being processed
+        self.max_in_flight = max_in_flight
+        # Streaming sink called with each step result as soon as it completes
+        self.on_result = on_result
         self.logger = get_logger("orchestrator")
-        self.validator = Validator()
+        self.validator = Validator(metrics=metrics)
 
         # Log orchestrator initialization
         self.logger.info(
@@ -42,8 +52,16 @@ class Orchestrator:
         )
 
     def run(self) -> List[Dict[str, Any]]:
+        """
+        Process queued tasks until the sentinel arrives.
+
+        Returns every step result in submission order. When `on_result` is set,
+        results are handed to the sink as they finish and are not retained, so
+        the returned list is empty.
+        """
         results: List[Dict[str, Any]] = []
         futures: List[Future] = []
+        in_flight: Set[Future] = set()
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             while True:
                 task = self.queue.get()
@@ -52,13 +70,22 @@ class Orchestrator:
                 tid = task.get("transaction_id", "unknown_tid")
                 step = task.get("step_number", "?")
                 queue_depth = self.queue.qsize()
-                self.logger.info(
-                    f"Orchestrator_Task_Start | TID: {tid} | Step {step} | Queue Depth: {queue_depth} | "
-                    f"thread={threading.current_thread().name}",
-                    extra={"event_tag": "Orchestrator_Task_Start", "transaction_id": tid, "queue_depth": queue_depth}
+                log_event(
+                    self.logger, logging.INFO, "Orchestrator_Task_Start",
+                    "TID: {transaction_id} | Step {step} | Queue Depth: {queue_depth} | thread={thread}",
+                    transaction_id=tid, step=step, queue_depth=queue_depth, thread=threading.current_thread().name,
                 )
                 self._record_metrics(queue_depth=queue_depth)
-                futures.append(executor.submit(self._process_task, task))
+                future = executor.submit(tracing.wrap(self._process_task), task)
+                if self.on_result:
+                    future.add_done_callback(self._emit_result)
+                else:
+                    futures.append(future)
+                if self.max_in_flight:
+                    in_flight = {f for f in in_flight if not f.done()}
+                    in_flight.add(future)
+                    while len(in_flight) >= self.max_in_flight:
+                        _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
 
             for future in futures:
                 try:
@@ -72,18 +99,39 @@ class Orchestrator:
         return results
 
     def _process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        emitted = task.get("emit_timestamp")
+        with tracing.span(
+            "step",
+            transaction_id=task.get("transaction_id", "unknown_tid"),
+            step=task.get("step_number"),
+            location=task.get("location_name"),
+            queue_wait_ms=round((time.time() - emitted) * 1000, 3) if emitted else 0.0,
+        ) as step_span:
+            result = self._run_step(task, step_span)
+            if step_span:
+                step_span.set(chosen_agent=(result.get("judge") or {}).get("chosen_agent"))
+            return result
+
+    def _run_step(self, task: Dict[str, Any], step_span: Optional[Any] = None) -> Dict[str, Any]:
         agent_outputs: Dict[str, Any] = {}
         start = time.time()
         transaction_id = task.get("transaction_id", "unknown_tid")
 
-        self.logger.info(
-            f"Orchestrator_Agents_Dispatch | TID: {transaction_id} | Dispatching {len(self.agents)} agents in parallel",
-            extra={"event_tag": "Orchestrator_Agents_Dispatch", "transaction_id": transaction_id, "agent_count": len(self.agents)}
+        cached = self.enrichment_cache.lookup(task) if self.enrichment_cache else None
+        if cached is not None:
+            if step_span:
+                step_span.set(enrichment_cache="hit")
+            return self._finish_task(task, cached["agents"], cached["judge"], start, reused_from=cached["source"])
+
+        log_event(
+            self.logger, logging.INFO, "Orchestrator_Agents_Dispatch",
+            "TID: {transaction_id} | Dispatching {agent_count} agents in parallel",
+            transaction_id=transaction_id, agent_count=len(self.agents),
         )
 
         with ThreadPoolExecutor(max_workers=len(self.agents)) as agent_executor:
             future_map = {
-                agent_executor.submit(agent.run, task): name
+                agent_executor.submit(tracing.wrap(agent.run), task): name
                 for name, agent in self.agents.items()
             }
             for future in future_map:
@@ -107,18 +155,34 @@ class Orchestrator:
         # Log agent completion summary
         agent_time_ms = (time.time() - start) * 1000
         successful_agents = sum(1 for r in agent_outputs.values() if r.get("status") == "ok")
-        self.logger.info(
-            f"Orchestrator_Agents_Complete | TID: {transaction_id} | All agents finished | "
-            f"Success: {successful_agents}/{len(self.agents)} | Time: {agent_time_ms:.0f}ms",
-            extra={"event_tag": "Orchestrator_Agents_Complete", "transaction_id": transaction_id, "agent_time_ms": agent_time_ms, "successful_agents": successful_agents}
+        log_event(
+            self.logger, logging.INFO, "Orchestrator_Agents_Complete",
+            "TID: {transaction_id} | All agents finished | Success: {successful_agents}/{agent_count} | "
+            "Time: {agent_time_ms:.0f}ms",
+            transaction_id=transaction_id, successful_agents=successful_agents, agent_count=len(self.agents),
+            agent_time_ms=agent_time_ms,
         )
 
         agent_results_list = list(agent_outputs.values())
         # Validate agent results (best-effort; drop malformed)
         agent_results_list = self.validator.validate_agent_results(agent_results_list)
-        judge_decision = self.judge.evaluate(task, agent_results_list)
+        with tracing.span("judge", scoring_mode=getattr(self.judge, "scoring_mode", None)):
+            judge_decision = self.judge.evaluate(task, agent_results_list)
         # Validate judge decision (best-effort logging)
         judge_decision = self.validator.validate_judge_decision(judge_decision)
+        if self.enrichment_cache:
+            self.enrichment_cache.store_result(task, agent_outputs, judge_decision)
+        return self._finish_task(task, agent_outputs, judge_decision, start)
+
+    def _finish_task(
+        self,
+        task: Dict[str, Any],
+        agent_outputs: Dict[str, Any],
+        judge_decision: Dict[str, Any],
+        start: float,
+        reused_from: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        transaction_id = task.get("transaction_id", "unknown_tid")
         result = {
             "transaction_id": transaction_id,
             "step_number": task.get("step_number"),
@@ -129,12 +193,13 @@ class Orchestrator:
             "timestamp": task.get("timestamp"),
             "emit_timestamp": task.get("emit_timestamp"),
         }
+        if reused_from is not None:
+            result["enrichment_cache"] = reused_from
 
-        if self.checkpoint_writer:
+        stage = f"04_judge_decision_step_{task.get('step_number')}.json"
+        if self.checkpoint_writer and self.checkpoint_writer.should_write(transaction_id, stage):
             try:
-                self.checkpoint_writer.write(
-                    transaction_id, f"04_judge_decision_step_{task.get('step_number')}.json", result
-                )
+                self.checkpoint_writer.write(transaction_id, stage, result)
             except Exception:  # pragma: no cover
                 self.logger.warning(
                     "Failed to write judge checkpoint",
@@ -144,15 +209,26 @@ class Orchestrator:
         # Log overall task completion
         total_time_ms = (time.time() - start) * 1000
         queue_depth = self.queue.qsize()
-        self.logger.info(
-            f"Orchestrator_Task_Complete | TID: {transaction_id} | Step {task.get('step_number')} | "
-            f"Total Time: {total_time_ms:.0f}ms | Queue Depth: {queue_depth}",
-            extra={"event_tag": "Orchestrator_Task_Complete", "transaction_id": transaction_id, "task_time_ms": total_time_ms, "queue_depth": queue_depth}
+        log_event(
+            self.logger, logging.INFO, "Orchestrator_Task_Complete",
+            "TID: {transaction_id} | Step {step} | Total Time: {task_time_ms:.0f}ms | Queue Depth: {queue_depth}",
+            transaction_id=transaction_id, step=task.get("step_number"), task_time_ms=total_time_ms,
+            queue_depth=queue_depth,
         )
 
         self._record_metrics(queue_depth=queue_depth, latency=time.time() - start)
         return result
 
+    def _emit_result(self, future: Future) -> None:
+        exc = future.exception()
+        if exc is not None:  # pragma: no cover
+            self.logger.error(f"Worker failed: {exc}", extra={"event_tag": "Error"})
+            return
+        try:
+            self.on_result(future.result())
+        except Exception as exc:  # pragma: no cover - sink failures must not stop the run
+            self.logger.warning(f"Result stream sink failed: {exc}", extra={"event_tag": "Error"})
+
     def _record_metrics(self, queue_depth: int, latency: Optional[float] = None) -> None:
         if not self.metrics:
             return
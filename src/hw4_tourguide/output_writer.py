@@ -5,12 +5,20 @@ Writes JSON, Markdown report, and CSV export of enriched route steps.
 
 import json
 import csv
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime # Added import
 
 from hw4_tourguide.logger import get_logger
-from hw4_tourguide.file_interface import CheckpointWriter
+from hw4_tourguide.file_interface import CheckpointWriter, JsonListStream
+
+
+def _in_step_order(steps: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    """Sort in-memory step lists; streamed sources already yield in step order."""
+    if isinstance(steps, list):
+        return sorted(steps, key=lambda s: s.get("step_number", 0))
+    return steps
 
 
 class OutputWriter:
@@ -32,9 +40,21 @@ class OutputWriter:
         self.report_path.parent.mkdir(parents=True, exist_ok=True)
         self.csv_path.parent.mkdir(parents=True, exist_ok=True)
 
-    def write_json(self, steps: List[Dict[str, Any]]) -> Path:
+    def write_json(self, steps: Iterable[Dict[str, Any]]) -> Path:
         """Writes the aggregated route steps to a JSON file."""
-        steps = sorted(steps, key=lambda s: s.get("step_number", 0))
+        if not isinstance(steps, list):
+            # Streamed steps (long routes) are written one at a time and get no
+            # 05_final_output checkpoint, which would need the whole list again.
+            stream = JsonListStream(self.json_path)
+            for step in steps:
+                stream.append(step)
+            stream.close()
+            self.logger.info(
+                f"WROTE JSON | {self.json_path}",
+                extra={"event_tag": "Output"},
+            )
+            return self.json_path
+        steps = _in_step_order(steps)
         self.json_path.write_text(json.dumps(steps, indent=2))
         self.logger.info(
             f"WROTE JSON | {self.json_path}",
@@ -42,7 +62,9 @@ class OutputWriter:
         )
 
         # Also write the final aggregated result as a checkpoint
-        if self.checkpoint_writer and steps:
+        if self.checkpoint_writer and steps and self.checkpoint_writer.should_write(
+            steps[0].get("transaction_id", "overall_route"), "05_final_output.json"
+        ):
             # Assuming all steps have the same transaction_id for the whole route
             # or we need to write one checkpoint per step, but the mission implies
             # a final_output.json for the whole route.
@@ -65,14 +87,16 @@ class OutputWriter:
 
         return self.json_path
 
-    def write_report(self, steps: List[Dict[str, Any]]) -> Path:
+    def write_report(self, steps: Iterable[Dict[str, Any]]) -> Path:
         """Generates a human-friendly Markdown summary report."""
-        steps = sorted(steps, key=lambda s: s.get("step_number", 0))
-        report_content = ["# Tour Guide System Report\n"]
+        handle = open(self.report_path, "w", encoding="utf-8")
+        handle.write("# Tour Guide System Report\n")
         # Changed to use datetime.now() for robustness in testing
-        report_content.append(f"Generated on: {datetime.now().isoformat()}\n") 
+        handle.write(f"Generated on: {datetime.now().isoformat()}\n")
 
-        for i, step in enumerate(steps):
+        for i, step in enumerate(_in_step_order(steps)):
+            # One step's lines are buffered, then flushed, so long routes stay bounded
+            report_content: List[str] = []
             report_content.append(f"## Step {i+1}: {step.get('location', 'Unknown Location')}\n")
             report_content.append(f"Instructions: {step.get('instructions', 'N/A')}\n")
             
@@ -94,17 +118,18 @@ class OutputWriter:
                 report_content.append("No suitable content found for this step.\n")
             
             report_content.append("\n---\n") # Separator between steps
+            handle.write("".join(report_content))
 
-        self.report_path.write_text("".join(report_content))
+        handle.close()
         self.logger.info(
             f"WROTE Markdown Report | {self.report_path}",
             extra={"event_tag": "Output"},
         )
         return self.report_path
 
-    def write_csv(self, steps: List[Dict[str, Any]]) -> Path:
+    def write_csv(self, steps: Iterable[Dict[str, Any]]) -> Path:
         """Generates a tabular CSV export for tour guides."""
-        steps = sorted(steps, key=lambda s: s.get("step_number", 0))
+        steps = _in_step_order(steps)
         headers = [
             "location",
             "video_title", "video_url", "video_score",
@@ -152,3 +177,41 @@ class OutputWriter:
             extra={"event_tag": "Output"},
         )
         return self.csv_path
+
+
+class StepStreamWriter:
+    """Appends each finished step as one JSON line as soon as it completes (long routes)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text("")
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def write(self, step: Dict[str, Any]) -> None:
+        line = json.dumps(step, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+            self.count += 1
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Yield the streamed steps in step order, loading one line at a time.
+
+        Only (step_number, offset) pairs are held in memory, so the end-of-run
+        outputs can be built without reading the whole file back.
+        """
+        offsets: List[Tuple[int, int]] = []
+        with self._lock:
+            with open(self.path, "rb") as handle:
+                offset = 0
+                for line in handle:
+                    if line.strip():
+                        offsets.append((json.loads(line).get("step_number") or 0, offset))
+                    offset += len(line)
+        offsets.sort()
+        with open(self.path, "rb") as handle:
+            for _, offset in offsets:
+                handle.seek(offset)
+                yield json.loads(handle.readline())
@@ -0,0 +1,277 @@
+"""
+Route corpus (indexed store of recorded routes).
+
+Recorded routes live as JSON files in the route cache directory, alongside an
+`index.json` that maps a normalized "origin|destination" key to its file, so a
+lookup is a dict access instead of a directory scan. Matching falls through:
+1. exact match on the normalized key;
+2. fuzzy match (difflib ratio >= `fuzzy_threshold` on the combined key), only
+   when the caller opts in (`fuzzy=True`, cached mode) and only between keys
+   whose short qualifiers (state codes, numbers) agree, so "Portland OR" never
+   matches "Portland ME";
+3. geocoded match, when origin/destination are "lat,lng" literals, against
+   the recorded start/end coordinates within `geo_radius_m`.
+Live mode never uses fuzzy matches: a near miss there would silently replace
+the Directions call with another city's route.
+Live Directions results are written back with a TTL as `live_<hash>.json`
+(gitignored, unlike the hand-recorded routes next to them). Hand-recorded
+files that are not in the index yet are indexed once from their metadata and
+persisted as `legacy` entries that never expire, so later processes only
+parse files they have not seen. Expiry is checked on the matched entry only.
+Index updates re-read `index.json` under an exclusive lock file and merge
+before the atomic rename, so concurrent processes never drop each other's
+entries.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from hw4_tourguide.logger import get_logger
+from hw4_tourguide.tools.spatial_store import haversine_m
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: thread lock only
+    fcntl = None
+
+INDEX_FILENAME = "index.json"
+LOCK_FILENAME = ".index.lock"
+_DROP_TOKENS = {"usa", "us", "united", "states"}
+_STATE_CODES = set(
+    "al ak az ar ca co ct de dc fl ga hi id il in ia ks ky la me md ma mi mn ms mo mt ne nv nh nj nm ny "
+    "nc nd oh ok or pa ri sc sd tn tx ut vt va wa wv wi wy".split()
+)
+_COORD_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def normalize_place(text: Optional[str]) -> str:
+    """Lowercase, strip punctuation and country suffixes, collapse whitespace."""
+    tokens = re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).split()
+    return " ".join(t for t in tokens if t not in _DROP_TOKENS)
+
+
+def parse_coordinates(text: Optional[str]) -> Optional[Tuple[float, float]]:
+    match = _COORD_RE.match(text or "")
+    if not match:
+        return None
+    return float(match.group(1)), float(match.group(2))
+
+
+def route_key(origin: str, destination: str) -> str:
+    return f"{normalize_place(origin)}|{normalize_place(destination)}"
+
+
+def _is_fresh(entry: Dict[str, Any], now: float) -> bool:
+    return entry.get("expires_at") is None or entry["expires_at"] > now
+
+
+def _qualifiers(key: str) -> Tuple[frozenset, ...]:
+    """Per side: the trailing state code and numeric tokens (zips, street numbers) a fuzzy match must keep."""
+    qualifiers = []
+    for side in key.split("|"):
+        tokens = side.split()
+        found = {t for t in tokens if any(c.isdigit() for c in t)}
+        if len(tokens) > 1 and tokens[-1] in _STATE_CODES:
+            found.add(tokens[-1])
+        qualifiers.append(frozenset(found))
+    return tuple(qualifiers)
+
+
+class RouteCorpus:
+    def __init__(
+        self,
+        directory: Path = Path("data/routes"),
+        fuzzy_threshold: float = 0.85,
+        geo_radius_m: float = 250.0,
+        time_func: Any = time.time,
+    ) -> None:
+        self.directory = Path(directory)
+        self.fuzzy_threshold = float(fuzzy_threshold)
+        self.geo_radius_m = float(geo_radius_m)
+        self._time = time_func
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self.logger = get_logger("route_corpus")
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / INDEX_FILENAME
+
+    # --- Lookup ---
+    def lookup(self, origin: str, destination: str, fuzzy: bool = False) -> Optional[Tuple[Path, Dict[str, Any]]]:
+        """Return (route file, index entry) for the best fresh match, or None. Fuzzy matching is opt-in."""
+        index = self._load_index()
+        now = self._time()
+        key = route_key(origin, destination)
+
+        entry, match = index.get(key), "exact"
+        if entry is not None and not _is_fresh(entry, now):
+            entry = None
+        if entry is None and (fuzzy or parse_coordinates(origin)):
+            # Fallbacks scan the index, so they only run when they can match at all
+            fresh = {k: e for k, e in index.items() if _is_fresh(e, now)}
+            if fuzzy:
+                entry, match = self._fuzzy_match(key, fresh), "fuzzy"
+            if entry is None:
+                entry, match = self._geo_match(origin, destination, fresh), "geocoded"
+        if entry is None:
+            return None
+        path = self.directory / entry["file"]
+        if not path.exists():
+            return None
+        self.logger.info(
+            f"Route_Corpus_Hit | Match: {match} | Query: \"{origin}\" -> \"{destination}\" | "
+            f"Route: \"{entry.get('origin')}\" -> \"{entry.get('destination')}\" | File: {entry['file']}",
+            extra={"event_tag": "Route_Corpus", "match": match},
+        )
+        return path, entry
+
+    def load(self, origin: str, destination: str, fuzzy: bool = False) -> Optional[Dict[str, Any]]:
+        found = self.lookup(origin, destination, fuzzy=fuzzy)
+        if found is None:
+            return None
+        try:
+            return json.loads(found[0].read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    # --- Write-back ---
+    def store(self, origin: str, destination: str, payload: Dict[str, Any], ttl_seconds: Optional[float] = None) -> Path:
+        """Persist a route payload and index it under its normalized key."""
+        key = route_key(origin, destination)
+        filename = f"live_{hashlib.sha1(key.encode()).hexdigest()[:12]}.json"
+        metadata = payload.get("metadata", {})
+        now = self._time()
+        entry = {
+            "file": filename,
+            "origin": origin,
+            "destination": destination,
+            "created_at": now,
+            "expires_at": now + ttl_seconds if ttl_seconds else None,
+            "start_location": metadata.get("start_location"),
+            "end_location": metadata.get("end_location"),
+        }
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._atomic_write(self.directory / filename, payload)
+            self._merge_index_locked({key: entry}, replace=True)
+        return self.directory / filename
+
+    # --- Internals ---
+    def _fuzzy_match(self, key: str, entries: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        qualifiers = _qualifiers(key)
+        candidates = [k for k in entries if _qualifiers(k) == qualifiers]
+        close = difflib.get_close_matches(key, candidates, n=1, cutoff=self.fuzzy_threshold)
+        return entries[close[0]] if close else None
+
+    def _geo_match(self, origin: str, destination: str, entries: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        start, end = parse_coordinates(origin), parse_coordinates(destination)
+        if start is None or end is None:
+            return None
+        best, best_distance = None, None
+        for entry in entries.values():
+            s, e = entry.get("start_location") or {}, entry.get("end_location") or {}
+            if s.get("lat") is None or e.get("lat") is None:
+                continue
+            distance = max(haversine_m(start[0], start[1], s["lat"], s["lng"]), haversine_m(end[0], end[1], e["lat"], e["lng"]))
+            if distance <= self.geo_radius_m and (best_distance is None or distance < best_distance):
+                best, best_distance = entry, distance
+        return best
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return self._load_index_locked()
+
+    def _load_index_locked(self) -> Dict[str, Dict[str, Any]]:
+        if self._index is not None:
+            return self._index
+        index = self._read_index_file()
+        # Index hand-recorded route files from their own metadata, once
+        indexed_files = {e.get("file") for e in index.values()}
+        legacy: Dict[str, Dict[str, Any]] = {}
+        if self.directory.exists():
+            for path in sorted(self.directory.glob("*.json")):
+                if path.name == INDEX_FILENAME or path.name in indexed_files:
+                    continue
+                try:
+                    meta = json.loads(path.read_text()).get("metadata", {})
+                except (OSError, json.JSONDecodeError, AttributeError):
+                    continue
+                if meta.get("origin") and meta.get("destination"):
+                    legacy.setdefault(
+                        route_key(meta["origin"], meta["destination"]),
+                        {"file": path.name, "origin": meta["origin"], "destination": meta["destination"],
+                         "expires_at": None, "legacy": True,
+                         "start_location": meta.get("start_location"), "end_location": meta.get("end_location")},
+                    )
+        self._index = index
+        if legacy:
+            try:
+                self._merge_index_locked(legacy, replace=False)
+            except OSError as exc:
+                # Read-only route directories still work; they are just re-indexed next time
+                for key, entry in legacy.items():
+                    index.setdefault(key, entry)
+                self.logger.warning(
+                    f"Route_Corpus | Could not persist index {self.index_path}: {exc}",
+                    extra={"event_tag": "Route_Corpus"},
+                )
+        return self._index
+
+    def _read_index_file(self) -> Dict[str, Dict[str, Any]]:
+        if not self.index_path.exists():
+            return {}
+        try:
+            index = json.loads(self.index_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            self.logger.warning(
+                f"Route_Corpus | Index unreadable, rebuilding from files: {self.index_path}",
+                extra={"event_tag": "Route_Corpus"},
+            )
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _merge_index_locked(self, entries: Dict[str, Dict[str, Any]], replace: bool) -> None:
+        """Merge entries into the on-disk index (re-read under the lock file) and adopt the result."""
+        with self._index_file_lock():
+            index = self._read_index_file()
+            for key, entry in entries.items():
+                if replace:
+                    index[key] = entry
+                else:
+                    index.setdefault(key, entry)
+            self._atomic_write(self.index_path, index)
+        self._index = index
+
+    @contextmanager
+    def _index_file_lock(self) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / LOCK_FILENAME, "a") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _atomic_write(path: Path, data: Any) -> None:
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as handle:
+                json.dump(data, handle, indent=2)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
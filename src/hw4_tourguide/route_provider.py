@@ -12,13 +12,17 @@ import time
 import hashlib
 import re
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Callable, Iterator, Optional, List, Tuple
 from importlib import resources
 
 import requests
 
+from hw4_tourguide.file_interface import JsonListStream
 from hw4_tourguide.logger import get_logger
+from hw4_tourguide.polyline import assign_steps, sample_polyline, sample_route, thin
+from hw4_tourguide.route_corpus import RouteCorpus
 
 
 class RouteProvider(ABC):
@@ -36,6 +40,105 @@ class RouteProvider(ABC):
         """
 
 
+class ProgressiveTasks:
+    """
+    Route tasks released in step order as soon as each step's geocode resolves.
+
+    Behaves like the task list the Scheduler expects (len + iteration), but
+    iteration blocks only on the next step's own geocode future, so step 1 can
+    be enriched while later steps are still being geocoded. `on_complete`
+    receives the full task list once the last step has been yielded.
+    """
+
+    def __init__(
+        self,
+        futures: List[Future],
+        build_task: Callable[[int, Dict[str, Any]], Dict[str, Any]],
+        on_complete: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ):
+        self._futures = futures
+        self._build_task = build_task
+        self._on_complete = on_complete
+        self.tasks: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for idx, future in enumerate(self._futures):
+            if idx < len(self.tasks):
+                yield self.tasks[idx]
+                continue
+            task = self._build_task(idx, future.result())
+            self.tasks.append(task)
+            yield task
+        if self._on_complete:
+            callback, self._on_complete = self._on_complete, None
+            callback(self.tasks)
+
+
+class WindowedTasks:
+    """
+    Long-route task stream: sample points are geocoded one window at a time
+    (the next window is prefetched while the current one is consumed), and
+    consecutive points that resolve to the same location_name are coalesced
+    into a single task. In-flight geocodes and retained tasks stay
+    proportional to `window_size`: each finished task is handed to `on_task`
+    (e.g. a streamed checkpoint) and then dropped. The number of coalesced
+    steps is unknown until iteration finishes, so there is no `len()`;
+    `count` holds the steps emitted so far and is passed to `on_complete`.
+    """
+
+    def __init__(
+        self,
+        samples: List[Dict[str, Any]],
+        geocode: Callable[[Dict[str, Any]], Dict[str, Any]],
+        build_task: Callable[[int, Dict[str, Any], Dict[str, Any]], Dict[str, Any]],
+        window_size: int = 10,
+        workers: int = 4,
+        on_task: Optional[Callable[[Dict[str, Any]], None]] = None,
+        on_complete: Optional[Callable[[int], None]] = None,
+    ):
+        self._samples = samples
+        self._geocode = geocode
+        self._build_task = build_task
+        self.window_size = max(1, window_size)
+        self.workers = max(1, workers)
+        self._on_task = on_task
+        self._on_complete = on_complete
+        self.count = 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self.count = 0
+        pending: Optional[Dict[str, Any]] = None
+        size = self.window_size
+        with ThreadPoolExecutor(max_workers=min(self.workers, size), thread_name_prefix="geocode") as pool:
+            submit = lambda start: [(sample, pool.submit(self._geocode, sample)) for sample in self._samples[start:start + size]]
+            upcoming = submit(0)
+            for start in range(0, len(self._samples), size):
+                current, upcoming = upcoming, submit(start + size)
+                for sample, future in current:
+                    task = self._build_task(self.count + 1, sample, future.result())
+                    if pending is not None and task["location_name"] == pending["location_name"]:
+                        pending["coalesced_points"] = pending.get("coalesced_points", 1) + 1
+                        continue
+                    if pending is not None:
+                        yield self._emit(pending)
+                    self.count += 1
+                    task["step_number"] = self.count
+                    pending = task
+        if pending is not None:
+            yield self._emit(pending)
+        if self._on_complete:
+            callback, self._on_complete = self._on_complete, None
+            callback(self.count)
+
+    def _emit(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if self._on_task:
+            self._on_task(task)
+        return task
+
+
 class GoogleMapsProvider(RouteProvider):
     def __init__(
         self,
@@ -47,6 +150,17 @@ class GoogleMapsProvider(RouteProvider):
         checkpoint_dir: Path = Path("output/checkpoints"),
         circuit_breaker: Optional[Any] = None,
         metrics: Optional[Any] = None,
+        geocode_cache: Optional[Any] = None,
+        geocode_workers: int = 4,
+        progressive_geocoding: bool = False,
+        route_corpus: Optional[RouteCorpus] = None,
+        corpus_ttl_seconds: Optional[float] = None,
+        long_route: bool = False,
+        sample_every_km: float = 5.0,
+        sample_every_minutes: Optional[float] = None,
+        max_route_points: int = 500,
+        window_size: int = 10,
+        sample_all_routes: bool = False,
     ):
         self.api_key = api_key
         self.retry_attempts = retry_attempts
@@ -59,6 +173,21 @@ class GoogleMapsProvider(RouteProvider):
         self.logger = get_logger("route_provider.live")
         # Cache for geocoding results to avoid duplicate API calls
         self._geocoding_cache: Dict[str, Dict[str, str]] = {}
+        # Optional persistent cache answering nearby points across runs
+        self.geocode_cache = geocode_cache
+        self.geocode_workers = max(1, int(geocode_workers))
+        self.progressive_geocoding = progressive_geocoding
+        # Recorded routes are reused before calling Directions; live results are written back
+        self.route_corpus = route_corpus
+        self.corpus_ttl_seconds = corpus_ttl_seconds
+        # Long-route mode: routes over max_steps are sampled along the polyline and processed in windows
+        self.long_route = long_route
+        self.sample_every_km = float(sample_every_km)
+        self.sample_every_minutes = float(sample_every_minutes) if sample_every_minutes else None
+        self.max_route_points = int(max_route_points)
+        self.window_size = max(1, int(window_size))
+        # Also sample short routes (one point per N km/min instead of one per Directions step)
+        self.sample_all_routes = sample_all_routes
 
         # Log provider initialization
         self.logger.info(
@@ -81,6 +210,11 @@ class GoogleMapsProvider(RouteProvider):
         if not self.api_key:
             raise ValueError("GOOGLE_MAPS_API_KEY is required for live mode")
 
+        recorded = self._load_from_corpus(origin, destination, tid, route_start)
+        if recorded is not None:
+            self._write_checkpoint(recorded, "00_route.json")
+            return recorded
+
         params = {
             "origin": origin,
             "destination": destination,
@@ -136,13 +270,59 @@ class GoogleMapsProvider(RouteProvider):
             raise RuntimeError("Failed to fetch route from Google Maps after retries")
 
         payload = self._convert_response(response_data, origin, destination, tid, route_start)
-        self._write_checkpoint(payload, "00_route.json")
+        if isinstance(payload["tasks"], list):
+            # Progressive/windowed payloads write their checkpoint once the last step is geocoded
+            self._write_checkpoint(payload, "00_route.json")
         return payload
 
+    def _load_from_corpus(self, origin: str, destination: str, tid: str, route_start: float) -> Optional[Dict[str, Any]]:
+        """Re-issue a fresh recorded route under this run's TID, skipping Directions and geocoding."""
+        if self.route_corpus is None:
+            return None
+        try:
+            # Exact / geocoded matches only: a fuzzy near miss would replace Directions with another city's route
+            route_doc = self.route_corpus.load(origin, destination, fuzzy=False)
+        except Exception as exc:
+            self.logger.warning(f"Route corpus lookup failed: {exc}", extra={"event_tag": "Error"})
+            return None
+        if not route_doc or not route_doc.get("tasks"):
+            return None
+        tasks = route_doc["tasks"]
+        if len(tasks) > self.max_steps and not self.long_route:
+            return None
+        now = time.time()
+        metadata = {**route_doc.get("metadata", {}), "transaction_id": tid, "timestamp": now}
+        tasks = [{**task, "transaction_id": tid, "timestamp": now} for task in tasks]
+        self._record_metrics_counter("route_corpus.hits")
+        self.logger.info(
+            f"RouteProvider_Success | TID: {tid} | Steps: {len(tasks)} | Source: route corpus | "
+            f"Total Time: {(time.time() - route_start) * 1000:.0f}ms",
+            extra={"event_tag": "RouteProvider_Success", "transaction_id": tid, "step_count": len(tasks)}
+        )
+        return {"tasks": tasks, "metadata": metadata}
+
+    def _store_in_corpus(self, origin: str, destination: str, payload: Dict[str, Any]) -> None:
+        if self.route_corpus is None:
+            return
+        try:
+            path = self.route_corpus.store(origin, destination, payload, ttl_seconds=self.corpus_ttl_seconds)
+            self.logger.info(f"Route_Corpus_Store | {path}", extra={"event_tag": "Route_Corpus"})
+        except Exception as exc:
+            self.logger.warning(f"Route corpus write-back failed: {exc}", extra={"event_tag": "Error"})
+
+    def _record_metrics_counter(self, name: str, value: int = 1) -> None:
+        if not self.metrics:
+            return
+        try:
+            self.metrics.increment_counter(name, value)
+        except Exception:
+            pass
+
     def _reverse_geocode(self, lat: float, lng: float) -> Dict[str, str]:
         """
         Reverse geocode coordinates to get address and location name.
-        Uses caching to avoid duplicate API calls for same coordinates.
+        Uses caching to avoid duplicate API calls for same coordinates; the
+        persistent geocode cache (if configured) also answers nearby points.
 
         Args:
             lat: Latitude
@@ -158,6 +338,19 @@ class GoogleMapsProvider(RouteProvider):
         if cache_key in self._geocoding_cache:
             return self._geocoding_cache[cache_key]
 
+        if self.geocode_cache is not None:
+            try:
+                cached = self.geocode_cache.lookup(lat, lng)
+            except Exception as exc:
+                cached = None
+                self.logger.warning(
+                    f"Geocode cache lookup failed for {cache_key}: {exc}",
+                    extra={"event_tag": "Error"}
+                )
+            if cached is not None:
+                self._geocoding_cache[cache_key] = cached
+                return cached
+
         try:
             params = {
                 "latlng": f"{lat},{lng}",
@@ -196,6 +389,14 @@ class GoogleMapsProvider(RouteProvider):
 
                 # Cache the result
                 self._geocoding_cache[cache_key] = result_dict
+                if self.geocode_cache is not None:
+                    try:
+                        self.geocode_cache.store_result(lat, lng, result_dict)
+                    except Exception as exc:
+                        self.logger.warning(
+                            f"Geocode cache store failed for {cache_key}: {exc}",
+                            extra={"event_tag": "Error"}
+                        )
                 self.logger.debug(f"Geocoded {cache_key} -> {location_name}", extra={"event_tag": "API_Call"})
 
                 return result_dict
@@ -217,6 +418,23 @@ class GoogleMapsProvider(RouteProvider):
             "address": None
         }
 
+    def _report_geocode_cache(self, tid: str) -> None:
+        if self.geocode_cache is None:
+            return
+        hit_rate = self.geocode_cache.hit_rate()
+        if hit_rate is None:
+            return
+        self.logger.info(
+            f"Geocode_Cache | TID: {tid} | Hits: {self.geocode_cache.hits} | Misses: {self.geocode_cache.misses} | "
+            f"Hit Rate: {hit_rate:.0%}",
+            extra={"event_tag": "Geocode_Cache", "transaction_id": tid, "hit_rate": hit_rate}
+        )
+        if self.metrics:
+            try:
+                self.metrics.set_gauge("geocode_cache.hit_rate", round(hit_rate, 4))
+            except Exception:
+                pass
+
     def _extract_street_name_fallback(self, html_instructions: str) -> str:
         """
         Extract street name from HTML instructions as fallback.
@@ -262,8 +480,10 @@ class GoogleMapsProvider(RouteProvider):
         steps = legs.get("steps", [])
         num_steps = len(steps)
 
-        # Validate route step count against configured maximum
-        if num_steps > self.max_steps:
+        long_route = self.long_route and (num_steps > self.max_steps or self.sample_all_routes)
+
+        # Validate route step count against configured maximum (long-route mode samples instead)
+        if num_steps > self.max_steps and not long_route:
             self.logger.error(
                 f"Route has {num_steps} steps, exceeds maximum of {self.max_steps}",
                 extra={"event_tag": "Route_Validation"}
@@ -284,14 +504,13 @@ class GoogleMapsProvider(RouteProvider):
             extra={"event_tag": "Route_Processing"}
         )
 
-        tasks: List[Dict[str, Any]] = []
-        for idx, step in enumerate(legs.get("steps", []), start=1):
-            instructions = _strip_html(step.get("html_instructions")) or ""
-            lat = step.get("end_location", {}).get("lat")
-            lng = step.get("end_location", {}).get("lng")
+        step_points = [
+            (step, step.get("end_location", {}).get("lat"), step.get("end_location", {}).get("lng"))
+            for step in steps
+        ]
 
-            # Use reverse geocoding to get high-quality address and location name
-            geocoded = self._reverse_geocode(lat, lng)
+        def _build_task(idx: int, step: Dict[str, Any], lat: Any, lng: Any, geocoded: Dict[str, Any]) -> Dict[str, Any]:
+            instructions = _strip_html(step.get("html_instructions")) or ""
             location_name = geocoded["location_name"]
             address = geocoded["address"]
 
@@ -304,22 +523,20 @@ class GoogleMapsProvider(RouteProvider):
                 location_name = self._extract_street_name_fallback(step.get("html_instructions", ""))
                 address = None
 
-            tasks.append(
-                {
-                    "transaction_id": tid,
-                    "step_number": idx,
-                    "location_name": location_name,
-                    "coordinates": {
-                        "lat": lat,
-                        "lng": lng,
-                    },
-                    "instructions": instructions,
-                    "timestamp": route_timestamp,
-                    "address": address,
-                    "search_hint": f"{location_name}, {route_context}" if route_context else location_name,
-                    "route_context": route_context,
-                }
-            )
+            return {
+                "transaction_id": tid,
+                "step_number": idx,
+                "location_name": location_name,
+                "coordinates": {
+                    "lat": lat,
+                    "lng": lng,
+                },
+                "instructions": instructions,
+                "timestamp": route_timestamp,
+                "address": address,
+                "search_hint": f"{location_name}, {route_context}" if route_context else location_name,
+                "route_context": route_context,
+            }
 
         metadata = {
             "origin": origin,
@@ -329,26 +546,124 @@ class GoogleMapsProvider(RouteProvider):
             "transaction_id": tid,
             "route_context": route_context,
             "timestamp": route_timestamp,
+            "start_location": legs.get("start_location"),
+            "end_location": legs.get("end_location"),
         }
 
-        # Log successful route creation
-        total_time_ms = (time.time() - route_start) * 1000
-        self.logger.info(
-            f"RouteProvider_Success | TID: {tid} | Steps: {len(tasks)} | "
-            f"Distance: {metadata.get('distance')} | Duration: {metadata.get('duration')} | "
-            f"Total Time: {total_time_ms:.0f}ms",
-            extra={"event_tag": "RouteProvider_Success", "transaction_id": tid, "step_count": len(tasks)}
+        def _finish(tasks: List[Dict[str, Any]], step_count: Optional[int] = None) -> None:
+            self._report_geocode_cache(tid)
+            if tasks:
+                self._store_in_corpus(origin, destination, {"tasks": tasks, "metadata": metadata})
+            step_count = len(tasks) if step_count is None else step_count
+
+            # Log successful route creation
+            total_time_ms = (time.time() - route_start) * 1000
+            self.logger.info(
+                f"RouteProvider_Success | TID: {tid} | Steps: {step_count} | "
+                f"Distance: {metadata.get('distance')} | Duration: {metadata.get('duration')} | "
+                f"Total Time: {total_time_ms:.0f}ms",
+                extra={"event_tag": "RouteProvider_Success", "transaction_id": tid, "step_count": step_count}
+            )
+
+        def _on_complete(tasks: List[Dict[str, Any]]) -> None:
+            _finish(tasks)
+            self._write_checkpoint({"tasks": tasks, "metadata": metadata}, "00_route.json")
+
+        if long_route:
+            every_m = self.sample_every_km * 1000 if not self.sample_every_minutes else None
+            every_s = self.sample_every_minutes * 60 if self.sample_every_minutes else None
+            overview = (routes[0].get("overview_polyline") or {}).get("points")
+            if overview and not any((step.get("polyline") or {}).get("points") for step in steps):
+                samples = assign_steps(
+                    sample_polyline(overview, every_m=every_m, every_s=every_s,
+                                    total_seconds=float(legs.get("duration", {}).get("value") or 0.0)),
+                    steps,
+                )
+            else:
+                samples = sample_route(steps, every_m=every_m, every_s=every_s)
+            sampled = thin(samples, self.max_route_points)
+            metadata["long_route"] = {
+                "source_steps": num_steps,
+                "sampled_points": len(sampled),
+                "sample_every_km": None if self.sample_every_minutes else self.sample_every_km,
+                "sample_every_minutes": self.sample_every_minutes,
+                "window_size": self.window_size,
+            }
+            self.logger.info(
+                f"RouteProvider_LongRoute | TID: {tid} | Steps: {num_steps} | Sampled Points: {len(sampled)} "
+                f"(of {len(samples)}) | Window: {self.window_size}",
+                extra={"event_tag": "RouteProvider_LongRoute", "transaction_id": tid, "sampled_points": len(sampled)}
+            )
+            # Long routes are never held in memory as a whole: the route checkpoint is
+            # streamed task by task, and they are not written back to the corpus
+            route_stream: List[JsonListStream] = []
+
+            def _on_task(task: Dict[str, Any]) -> None:
+                if not self.checkpoints_enabled:
+                    return
+                if not route_stream:
+                    route_stream.append(self._open_checkpoint_stream(tid, "00_route.json", metadata))
+                route_stream[0].append(task)
+
+            def _on_windowed_complete(count: int) -> None:
+                _finish([], count)
+                if self.checkpoints_enabled:
+                    stream = route_stream[0] if route_stream else self._open_checkpoint_stream(tid, "00_route.json", metadata)
+                    self._close_checkpoint_stream(stream)
+
+            windowed = WindowedTasks(
+                sampled,
+                geocode=lambda sample: self._reverse_geocode(sample["lat"], sample["lng"]),
+                build_task=lambda idx, sample, geocoded: _build_task(
+                    idx, steps[sample["step_index"]], sample["lat"], sample["lng"], geocoded
+                ),
+                window_size=self.window_size,
+                workers=self.geocode_workers,
+                on_task=_on_task,
+                on_complete=_on_windowed_complete,
+            )
+            return {"tasks": windowed, "metadata": metadata}
+
+        # Geocode all steps concurrently (bounded); results are consumed in step order
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(self.geocode_workers, num_steps or 1)), thread_name_prefix="geocode"
         )
+        futures = [executor.submit(self._reverse_geocode, lat, lng) for _, lat, lng in step_points]
+        executor.shutdown(wait=False)
+
+        if self.progressive_geocoding:
+            return {
+                "tasks": ProgressiveTasks(
+                    futures,
+                    lambda i, geocoded: _build_task(i + 1, *step_points[i], geocoded),
+                    on_complete=_on_complete,
+                ),
+                "metadata": metadata,
+            }
 
+        tasks: List[Dict[str, Any]] = [
+            _build_task(idx, step, lat, lng, future.result())
+            for idx, ((step, lat, lng), future) in enumerate(zip(step_points, futures), start=1)
+        ]
+        _finish(tasks)
         return {"tasks": tasks, "metadata": metadata}
 
+    def _open_checkpoint_stream(self, tid: str, filename: str, metadata: Dict[str, Any]) -> JsonListStream:
+        return JsonListStream(self.checkpoint_dir / tid / filename, key="tasks", fields={"metadata": metadata})
+
+    def _close_checkpoint_stream(self, stream: JsonListStream) -> None:
+        self._record_metrics_counter("checkpoint.bytes_written", stream.close())
+        self.logger.info(f"Wrote checkpoint {stream.path}", extra={"event_tag": "Checkpoint"})
+
     def _write_checkpoint(self, payload: Dict[str, Any], filename: str) -> None:
         if not self.checkpoints_enabled:
             return
         tid = payload.get("metadata", {}).get("transaction_id", "unknown_tid")
         path = self.checkpoint_dir / tid / filename
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(payload, indent=2))
+        text = json.dumps(payload, indent=2)
+        path.write_text(text)
+        self._record_metrics_counter("checkpoint.bytes_written", len(text.encode("utf-8")))
         self.logger.info(f"Wrote checkpoint {path}", extra={"event_tag": "Checkpoint"})
 
     def _call_with_breaker(self, func):
@@ -376,9 +691,15 @@ class CachedRouteProvider(RouteProvider):
         checkpoints_enabled: bool = True,
         checkpoint_dir: Path = Path("output/checkpoints"),
         route_file: Optional[Path] = None,
+        corpus: Optional[RouteCorpus] = None,
+        strict_match: bool = False,
+        fuzzy_match: bool = False,
     ):
         self.cache_dir = cache_dir
         self.route_file = route_file
+        self.corpus = corpus or RouteCorpus(cache_dir)
+        self.strict_match = strict_match
+        self.fuzzy_match = fuzzy_match
         self.checkpoints_enabled = checkpoints_enabled
         self.checkpoint_dir = checkpoint_dir
         self.logger = get_logger("route_provider.cached")
@@ -404,17 +725,31 @@ class CachedRouteProvider(RouteProvider):
         if self.route_file:
             return self.route_file
         
+        # 1. Indexed corpus lookup (exact / opt-in fuzzy / geocoded match)
+        found = self.corpus.lookup(origin, destination, fuzzy=self.fuzzy_match)
+        if found is not None:
+            return found[0]
+
         slug = hashlib.sha1(f"{origin}-{destination}".encode()).hexdigest()[:12]
         filename = f"{slug}.json"
-
-        # 1. Try local cache directory
         if self.cache_dir.exists():
             candidate = self.cache_dir / filename
             if candidate.exists():
                 return candidate
-            # Fallback to any json in local dir
-            for f in self.cache_dir.glob("*.json"):
-                return f
+
+        if self.strict_match:
+            raise FileNotFoundError(f"No recorded route matches '{origin}' -> '{destination}' in {self.cache_dir}")
+        self.logger.warning(
+            f"Route_Corpus_Miss | No recorded route matches \"{origin}\" -> \"{destination}\"; "
+            f"falling back to any available route file",
+            extra={"event_tag": "Route_Corpus"},
+        )
+
+        # Fallback to any json in local dir
+        if self.cache_dir.exists():
+            for f in sorted(self.cache_dir.glob("*.json")):
+                if f.name != "index.json":
+                    return f
 
         # 2. Try packaged data resources
         try:
@@ -5,14 +5,15 @@ and records optional metrics. Scheduler is a pure timer; it assumes tasks are al
 shaped per task schema.
 """
 
-import json
+import logging
 import threading
 import time
 from pathlib import Path
 from queue import Queue
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sized
 
-from hw4_tourguide.logger import get_logger
+from hw4_tourguide.file_interface import JsonListStream
+from hw4_tourguide.logger import get_logger, log_event
 
 
 class Scheduler(threading.Thread):
@@ -36,49 +37,63 @@ class Scheduler(threading.Thread):
         self.metrics = metrics
 
     def run(self) -> None:
-        emitted: List[Dict[str, Any]] = []
-        total = len(self.tasks)
+        # The checkpoint is streamed task by task, so emitted tasks are never retained
+        stream: Optional[JsonListStream] = None
+        emitted_count = 0
+        first_emit = 0.0
+        # Windowed long routes coalesce while streaming, so their step total is unknown
+        total = len(self.tasks) if isinstance(self.tasks, Sized) else "?"
         for task in self.tasks:
             if self._stop_event.is_set():
                 break
             task["emit_timestamp"] = time.time()
-            self.queue.put(task)
-            emitted.append(task)
             tid = task.get("transaction_id", "unknown_tid")
+            if self.checkpoints_enabled:
+                # Serialized before the hand-off, while no worker can touch the task yet
+                stream = stream or self._open_checkpoint(tid)
+                stream.append(task)
+            self.queue.put(task)
+            emitted_count += 1
 
             # Calculate timing details
-            if len(emitted) > 1:
-                actual_time = task["emit_timestamp"] - emitted[0]["emit_timestamp"]
-                expected_time = (len(emitted) - 1) * self.interval
+            if emitted_count > 1:
+                actual_time = task["emit_timestamp"] - first_emit
+                expected_time = (emitted_count - 1) * self.interval
                 delay = actual_time - expected_time
             else:
+                first_emit = task["emit_timestamp"]
                 actual_time = 0.0
                 delay = 0.0
 
-            self.logger.info(
-                f"Scheduler_Emit | Step {task['step_number']}/{total}: {task['location_name']} | "
-                f"TID: {tid} | Queue Depth: {self.queue.qsize()} | "
-                f"Time: {actual_time:.3f}s | Delay: {'+' if delay >= 0 else ''}{delay:.3f}s | "
-                f"thread={threading.current_thread().name}",
-                extra={"event_tag": "Scheduler_Emit", "transaction_id": tid, "queue_depth": self.queue.qsize(), "delay_s": delay, "actual_time_s": actual_time}
+            log_event(
+                self.logger, logging.INFO, "Scheduler_Emit",
+                "Step {step}/{total}: {location} | TID: {transaction_id} | Queue Depth: {queue_depth} | "
+                "Time: {actual_time_s:.3f}s | Delay: {delay_s:+.3f}s | thread={thread}",
+                step=task["step_number"], total=total, location=task["location_name"], transaction_id=tid,
+                queue_depth=self.queue.qsize(), actual_time_s=actual_time, delay_s=delay,
+                thread=threading.current_thread().name,
             )
             self._record_metrics(queue_depth=self.queue.qsize(), emitted=True)
             time.sleep(self.interval)
         # Sentinel to signal completion
         self.queue.put(None)
-        self._write_checkpoint(emitted)
+        if self.checkpoints_enabled:
+            self._close_checkpoint(stream or self._open_checkpoint("unknown_tid"))
 
     def stop(self) -> None:
         self._stop_event.set()
 
-    def _write_checkpoint(self, emitted: List[Dict[str, Any]]) -> None:
-        if not self.checkpoints_enabled:
-            return
-        tid = emitted[0].get("transaction_id", "unknown_tid") if emitted else "unknown_tid"
-        path = self.checkpoint_dir / tid / "01_scheduler_queue.json"
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(emitted, indent=2))
-        self.logger.info(f"Wrote checkpoint {path}", extra={"event_tag": "Scheduler"})
+    def _open_checkpoint(self, tid: str) -> JsonListStream:
+        return JsonListStream(self.checkpoint_dir / tid / "01_scheduler_queue.json")
+
+    def _close_checkpoint(self, stream: JsonListStream) -> None:
+        bytes_written = stream.close()
+        self.logger.info(f"Wrote checkpoint {stream.path}", extra={"event_tag": "Scheduler"})
+        if self.metrics:
+            try:
+                self.metrics.increment_counter("checkpoint.bytes_written", bytes_written)
+            except Exception:
+                pass
 
     def _record_metrics(self, queue_depth: int, emitted: bool) -> None:
         if not self.metrics:
@@ -0,0 +1,108 @@
+"""
+Task planning stage between the route provider and the Scheduler.
+
+Consecutive (or revisited) Directions steps often reverse-geocode to the same
+street, and enriching each of them runs all agents plus the judge for
+near-identical content. The planner clusters steps that share a location name
+and lie within `merge_radius_m` of the cluster's representative (its first
+step). Only representatives are scheduled; after the run, `expand` fans each
+representative's result out to the other steps of its cluster so the output
+still has one entry per route step.
+
+Lazy task sources (progressive/windowed geocoding) are passed through
+unchanged: planning needs the whole route, and windowed long-route mode
+already coalesces consecutive same-name points.
+"""
+
+import copy
+import re
+from typing import Any, Dict, List, Optional
+
+from hw4_tourguide.logger import get_logger
+from hw4_tourguide.tools.spatial_store import haversine_m
+
+_UNMERGEABLE = {"", "unknown", "unknown location"}
+
+
+def _normalize_name(name: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", (name or "").strip().lower())
+
+
+class TaskPlanner:
+    def __init__(self, merge_radius_m: float = 100.0, metrics: Optional[Any] = None) -> None:
+        self.merge_radius_m = float(merge_radius_m)
+        self.metrics = metrics
+        self.logger = get_logger("task_planner")
+        # representative step_number -> member tasks (excluding the representative)
+        self.members: Dict[Any, List[Dict[str, Any]]] = {}
+
+    def plan(self, tasks: Any) -> Any:
+        """Return the representative tasks to schedule (lazy sources are returned as-is)."""
+        self.members = {}
+        if not isinstance(tasks, list) or self.merge_radius_m <= 0:
+            return tasks
+        clusters: Dict[str, List[Dict[str, Any]]] = {}
+        planned: List[Dict[str, Any]] = []
+        for task in tasks:
+            rep = self._find_cluster(task, clusters)
+            if rep is None:
+                planned.append(task)
+                name = _normalize_name(task.get("location_name"))
+                if name not in _UNMERGEABLE:
+                    clusters.setdefault(name, []).append(task)
+                continue
+            self.members.setdefault(rep.get("step_number"), []).append(task)
+
+        merged = len(tasks) - len(planned)
+        if tasks:
+            tid = tasks[0].get("transaction_id", "unknown_tid")
+            self.logger.info(
+                f"Task_Plan | TID: {tid} | Steps: {len(tasks)} | Enriched: {len(planned)} | "
+                f"Coalesced: {merged} | Merge Radius: {self.merge_radius_m:.0f}m",
+                extra={"event_tag": "Task_Plan", "transaction_id": tid, "coalesced": merged},
+            )
+        if self.metrics and merged:
+            try:
+                self.metrics.increment_counter("planner.steps_coalesced", merged)
+            except Exception:
+                pass
+        return planned
+
+    def expand(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copy each representative's result onto the steps coalesced into it."""
+        if not self.members:
+            return results
+        expanded = list(results)
+        for result in results:
+            for member in self.members.get(result.get("step_number"), []):
+                copied = copy.deepcopy(result)
+                copied.pop("enrichment_cache", None)
+                copied.update(
+                    {
+                        "step_number": member.get("step_number"),
+                        "location": member.get("location_name"),
+                        "instructions": member.get("instructions"),
+                        "timestamp": member.get("timestamp"),
+                        "coalesced_with": result.get("step_number"),
+                    }
+                )
+                expanded.append(copied)
+        return sorted(expanded, key=lambda r: r.get("step_number") or 0)
+
+    def _find_cluster(self, task: Dict[str, Any], clusters: Dict[str, List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        coords = self._coords(task)
+        if coords is None:
+            return None
+        for rep in clusters.get(_normalize_name(task.get("location_name")), []):
+            rep_coords = self._coords(rep)
+            if rep_coords and haversine_m(rep_coords[0], rep_coords[1], coords[0], coords[1]) <= self.merge_radius_m:
+                return rep
+        return None
+
+    @staticmethod
+    def _coords(task: Dict[str, Any]) -> Optional[tuple]:
+        coords = task.get("coordinates") or {}
+        try:
+            return float(coords["lat"]), float(coords["lng"])
+        except (KeyError, TypeError, ValueError):
+            return None
@@ -8,6 +8,7 @@ import time
 from typing import Callable, Any
 
 from hw4_tourguide.logger import get_logger
+from hw4_tourguide.tools.quota_ledger import QuotaExceededError
 
 
 class CircuitBreakerOpenError(RuntimeError):
@@ -52,6 +53,9 @@ class CircuitBreaker:
 
         try:
             result = func(*args, **kwargs)
+        except QuotaExceededError:
+            # Budget denials are not provider failures; don't trip the breaker
+            raise
         except Exception as exc:
             self._record_failure(exc)
             raise
@@ -0,0 +1,87 @@
+"""
+GeocodeCache (persistent reverse-geocode results with nearest-neighbour lookup).
+
+Reverse geocoding costs one Google call per route step before the scheduler
+starts. Results are stored in a SpatialStore, so any later coordinate within
+`radius_m` (a few meters by default) of a known point is answered locally,
+across runs and across routes that share intersections. Hit/miss counts are
+kept per instance and mirrored to metrics (`geocode_cache.*`). Entries older
+than `max_age_seconds` are deleted on open and every `prune_every` stores.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from hw4_tourguide.tools.spatial_store import SpatialStore
+
+NAMESPACE = "geocode"
+
+
+class GeocodeCache:
+    def __init__(
+        self,
+        path: Path = Path("data/cache/geocode.sqlite"),
+        radius_m: float = 15.0,
+        max_age_seconds: Optional[float] = 30 * 86400.0,
+        metrics: Optional[Any] = None,
+        store: Optional[SpatialStore] = None,
+        prune_every: int = 500,
+    ) -> None:
+        # Cells at least as large as the radius keep lookups to a 3x3 neighbourhood
+        self.store = store or SpatialStore(path, cell_meters=max(10.0, float(radius_m)))
+        self.radius_m = float(radius_m)
+        self.max_age_seconds = max_age_seconds
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prune_every = max(1, int(prune_every))
+        self._stores_since_prune = 0
+        try:
+            self.prune()
+        except sqlite3.Error:
+            pass  # an unusable cache file surfaces (and is logged) on lookup/store
+
+    def lookup(self, lat: float, lng: float) -> Optional[Dict[str, Any]]:
+        hit = self.store.nearest(NAMESPACE, lat, lng, self.radius_m, self.max_age_seconds)
+        with self._lock:
+            if hit is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._increment_counter("geocode_cache.misses" if hit is None else "geocode_cache.hits")
+        return None if hit is None else hit["value"]
+
+    def store_result(self, lat: float, lng: float, result: Dict[str, Any]) -> None:
+        self.store.put(NAMESPACE, lat, lng, result)
+        with self._lock:
+            self._stores_since_prune += 1
+            due = self._stores_since_prune >= self.prune_every
+            if due:
+                self._stores_since_prune = 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete entries past max_age_seconds (no-op without an age limit)."""
+        if self.max_age_seconds is None:
+            return 0
+        return self.store.prune(self.max_age_seconds, namespace=NAMESPACE)
+
+    def hit_rate(self) -> Optional[float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return self.hits / total if total else None
+
+    def close(self) -> None:
+        self.store.close()
+
+    def _increment_counter(self, name: str) -> None:
+        if not self.metrics:
+            return
+        try:
+            self.metrics.increment_counter(name)
+        except Exception:
+            pass
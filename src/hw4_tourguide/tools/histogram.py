@@ -0,0 +1,121 @@
+"""
+Fixed-size log-linear latency histogram (HDR-style).
+
+Latencies are recorded in integer microseconds. Values below 128 us get exact
+buckets; above that, each power-of-two range is split into 64 linear
+sub-buckets, so any recorded value is reported within ~1.6% of its true
+value. Buckets are stored sparsely and their number is bounded by the value
+range (about 1,800 buckets for a full hour), independent of how many samples
+are recorded. Count, sum, min and max are tracked exactly.
+
+An optional reservoir (Algorithm R) keeps a uniform random sample of raw
+values for ad-hoc inspection without keeping every sample.
+
+Not thread-safe on its own; MetricsCollector guards it with its data lock.
+"""
+
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS  # 128
+HALF_SUB_BUCKETS = SUB_BUCKETS >> 1  # 64
+PERCENTILES = ((50, "p50"), (90, "p90"), (99, "p99"), (99.9, "p999"))
+
+
+def bucket_index(value_us: int) -> int:
+    if value_us < SUB_BUCKETS:
+        return max(0, value_us)
+    shift = value_us.bit_length() - SUB_BUCKET_BITS
+    return shift * HALF_SUB_BUCKETS + (value_us >> shift)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """Inclusive [low, high] microsecond range covered by a bucket."""
+    if index < SUB_BUCKETS:
+        return index, index
+    shift = index // HALF_SUB_BUCKETS - 1
+    sub = index - shift * HALF_SUB_BUCKETS
+    return sub << shift, ((sub + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self, reservoir_size: int = 0, rng: Optional[random.Random] = None) -> None:
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms: Optional[float] = None
+        self.reservoir_size = max(0, int(reservoir_size))
+        self.reservoir: List[float] = []
+        self._rng = rng or random.Random()
+
+    def record(self, value_ms: float) -> None:
+        value_ms = max(0.0, float(value_ms))
+        index = bucket_index(int(value_ms * 1000))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_ms += value_ms
+        if self.min_ms is None or value_ms < self.min_ms:
+            self.min_ms = value_ms
+        if self.max_ms is None or value_ms > self.max_ms:
+            self.max_ms = value_ms
+        if self.reservoir_size:
+            if len(self.reservoir) < self.reservoir_size:
+                self.reservoir.append(value_ms)
+            else:
+                slot = self._rng.randrange(self.count)
+                if slot < self.reservoir_size:
+                    self.reservoir[slot] = value_ms
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add another histogram's samples (the reservoir is merged approximately)."""
+        for index, n in list(other.counts.items()):
+            self.counts[index] = self.counts.get(index, 0) + n
+        if other.count and self.reservoir_size:
+            pool = self.reservoir + other.reservoir
+            self._rng.shuffle(pool)
+            self.reservoir = pool[: self.reservoir_size]
+        self.count += other.count
+        self.total_ms += other.total_ms
+        for value in (other.min_ms, other.max_ms):
+            if value is None:
+                continue
+            if self.min_ms is None or value < self.min_ms:
+                self.min_ms = value
+            if self.max_ms is None or value > self.max_ms:
+                self.max_ms = value
+
+    def percentile(self, q: float) -> float:
+        """Value (ms) at percentile q (0-100); the bucket midpoint, clamped to the observed min/max."""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(q / 100.0 * self.count + 0.4999999)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                value = (low + high) / 2000.0
+                return min(max(value, self.min_ms), self.max_ms)
+        return self.max_ms or 0.0
+
+    def cumulative_buckets(self) -> Iterator[Tuple[float, int]]:
+        """(upper bound ms, cumulative count) per non-empty bucket, ascending."""
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            yield (bucket_bounds(index)[1] + 1) / 1000.0, seen
+
+    def summary(self) -> Dict[str, object]:
+        out: Dict[str, object] = {
+            "count": self.count,
+            "min": round(self.min_ms or 0.0, 3),
+            "max": round(self.max_ms or 0.0, 3),
+            "avg": self.total_ms / self.count if self.count else 0.0,
+        }
+        for q, label in PERCENTILES:
+            out[label] = round(self.percentile(q), 3)
+        if self.reservoir_size:
+            out["sample"] = [round(v, 3) for v in self.reservoir]
+        return out
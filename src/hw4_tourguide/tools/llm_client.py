@@ -10,6 +10,8 @@ from typing import Dict, Any, Optional, Callable
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 
 from hw4_tourguide.logger import get_logger
+from hw4_tourguide.tools.quota_ledger import QuotaLedger
+from hw4_tourguide.tools.single_flight import request_key, run_shared
 
 
 class LLMError(RuntimeError):
@@ -17,13 +19,18 @@ class LLMError(RuntimeError):
 
 
 class LLMClient(ABC):
-    def __init__(self, timeout: float = 30.0, max_retries: int = 3, backoff: str = "exponential", max_prompt_chars: int = 4000, max_tokens: Optional[int] = None):
+    # Ledger provider key for daily token accounting (see QuotaLedger)
+    quota_provider = "llm_tokens"
+
+    def __init__(self, timeout: float = 30.0, max_retries: int = 3, backoff: str = "exponential", max_prompt_chars: int = 4000, max_tokens: Optional[int] = None, quota_ledger: Optional[Any] = None, single_flight: Optional[Any] = None):
         self.timeout = timeout
         self.max_retries = max_retries
         self.backoff = backoff
         self.max_prompt_chars = max_prompt_chars
         self.max_tokens = max_tokens
         self.tokens_used = 0
+        self.quota_ledger = quota_ledger
+        self.single_flight = single_flight
         self.logger = get_logger("llm")
 
     @abstractmethod
@@ -32,9 +39,15 @@ class LLMClient(ABC):
         raise NotImplementedError
 
     def query(self, prompt: str) -> Dict[str, Any]:
-        """Call the provider with retries and timeout."""
+        """Call the provider with retries and timeout; identical in-flight prompts share one call."""
+        key = request_key(self.__class__.__name__, "query", {"prompt": prompt})
+        return run_shared(self.single_flight, key, lambda: self._query(prompt))
+
+    def _query(self, prompt: str) -> Dict[str, Any]:
         if self.max_tokens is not None and self.tokens_used >= self.max_tokens:
             raise LLMError("LLM token budget exceeded")
+        if self.quota_ledger is not None and self.quota_ledger.mode(self.quota_provider) == QuotaLedger.EXHAUSTED:
+            raise LLMError("Daily LLM token budget exhausted")
         if len(prompt) > self.max_prompt_chars:
             prompt = prompt[: self.max_prompt_chars]
         last_exc: Optional[Exception] = None
@@ -47,6 +60,12 @@ class LLMClient(ABC):
                 usage = result.get("usage", {})
                 prompt_tokens = usage.get("prompt_tokens", 0) if isinstance(usage, dict) else 0
                 completion_tokens = usage.get("completion_tokens", 0) if isinstance(usage, dict) else 0
+                if self.quota_ledger is not None:
+                    # Providers without usage data are charged a ~4 chars/token estimate
+                    self.quota_ledger.record(
+                        self.quota_provider,
+                        (prompt_tokens + completion_tokens) or len(prompt) // 4,
+                    )
                 if self.max_tokens is not None:
                     self.tokens_used += prompt_tokens + completion_tokens
                     if self.tokens_used > self.max_tokens:
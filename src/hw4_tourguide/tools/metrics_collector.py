@@ -1,87 +1,159 @@
 """
 MetricsCollector (Mission M7.7f).
 Thread-safe counters, latencies, and gauges with periodic flush to JSON.
+Latencies go into fixed-size log-linear histograms (see histogram.py), so
+memory and the flushed JSON stay constant in size however long the run is.
+
+Flushing is dirty-tracked: every record bumps a version number and a flush
+with nothing new since the last one is skipped. Snapshots are serialized
+outside the data lock and written via temp file + rename, so readers never
+see a truncated metrics.json. With `timeseries_path` set, each flush that
+has changes also appends one compact JSON line (timestamp, counters, gauges,
+latency percentiles) for plotting throughput over time.
 """
 
+import itertools
 import json
+import os
 import threading
 import time
+import weakref
 from collections import defaultdict
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path # Added import
 
+from hw4_tourguide.tools.histogram import LatencyHistogram
+
 
 class MetricsCollector:
-    _instance = None
-    _lock = threading.Lock()
+    """
+    One run's metrics. Instances are independent (one per run or transaction);
+    use MetricsRegistry to name them and to aggregate across runs.
+    """
 
-    def __new__(cls, *args, **kwargs):
-        with cls._lock:
-            if cls._instance is None:
-                cls._instance = super().__new__(cls)
-        return cls._instance
+    # Every live collector, so tests can stop stray auto-flush threads
+    _instances: "weakref.WeakSet[MetricsCollector]" = weakref.WeakSet()
+    _lock = threading.Lock()
 
-    def __init__(self, path: str = "logs/metrics.json", update_interval: float = 5.0) -> None:
-        if hasattr(self, "_initialized") and self._initialized:
-            return
+    def __init__(
+        self,
+        path: str = "logs/metrics.json",
+        update_interval: float = 5.0,
+        reservoir_size: int = 0,
+        name: Optional[str] = None,
+        timeseries_path: Optional[str] = None,
+    ) -> None:
         self.path = path
         self.update_interval = update_interval
+        self.reservoir_size = max(0, int(reservoir_size))
+        self.name = name
+        self.timeseries_path = timeseries_path
+        self.started_at = time.time()
         self.counters: Dict[str, int] = defaultdict(int)
-        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.latencies: Dict[str, LatencyHistogram] = {}
         self.gauges: Dict[str, Any] = {}
+        self.flushes_written = 0
+        self.flushes_skipped = 0
+        self._version = 0
+        self._flushed_version = -1  # the first flush always writes, even when empty
         self._data_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
         self._stop_event = threading.Event()
+        with MetricsCollector._lock:
+            MetricsCollector._instances.add(self)
         self._thread = threading.Thread(target=self._auto_flush, daemon=True)
         self._thread.start()
-        self._initialized = True
 
     @classmethod
     def reset(cls) -> None:
-        """Reset the singleton (used in tests)."""
-        with cls._lock:
-            if cls._instance is not None:
-                try:
-                    cls._instance.stop()
-                except Exception:
-                    pass
-            cls._instance = None
+        """Stop every running collector (used in tests)."""
+        with MetricsCollector._lock:
+            running = [m for m in MetricsCollector._instances if not m._stop_event.is_set()]
+        for collector in running:
+            try:
+                collector.stop()
+            except Exception:
+                pass
 
     def increment_counter(self, name: str, value: int = 1) -> None:
         with self._data_lock:
             self.counters[name] += value
+            self._version += 1
 
     def record_latency(self, name: str, duration_ms: float) -> None:
         with self._data_lock:
-            self.latencies[name].append(duration_ms)
+            histogram = self.latencies.get(name)
+            if histogram is None:
+                histogram = self.latencies[name] = LatencyHistogram(self.reservoir_size)
+            histogram.record(duration_ms)
+            self._version += 1
 
     def set_gauge(self, name: str, value: Any) -> None:
         with self._data_lock:
             self.gauges[name] = value
+            self._version += 1
 
-    def get_all(self) -> Dict[str, Any]:
+    def version(self) -> int:
+        """Monotonic count of recorded updates; unchanged means nothing new to flush."""
         with self._data_lock:
-            return {
-                "counters": dict(self.counters),
-                "latencies": {
-                    k: {"values": v, "avg": sum(v) / len(v) if v else 0.0}
-                    for k, v in self.latencies.items()
-                },
-                "gauges": dict(self.gauges),
-            }
-
-    def flush(self) -> None:
-        data = self.get_all()
-        try:
-            # Ensure parent directory exists before writing
-            file_path = Path(self.path)
-            file_path.parent.mkdir(parents=True, exist_ok=True) # Create parent dirs
-
-            with open(file_path, "w") as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            # Log error instead of silently passing
-            import sys
-            print(f"ERROR: Failed to write metrics to {self.path}: {e}", file=sys.stderr)
+            return self._version
+
+    def collect(self) -> Tuple[Dict[str, int], Dict[str, LatencyHistogram], Dict[str, Any]]:
+        """Point-in-time copy of (counters, latency histograms, gauges), safe to use without the lock."""
+        with self._data_lock:
+            latencies = {k: _copy_histogram(h) for k, h in self.latencies.items()}
+            return dict(self.counters), latencies, dict(self.gauges)
+
+    def get_all(self) -> Dict[str, Any]:
+        counters, latencies, gauges = self.collect()
+        return {
+            "counters": counters,
+            "latencies": {k: h.summary() for k, h in latencies.items()},
+            "gauges": gauges,
+        }
+
+    def flush(self, force: bool = False) -> bool:
+        """Write metrics.json (and a time-series line) if anything changed. Returns True if written."""
+        with self._flush_lock:
+            version = self.version()
+            if version == self._flushed_version and not force:
+                self.flushes_skipped += 1
+                return False
+            data = self.get_all()
+            try:
+                # Ensure parent directory exists before writing
+                file_path = Path(self.path)
+                file_path.parent.mkdir(parents=True, exist_ok=True) # Create parent dirs
+                text = json.dumps(data, indent=2)
+                tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+                tmp_path.write_text(text)
+                os.replace(tmp_path, file_path)
+                if self.timeseries_path:
+                    self._append_timeseries(data)
+            except Exception as e:
+                # Log error instead of silently passing
+                import sys
+                print(f"ERROR: Failed to write metrics to {self.path}: {e}", file=sys.stderr)
+                return False
+            self._flushed_version = version
+            self.flushes_written += 1
+            return True
+
+    def _append_timeseries(self, data: Dict[str, Any]) -> None:
+        row = {
+            "ts": round(time.time(), 3),
+            "elapsed_s": round(time.time() - self.started_at, 3),
+            "counters": data["counters"],
+            "gauges": data["gauges"],
+            "latencies": {
+                k: {key: v[key] for key in ("count", "avg", "p50", "p90", "p99")}
+                for k, v in data["latencies"].items()
+            },
+        }
+        ts_path = Path(self.timeseries_path)
+        ts_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(ts_path, "a") as f:
+            f.write(json.dumps(row, separators=(",", ":"), default=str) + "\n")
 
     def stop(self) -> None:
         self._stop_event.set()
@@ -90,6 +162,121 @@ class MetricsCollector:
         self.flush()
 
     def _auto_flush(self) -> None:
-        while not self._stop_event.is_set():
-            time.sleep(self.update_interval)
+        while not self._stop_event.wait(self.update_interval):
             self.flush()
+
+
+class _Shard:
+    """One thread's private metrics buffer; only its owner thread writes to it."""
+
+    __slots__ = ("thread", "counters", "latencies", "gauges", "version")
+
+    def __init__(self, thread: threading.Thread) -> None:
+        self.thread = thread
+        self.version = 0
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.latencies: Dict[str, LatencyHistogram] = {}
+        self.gauges: Dict[str, Tuple[int, Any]] = {}
+
+
+class ShardedMetricsCollector(MetricsCollector):
+    """
+    Drop-in MetricsCollector that records into per-thread shards.
+
+    Recording takes no lock at all: each shard has a single writer, and
+    snapshots on `get_all`/`flush` copy shard dicts with `list(...)` (atomic
+    under the GIL) before merging, so a snapshot may miss an in-flight
+    sample but never sees a torn dict. Gauges keep last-writer-wins semantics
+    via a global write sequence. Shards of finished threads are folded into the base
+    counters/latencies/gauges on each snapshot, so short-lived threads do not
+    accumulate.
+    """
+
+    def __init__(
+        self,
+        path: str = "logs/metrics.json",
+        update_interval: float = 5.0,
+        reservoir_size: int = 0,
+        name: Optional[str] = None,
+        timeseries_path: Optional[str] = None,
+    ) -> None:
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._gauge_seq = itertools.count(1)
+        self._base_gauges: Dict[str, Tuple[int, Any]] = {}
+        super().__init__(
+            path=path,
+            update_interval=update_interval,
+            reservoir_size=reservoir_size,
+            name=name,
+            timeseries_path=timeseries_path,
+        )
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard(threading.current_thread())
+            with self._data_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def increment_counter(self, name: str, value: int = 1) -> None:
+        shard = self._shard()
+        shard.counters[name] += value
+        shard.version += 1
+
+    def record_latency(self, name: str, duration_ms: float) -> None:
+        shard = self._shard()
+        histogram = shard.latencies.get(name)
+        if histogram is None:
+            histogram = shard.latencies[name] = LatencyHistogram(self.reservoir_size)
+        histogram.record(duration_ms)
+        shard.version += 1
+
+    def set_gauge(self, name: str, value: Any) -> None:
+        shard = self._shard()
+        shard.gauges[name] = (next(self._gauge_seq), value)
+        shard.version += 1
+
+    def version(self) -> int:
+        with self._data_lock:
+            return self._version + sum(shard.version for shard in self._shards)
+
+    def collect(self) -> Tuple[Dict[str, int], Dict[str, LatencyHistogram], Dict[str, Any]]:
+        with self._data_lock:
+            self._fold_finished_shards()
+            counters: Dict[str, int] = defaultdict(int, self.counters)
+            latencies = {k: _copy_histogram(h) for k, h in self.latencies.items()}
+            gauges: Dict[str, Tuple[int, Any]] = dict(self._base_gauges)
+            for shard in self._shards:
+                self._merge_shard(shard, counters, latencies, gauges, copy=True)
+        return dict(counters), latencies, {k: v for k, (_, v) in gauges.items()}
+
+    def _fold_finished_shards(self) -> None:
+        alive: List[_Shard] = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+                continue
+            self._merge_shard(shard, self.counters, self.latencies, self._base_gauges, copy=False)
+            self._version += shard.version
+        self._shards = alive
+
+    def _merge_shard(self, shard: _Shard, counters, latencies, gauges, copy: bool) -> None:
+        for name, value in list(shard.counters.items()):
+            counters[name] += value
+        for name, histogram in list(shard.latencies.items()):
+            if name in latencies:
+                latencies[name].merge(histogram)
+            else:
+                latencies[name] = _copy_histogram(histogram) if copy else histogram
+        for name, (seq, value) in list(shard.gauges.items()):
+            if name not in gauges or gauges[name][0] < seq:
+                gauges[name] = (seq, value)
+
+
+def _copy_histogram(histogram: LatencyHistogram) -> LatencyHistogram:
+    clone = LatencyHistogram(histogram.reservoir_size)
+    clone.merge(histogram)
+    return clone
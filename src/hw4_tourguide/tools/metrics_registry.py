@@ -0,0 +1,142 @@
+"""
+MetricsRegistry: named, per-run MetricsCollector instances plus cross-run aggregates.
+
+Each run (or transaction) gets its own collector writing its own
+`logs/metrics.json`. When a run finishes, `retire()` stops its collector
+and folds its totals into the registry's aggregate, keeping a short
+throughput summary for the last `max_finished` runs. `aggregate()` merges
+finished and live runs: counter totals, merged latency histograms, and
+per-run counter rates (per second of wall-clock run time).
+"""
+
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Type
+
+from hw4_tourguide.tools.histogram import LatencyHistogram
+from hw4_tourguide.tools.metrics_collector import MetricsCollector, ShardedMetricsCollector
+
+
+class MetricsRegistry:
+    def __init__(self, max_finished: int = 100) -> None:
+        self.max_finished = max(1, int(max_finished))
+        self._collectors: Dict[str, MetricsCollector] = {}
+        self._labels: Dict[str, str] = {}
+        self._finished: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._latencies: Dict[str, LatencyHistogram] = {}
+        self._elapsed_s = 0.0
+        self._lock = threading.Lock()
+
+    def create(self, name: str, sharded: bool = True, label: Optional[str] = None, **kwargs: Any) -> MetricsCollector:
+        """Start a new collector for `name`; kwargs go to the collector (path, update_interval, ...).
+
+        `name` must be unique among live collectors; `label` is a human-readable
+        tag (e.g. the run directory) reported in run summaries, defaulting to `name`.
+        """
+        cls: Type[MetricsCollector] = ShardedMetricsCollector if sharded else MetricsCollector
+        with self._lock:
+            if name in self._collectors:
+                raise ValueError(f"Metrics collector '{name}' is already registered")
+            collector = cls(name=name, **kwargs)
+            self._collectors[name] = collector
+            self._labels[name] = label or name
+        return collector
+
+    def get(self, name: str) -> Optional[MetricsCollector]:
+        with self._lock:
+            return self._collectors.get(name)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._collectors)
+
+    def retire(self, name: str) -> Optional[Dict[str, Any]]:
+        """Stop (and flush) a run's collector and fold it into the aggregate. Returns its run summary."""
+        with self._lock:
+            collector = self._collectors.pop(name, None)
+            label = self._labels.pop(name, name)
+        if collector is None:
+            return None
+        collector.stop()
+        counters, latencies, _ = collector.collect()
+        summary = _run_summary(collector, counters, time.time(), label)
+        with self._lock:
+            for key, value in counters.items():
+                self._counters[key] += value
+            for key, histogram in latencies.items():
+                if key in self._latencies:
+                    self._latencies[key].merge(histogram)
+                else:
+                    self._latencies[key] = histogram
+            self._elapsed_s += summary["elapsed_s"]
+            self._finished[name] = summary
+            while len(self._finished) > self.max_finished:
+                self._finished.popitem(last=False)
+        return summary
+
+    @contextmanager
+    def scoped(self, name: str, sharded: bool = True, **kwargs: Any) -> Iterator[MetricsCollector]:
+        """`with registry.scoped(tid, path=...) as metrics:` - retired on exit."""
+        collector = self.create(name, sharded=sharded, **kwargs)
+        try:
+            yield collector
+        finally:
+            self.retire(name)
+
+    def aggregate(self) -> Dict[str, Any]:
+        """Totals across finished and live runs, plus per-run throughput."""
+        now = time.time()
+        with self._lock:
+            live = [(c, self._labels.get(n, n)) for n, c in self._collectors.items()]
+            counters: Dict[str, int] = defaultdict(int, self._counters)
+            latencies = {k: _copy(h) for k, h in self._latencies.items()}
+            elapsed = self._elapsed_s
+            runs = dict(self._finished)
+        for collector, label in live:
+            run_counters, run_latencies, _ = collector.collect()
+            for key, value in run_counters.items():
+                counters[key] += value
+            for key, histogram in run_latencies.items():
+                if key in latencies:
+                    latencies[key].merge(histogram)
+                else:
+                    latencies[key] = histogram
+            summary = _run_summary(collector, run_counters, now, label)
+            summary["live"] = True
+            runs[collector.name or str(id(collector))] = summary
+            elapsed += summary["elapsed_s"]
+        return {
+            "run_count": len(runs),
+            "counters": dict(counters),
+            "rates_per_s": {k: round(v / elapsed, 3) for k, v in counters.items()} if elapsed > 0 else {},
+            "latencies": {k: h.summary() for k, h in latencies.items()},
+            "runs": runs,
+        }
+
+    def close(self) -> None:
+        for name in self.names():
+            self.retire(name)
+
+
+def _run_summary(collector: MetricsCollector, counters: Dict[str, int], now: float, label: Optional[str] = None) -> Dict[str, Any]:
+    elapsed = max(0.0, now - collector.started_at)
+    return {
+        "label": label or collector.name,
+        "path": collector.path,
+        "elapsed_s": round(elapsed, 3),
+        "counters": counters,
+        "rates_per_s": {k: round(v / elapsed, 3) for k, v in counters.items()} if elapsed > 0 else {},
+    }
+
+
+def _copy(histogram: LatencyHistogram) -> LatencyHistogram:
+    clone = LatencyHistogram(histogram.reservoir_size)
+    clone.merge(histogram)
+    return clone
+
+
+# Process-wide default registry
+METRICS_REGISTRY = MetricsRegistry()
@@ -0,0 +1,242 @@
+"""
+OpenMetrics / Prometheus text exposition for MetricsCollector.
+
+Metric names follow the collector's dotted names, prefixed and sanitized:
+`queue.depth` -> `tourguide_queue_depth`, `api_calls.youtube` ->
+`tourguide_api_calls_youtube_total`. Latencies (`*_ms`) are exposed twice:
+- a histogram family with fixed millisecond `le` buckets (aggregatable in
+  PromQL via `histogram_quantile`);
+- a summary family `<name>_quantiles` carrying the collector's own p50/p90/
+  p99/p999, which are far more precise than the fixed buckets.
+Every sample carries a `run` label when the collector is named, so several
+runs from a MetricsRegistry can share one endpoint.
+
+Exposure:
+- textfile: rewritten every `interval` seconds via temp file + rename, for
+  node_exporter's textfile collector or any file scraper;
+- HTTP: `GET /metrics` on a local port (long-running modes).
+"""
+
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+from hw4_tourguide.logger import get_logger
+from hw4_tourguide.tools.histogram import PERCENTILES, bucket_bounds
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PREFIX = "tourguide_"
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+_INVALID = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def metric_name(name: str) -> str:
+    cleaned = _INVALID.sub("_", name).strip("_")
+    return PREFIX + (cleaned if cleaned and not cleaned[0].isdigit() else f"_{cleaned}")
+
+
+def _labels(run: Optional[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = []
+    if run:
+        pairs.append(("run", run))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _le(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+def render(collectors: Iterable[Any]) -> str:
+    """Render one OpenMetrics exposition for the given collectors (grouped by metric family)."""
+    families: "OrderedDict[str, Tuple[str, List[str]]]" = OrderedDict()
+
+    def family(name: str, kind: str) -> List[str]:
+        if name not in families:
+            families[name] = (kind, [])
+        return families[name][1]
+
+    for collector in collectors:
+        run = getattr(collector, "name", None)
+        counters, latencies, gauges = collector.collect()
+        for key in sorted(counters):
+            name = metric_name(key)
+            family(name, "counter").append(f"{name}_total{_labels(run)} {_number(counters[key])}")
+        for key in sorted(gauges):
+            value = gauges[key]
+            if not isinstance(value, (int, float)):
+                continue
+            name = metric_name(key)
+            family(name, "gauge").append(f"{name}{_labels(run)} {_number(value)}")
+        for key in sorted(latencies):
+            histogram = latencies[key]
+            name = metric_name(key)
+            lines = family(name, "histogram")
+            for bound, count in _fixed_buckets(histogram):
+                lines.append(f"{name}_bucket{_labels(run, ('le', _le(bound)))} {count}")
+            lines.append(f"{name}_count{_labels(run)} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(run)} {_number(histogram.total_ms)}")
+            summary = family(f"{name}_quantiles", "summary")
+            for q, _ in PERCENTILES:
+                quantile = f"{q / 100.0:g}"  # "0.999", not repr's 0.9990000000000001
+                summary.append(
+                    f"{name}_quantiles{_labels(run, ('quantile', quantile))} {_number(histogram.percentile(q))}"
+                )
+            summary.append(f"{name}_quantiles_count{_labels(run)} {histogram.count}")
+            summary.append(f"{name}_quantiles_sum{_labels(run)} {_number(histogram.total_ms)}")
+
+    out: List[str] = []
+    for name, (kind, lines) in families.items():
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(lines)
+    out.append("# EOF")
+    return "\n".join(out) + "\n"
+
+
+def _fixed_buckets(histogram: Any) -> List[Tuple[float, int]]:
+    """
+    Cumulative counts at BUCKETS_MS boundaries.
+
+    Each histogram bucket is counted at the first `le` that covers its upper
+    bound, so `le` never includes a sample above it (a bucket straddling a
+    boundary lands in the next `le` up).
+    """
+    cumulative = [0] * (len(BUCKETS_MS) + 1)
+    for index, n in list(histogram.counts.items()):
+        high_ms = bucket_bounds(index)[1] / 1000.0
+        for i, bound in enumerate(BUCKETS_MS):
+            if high_ms <= bound:
+                cumulative[i] += n
+                break
+        else:
+            cumulative[-1] += n
+    result, seen = [], 0
+    for bound, n in zip(BUCKETS_MS + (math.inf,), cumulative):
+        seen += n
+        result.append((bound, seen))
+    return result
+
+
+class OpenMetricsExporter:
+    """Expose a MetricsCollector (or every live collector in a MetricsRegistry) as OpenMetrics text."""
+
+    def __init__(
+        self,
+        source: Any,
+        textfile: Optional[Path] = None,
+        port: int = 0,
+        host: str = "127.0.0.1",
+        interval: float = 5.0,
+    ) -> None:
+        self.source = source
+        self.textfile = Path(textfile) if textfile else None
+        self.port = int(port or 0)
+        self.host = host
+        self.interval = max(0.1, float(interval))
+        self.logger = get_logger("metrics.openmetrics")
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _collectors(self) -> List[Any]:
+        if hasattr(self.source, "collect"):
+            return [self.source]
+        return [c for c in (self.source.get(n) for n in self.source.names()) if c is not None]
+
+    def render(self) -> str:
+        return render(self._collectors())
+
+    def write_textfile(self) -> None:
+        if not self.textfile:
+            return
+        try:
+            self.textfile.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.textfile.with_name(f".{self.textfile.name}.{os.getpid()}.tmp")
+            tmp.write_text(self.render())
+            os.replace(tmp, self.textfile)
+        except OSError as exc:
+            self.logger.warning(
+                f"OpenMetrics_Write_Failed | Path: {self.textfile} | Error: {exc}",
+                extra={"event_tag": "Metrics"},
+            )
+
+    def start(self) -> "OpenMetricsExporter":
+        if self.port:
+            try:
+                self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+            except OSError as exc:
+                # A busy port must not fail the run; the textfile (if any) still works
+                self.logger.warning(
+                    f"OpenMetrics_Bind_Failed | Address: {self.host}:{self.port} | Error: {exc}",
+                    extra={"event_tag": "Metrics"},
+                )
+                self.port = 0
+        if self._server:
+            self._server.daemon_threads = True
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, name="openmetrics-http", daemon=True).start()
+            self.logger.info(
+                f"OpenMetrics_Serving | URL: http://{self.host}:{self.port}/metrics",
+                extra={"event_tag": "Metrics"},
+            )
+        if self.textfile:
+            self._thread = threading.Thread(target=self._textfile_loop, name="openmetrics-textfile", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self.write_textfile()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _textfile_loop(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.write_textfile()
+
+    def _handler(self) -> type:
+        exporter = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - http.server API
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+        return _MetricsHandler
@@ -0,0 +1,189 @@
+"""
+QuotaLedger (persistent daily API quota + LLM token accounting).
+
+Records quota units (YouTube search = 100, fetch = 1, ...) and LLM tokens per
+provider per UTC day in a small SQLite file so that concurrent processes share
+one budget. Clients charge the ledger right before a network call; agents read
+it to decide whether to run normally, in reduced mode, or degrade entirely.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from hw4_tourguide.logger import get_logger
+
+
+class QuotaExceededError(RuntimeError):
+    """Raised when a provider's daily budget cannot cover the requested units."""
+
+
+class QuotaLedger:
+    NORMAL = "normal"
+    REDUCED = "reduced"
+    EXHAUSTED = "exhausted"
+
+    def __init__(
+        self,
+        path: Path = Path("data/cache/quota_ledger.sqlite"),
+        daily_budgets: Optional[Dict[str, int]] = None,
+        reserve_fraction: float = 0.1,
+        metrics: Optional[Any] = None,
+        time_func: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.daily_budgets = {k: int(v) for k, v in (daily_budgets or {}).items() if v is not None}
+        self.reserve_fraction = max(0.0, min(1.0, float(reserve_fraction)))
+        self.metrics = metrics
+        self._time = time_func
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.logger = get_logger("quota")
+
+    # --- Budget queries ---
+    def budget(self, provider: str) -> Optional[int]:
+        return self.daily_budgets.get(provider)
+
+    def used(self, provider: str, day: Optional[str] = None) -> int:
+        day = day or self._today()
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT units FROM usage WHERE day = ? AND provider = ?", (day, provider)
+            ).fetchone()
+        return int(row[0]) if row else 0
+
+    def remaining(self, provider: str) -> Optional[int]:
+        """Units left today, or None when the provider has no configured budget."""
+        budget = self.budget(provider)
+        if budget is None:
+            return None
+        return max(0, budget - self.used(provider))
+
+    def mode(self, provider: Optional[str]) -> str:
+        """Classify the provider budget as normal, reduced (inside reserve), or exhausted."""
+        if not provider:
+            return self.NORMAL
+        budget = self.budget(provider)
+        if budget is None:
+            return self.NORMAL
+        remaining = max(0, budget - self.used(provider))
+        if remaining <= 0:
+            return self.EXHAUSTED
+        if remaining <= budget * self.reserve_fraction:
+            return self.REDUCED
+        return self.NORMAL
+
+    # --- Charging ---
+    def try_consume(self, provider: str, units: int) -> bool:
+        """Atomically charge `units` if today's budget allows it; returns False otherwise."""
+        units = int(units)
+        day = self._today()
+        budget = self.budget(provider)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT units FROM usage WHERE day = ? AND provider = ?", (day, provider)
+                ).fetchone()
+                used = int(row[0]) if row else 0
+                if budget is not None and used + units > budget:
+                    conn.execute("ROLLBACK")
+                    allowed = False
+                else:
+                    self._upsert(conn, day, provider, units)
+                    conn.execute("COMMIT")
+                    allowed = True
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if allowed:
+            self._increment_counter(f"quota.{provider}.units", units)
+        else:
+            self._increment_counter(f"quota.{provider}.denied")
+            self.logger.warning(
+                f"Quota_Denied | Provider: {provider} | Requested: {units} | Used: {used} | Budget: {budget}",
+                extra={"event_tag": "Quota_Denied", "provider": provider},
+            )
+        return allowed
+
+    def consume(self, provider: str, units: int) -> None:
+        """Charge `units` or raise QuotaExceededError."""
+        if not self.try_consume(provider, units):
+            raise QuotaExceededError(f"Daily quota exhausted for {provider}")
+
+    def record(self, provider: str, units: int) -> None:
+        """Record usage after the fact (e.g. LLM tokens known only from the response)."""
+        units = int(units)
+        if units <= 0:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._upsert(conn, self._today(), provider, units)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self._increment_counter(f"quota.{provider}.units", units)
+
+    def snapshot(self, day: Optional[str] = None) -> Dict[str, Dict[str, Optional[int]]]:
+        """Usage/budget/remaining per provider for the given day (default: today)."""
+        day = day or self._today()
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT provider, units FROM usage WHERE day = ?", (day,)
+            ).fetchall()
+        used = {provider: int(units) for provider, units in rows}
+        out: Dict[str, Dict[str, Optional[int]]] = {}
+        for provider in sorted(set(used) | set(self.daily_budgets)):
+            budget = self.budget(provider)
+            units = used.get(provider, 0)
+            out[provider] = {
+                "used": units,
+                "budget": budget,
+                "remaining": None if budget is None else max(0, budget - units),
+            }
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- Internals ---
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage ("
+                " day TEXT NOT NULL, provider TEXT NOT NULL, units INTEGER NOT NULL DEFAULT 0,"
+                " updated_at REAL NOT NULL, PRIMARY KEY (day, provider))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _upsert(self, conn: sqlite3.Connection, day: str, provider: str, units: int) -> None:
+        conn.execute(
+            "INSERT INTO usage (day, provider, units, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(day, provider) DO UPDATE SET units = units + excluded.units, updated_at = excluded.updated_at",
+            (day, provider, units, self._time()),
+        )
+
+    def _today(self) -> str:
+        return datetime.fromtimestamp(self._time(), tz=timezone.utc).strftime("%Y-%m-%d")
+
+    def _increment_counter(self, name: str, value: int = 1) -> None:
+        if not self.metrics:
+            return
+        try:
+            self.metrics.increment_counter(name, value)
+        except Exception:
+            pass
@@ -0,0 +1,243 @@
+"""
+ResponseCache (persistent search/fetch result cache for API clients).
+
+Stores normalized client results (not raw HTTP bodies) in a small SQLite file
+keyed by `request_key(provider, method, params)`, so overlapping routes across
+runs reuse earlier YouTube/Spotify/Wikipedia/DuckDuckGo answers:
+- per-provider TTLs (Wikipedia extracts rarely change, YouTube stats often do);
+- negative caching: empty results ("no candidates") live for a short TTL;
+- stale-while-revalidate: an expired entry is served immediately while a
+  background thread refreshes it;
+- size-bounded: least-recently-used entries are evicted past `max_bytes`.
+  Hits do not write: their access times are buffered and applied in one
+  batch every `TOUCH_BATCH` hits, before any eviction, and on close.
+Errors are never cached; a failing refresh leaves the stale entry in place.
+The cache is best-effort: a SQLite error (locked, corrupt or unwritable file,
+or a cache directory that cannot be created) is logged and counted, and the call falls through to the live fetch.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+from hw4_tourguide.logger import get_logger
+
+
+class ResponseCache:
+    TOUCH_BATCH = 64
+
+    def __init__(
+        self,
+        path: Path = Path("data/cache/responses.sqlite"),
+        ttl_seconds: Optional[Dict[str, float]] = None,
+        default_ttl_seconds: float = 86400.0,
+        negative_ttl_seconds: float = 900.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        stale_while_revalidate: bool = True,
+        metrics: Optional[Any] = None,
+        time_func: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl_seconds = {k: float(v) for k, v in (ttl_seconds or {}).items() if v is not None}
+        self.default_ttl_seconds = float(default_ttl_seconds)
+        self.negative_ttl_seconds = float(negative_ttl_seconds)
+        self.max_bytes = int(max_bytes)
+        self.stale_while_revalidate = stale_while_revalidate
+        self.metrics = metrics
+        self._time = time_func
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Running sum of stored payload sizes (loaded once, then kept incrementally)
+        self._total_bytes: Optional[int] = None
+        # key -> last access time, not yet written to accessed_at
+        self._touched: Dict[str, float] = {}
+        self._refreshing: Set[str] = set()
+        self._refresh_threads: Dict[str, threading.Thread] = {}
+        self.logger = get_logger("response_cache")
+
+    # --- Public API ---
+    def get_or_fetch(self, provider: str, key: str, fetch: Callable[[], Any]) -> Any:
+        """Return the cached result for key, fetching (and storing) it on a miss."""
+        try:
+            entry = self._get(key)
+        except sqlite3.Error as exc:
+            self._report_error("read", provider, exc)
+            entry = None
+        now = self._time()
+        if entry is not None:
+            value, expires_at, negative = entry
+            if now < expires_at:
+                self._increment_counter(f"response_cache.{provider}.{'negative_hits' if negative else 'hits'}")
+                return value
+            if self.stale_while_revalidate and not negative:
+                self._increment_counter(f"response_cache.{provider}.stale")
+                self._refresh_in_background(provider, key, fetch)
+                return value
+
+        self._increment_counter(f"response_cache.{provider}.misses")
+        value = fetch()
+        self.put(provider, key, value)
+        return value
+
+    def put(self, provider: str, key: str, value: Any) -> None:
+        try:
+            payload = json.dumps(value, default=str)
+        except (TypeError, ValueError):
+            return
+        negative = not value
+        ttl = self.negative_ttl_seconds if negative else self.ttl_seconds.get(provider, self.default_ttl_seconds)
+        if ttl <= 0:
+            return
+        now = self._time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                if self._total_bytes is None:
+                    self._total_bytes = int(conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0])
+                previous = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, provider, value, size, negative, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, provider, payload, len(payload), int(negative), now + ttl, now),
+                )
+                self._total_bytes += len(payload) - (int(previous[0]) if previous else 0)
+                self._touched.pop(key, None)
+                evicted = self._evict(conn)
+        except sqlite3.Error as exc:
+            with self._lock:
+                self._total_bytes = None  # re-read on the next successful put
+            self._report_error("write", provider, exc)
+            return
+        if evicted:
+            self._increment_counter("response_cache.evictions", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            row = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": int(row[0]), "bytes": int(row[1])}
+
+    def wait_for_refreshes(self, timeout: float = 5.0) -> None:
+        """Join outstanding background refreshes (used on shutdown and in tests)."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            threads = list(self._refresh_threads.values())
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def close(self, timeout: float = 5.0) -> None:
+        self.wait_for_refreshes(timeout)
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._flush_touches(self._conn)
+                except sqlite3.Error as exc:
+                    self._report_error("touch", "all", exc)
+                self._conn.close()
+                self._conn = None
+
+    # --- Internals ---
+    def _get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at, negative FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = self._time()
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._flush_touches(conn)
+        try:
+            return json.loads(row[0]), float(row[1]), bool(row[2])
+        except ValueError:
+            return None
+
+    def _refresh_in_background(self, provider: str, key: str, fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _refresh() -> None:
+            try:
+                self.put(provider, key, fetch())
+                self._increment_counter(f"response_cache.{provider}.refreshed")
+            except Exception as exc:
+                self.logger.warning(
+                    f"Cache_Refresh_Failed | Provider: {provider} | Key: {key[:80]} | Error: {type(exc).__name__}: {str(exc)[:100]}",
+                    extra={"event_tag": "Cache_Refresh_Failed", "provider": provider},
+                )
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+                    self._refresh_threads.pop(key, None)
+
+        thread = threading.Thread(target=_refresh, name=f"cache-refresh-{provider}", daemon=True)
+        with self._lock:
+            self._refresh_threads[key] = thread
+        thread.start()
+
+    def _flush_touches(self, conn: sqlite3.Connection) -> None:
+        """Write buffered access times in one statement (caller holds the lock)."""
+        if not self._touched:
+            return
+        touched = [(accessed_at, key) for key, accessed_at in self._touched.items()]
+        self._touched.clear()
+        conn.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?", touched)
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        if self._total_bytes <= self.max_bytes:
+            return 0
+        # Eviction order must see recent hits
+        self._flush_touches(conn)
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall():
+            if self._total_bytes <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= int(size)
+            evicted += 1
+        return evicted
+
+    def _report_error(self, operation: str, provider: str, exc: sqlite3.Error) -> None:
+        self._increment_counter("response_cache.errors")
+        self.logger.warning(
+            f"Cache_Error | Provider: {provider} | Op: {operation} | Error: {type(exc).__name__}: {str(exc)[:100]}",
+            extra={"event_tag": "Cache_Error", "provider": provider},
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            except OSError as exc:
+                # Surface as a cache error so callers fall through to the live fetch
+                raise sqlite3.OperationalError(f"cannot create cache directory: {exc}") from exc
+            conn = sqlite3.connect(str(self.path), timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, provider TEXT NOT NULL, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " negative INTEGER NOT NULL DEFAULT 0, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def _increment_counter(self, name: str, value: int = 1) -> None:
+        if not self.metrics:
+            return
+        try:
+            self.metrics.increment_counter(name, value)
+        except Exception:
+            pass
+
+
+def cached_call(cache: Optional[ResponseCache], provider: str, key: str, fetch: Callable[[], Any]) -> Any:
+    """Serve fetch through cache when one is configured, else call it directly."""
+    if cache is None:
+        return fetch()
+    return cache.get_or_fetch(provider, key, fetch)
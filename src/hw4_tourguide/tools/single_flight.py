@@ -0,0 +1,99 @@
+"""
+Single-flight request coalescing for API and LLM clients.
+
+When several worker threads issue the identical (provider, method, params) call
+while the first one is still in flight, only that first "leader" call goes out
+over the network; the followers block on it and receive a copy of its result
+(or its exception). Nothing is remembered once the call completes - persistent
+reuse is the response cache's job.
+"""
+
+import copy
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from hw4_tourguide.logger import get_logger
+
+
+def request_key(provider: str, method: str, params: Dict[str, Any]) -> str:
+    """Normalized, order-independent key for a client request."""
+    normalized = {k: v for k, v in params.items() if v is not None}
+    return f"{provider}:{method}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    def __init__(self, metrics: Optional[Any] = None) -> None:
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.logger = get_logger("single_flight")
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn once per in-flight key; concurrent callers share the outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+                self.leaders += 1
+            else:
+                call.followers += 1
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            self._increment_counter(f"api_calls_coalesced.{key.split(':', 1)[0]}")
+            if call.error is not None:
+                raise call.error
+            # Each caller gets its own copy; agents mutate result lists in place
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+            if call.followers:
+                self.logger.debug(
+                    f"SingleFlight | Key: {key[:80]} | Shared with {call.followers} waiting caller(s)",
+                    extra={"event_tag": "API_Coalesce"},
+                )
+        return copy.deepcopy(call.result)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def _increment_counter(self, name: str) -> None:
+        if not self.metrics:
+            return
+        try:
+            self.metrics.increment_counter(name)
+        except Exception:
+            pass
+
+
+def run_shared(single_flight: Optional[SingleFlight], key: str, fn: Callable[[], Any]) -> Any:
+    """Run fn through single_flight when one is configured, else call it directly."""
+    if single_flight is None:
+        return fn()
+    return single_flight.do(key, fn)
@@ -0,0 +1,156 @@
+"""
+SpatialStore (persistent point store with a grid-cell spatial index).
+
+Each entry is a (namespace, lat, lng) point carrying a JSON value. Points are
+bucketed into fixed-size grid cells (integer cell_y/cell_x, roughly
+`cell_meters` on a side at the equator). A radius lookup issues one query
+per cell row (`cell_y = ? AND cell_x BETWEEN ? AND ?`), so the
+(namespace, cell_y, cell_x) index bounds both coordinates and only the
+cells around the point are read, followed by an exact haversine filter.
+Longitude ranges crossing the antimeridian are split in two.
+"""
+
+import json
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+
+_NEAREST_SQL = (
+    "SELECT lat, lng, value, created_at FROM points "
+    "WHERE namespace = ? AND cell_y = ? AND cell_x BETWEEN ? AND ? AND created_at >= ?"
+)
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _lng_ranges(lo: float, hi: float) -> List[Tuple[float, float]]:
+    """Split [lo, hi] into ranges within [-180, 180], wrapping at the antimeridian."""
+    if hi - lo >= 360.0:
+        return [(-180.0, 180.0)]
+    if lo < -180.0:
+        return [(-180.0, hi), (lo + 360.0, 180.0)]
+    if hi > 180.0:
+        return [(lo, 180.0), (-180.0, hi - 360.0)]
+    return [(lo, hi)]
+
+
+class SpatialStore:
+    def __init__(
+        self,
+        path: Path,
+        cell_meters: float = 100.0,
+        time_func: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.cell_meters = float(cell_meters)
+        self._time = time_func
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def cell(self, lat: float, lng: float) -> tuple:
+        size = self.cell_meters / METERS_PER_DEGREE
+        return math.floor(lat / size), math.floor(lng / size)
+
+    def put(self, namespace: str, lat: float, lng: float, value: Any) -> None:
+        """Insert or replace the value stored at (rounded) lat/lng."""
+        lat, lng = round(float(lat), 6), round(float(lng), 6)
+        cell_y, cell_x = self.cell(lat, lng)
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO points (namespace, lat, lng, cell_y, cell_x, value, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, lat, lng, cell_y, cell_x, json.dumps(value, default=str), self._time()),
+            )
+
+    def nearest(
+        self,
+        namespace: str,
+        lat: float,
+        lng: float,
+        radius_m: float,
+        max_age_seconds: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Closest entry within radius_m (and max_age_seconds, if given), or None."""
+        lat, lng = float(lat), float(lng)
+        size = self.cell_meters / METERS_PER_DEGREE
+        dlat = radius_m / METERS_PER_DEGREE
+        dlng = dlat / max(0.01, math.cos(math.radians(lat)))
+        y0, y1 = math.floor((lat - dlat) / size), math.floor((lat + dlat) / size)
+        x_ranges = [(math.floor(lo / size), math.floor(hi / size)) for lo, hi in _lng_ranges(lng - dlng, lng + dlng)]
+        now = self._time()
+        min_created = now - max_age_seconds if max_age_seconds is not None else float("-inf")
+        rows = []
+        with self._lock:
+            conn = self._connect()
+            for cell_y in range(y0, y1 + 1):
+                for x0, x1 in x_ranges:
+                    rows.extend(conn.execute(_NEAREST_SQL, (namespace, cell_y, x0, x1, min_created)).fetchall())
+        best = None
+        for plat, plng, value, created_at in rows:
+            distance = haversine_m(lat, lng, plat, plng)
+            if distance <= radius_m and (best is None or distance < best[0]):
+                best = (distance, plat, plng, value, created_at)
+        if best is None:
+            return None
+        distance, plat, plng, value, created_at = best
+        return {
+            "value": json.loads(value),
+            "lat": plat,
+            "lng": plng,
+            "distance_m": distance,
+            "age_seconds": now - created_at,
+        }
+
+    def prune(self, max_age_seconds: float, namespace: Optional[str] = None) -> int:
+        """Delete entries older than max_age_seconds; returns the number removed."""
+        cutoff = self._time() - max_age_seconds
+        with self._lock:
+            if namespace is None:
+                cur = self._connect().execute("DELETE FROM points WHERE created_at < ?", (cutoff,))
+            else:
+                cur = self._connect().execute(
+                    "DELETE FROM points WHERE namespace = ? AND created_at < ?", (namespace, cutoff)
+                )
+        return cur.rowcount
+
+    def count(self, namespace: Optional[str] = None) -> int:
+        with self._lock:
+            if namespace is None:
+                row = self._connect().execute("SELECT COUNT(*) FROM points").fetchone()
+            else:
+                row = self._connect().execute("SELECT COUNT(*) FROM points WHERE namespace = ?", (namespace,)).fetchone()
+        return int(row[0])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS points ("
+                " namespace TEXT NOT NULL, lat REAL NOT NULL, lng REAL NOT NULL,"
+                " cell_y INTEGER NOT NULL, cell_x INTEGER NOT NULL, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, PRIMARY KEY (namespace, lat, lng))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS points_cell ON points (namespace, cell_y, cell_x)")
+            self._conn = conn
+        return self._conn
@@ -3,19 +3,27 @@ Lightweight Spotify Web API client for SongAgent (Client Credentials flow).
 Supports search and track fetch. Token is cached in-memory.
 """
 
+import logging
 import time
 from typing import Dict, Any, List, Optional
 import requests
 from requests.auth import HTTPBasicAuth
 
-from hw4_tourguide.logger import get_logger
+from hw4_tourguide.logger import get_logger, log_event
+from hw4_tourguide.tools.response_cache import cached_call
+from hw4_tourguide.tools.single_flight import request_key, run_shared
 
 
 class SpotifyClient:
-    def __init__(self, client_id: str, client_secret: str, timeout: float = 10.0):
+    provider_name = "spotify"
+
+    def __init__(self, client_id: str, client_secret: str, timeout: float = 10.0, quota_ledger: Optional[Any] = None, single_flight: Optional[Any] = None, response_cache: Optional[Any] = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.timeout = timeout
+        self.quota_ledger = quota_ledger
+        self.single_flight = single_flight
+        self.response_cache = response_cache
         self._token: Optional[str] = None
         self._token_expiry: float = 0.0
         self.api_logger = get_logger("api")
@@ -36,12 +44,21 @@ class SpotifyClient:
         self._token_expiry = now + int(data.get("expires_in", 3600)) - 60  # refresh 1m early
         return self._token
 
+    def _charge_quota(self, units: int) -> None:
+        if self.quota_ledger is not None:
+            self.quota_ledger.consume(self.provider_name, units)
+
     def search_tracks(self, query: str, limit: int = 3, step_number: Optional[int] = None) -> List[Dict[str, Any]]:
-        log_extra = {"event_tag": "API_Call", "api_name": "Spotify", "method": "search", "step": step_number}
-        step_info = f" | Step {step_number}" if step_number is not None else ""
-        self.api_logger.info(
-            f"API_Call{step_info} | API: Spotify Search | Query: \"{query[:60]}\" | Max Results: {limit}",
-            extra=log_extra
+        key = request_key(self.provider_name, "search", {"q": query, "limit": limit})
+        return cached_call(self.response_cache, self.provider_name, key, lambda: run_shared(self.single_flight, key, lambda: self._search_tracks(query, limit, step_number)))
+
+    def _search_tracks(self, query: str, limit: int = 3, step_number: Optional[int] = None) -> List[Dict[str, Any]]:
+        log_fields = {"api_name": "Spotify", "method": "search", "step": step_number}
+        log_event(
+            self.api_logger, logging.INFO, "API_Call",
+            ("Step {step} | " if step_number is not None else "")
+            + "API: Spotify Search | Query: \"{query:.60}\" | Max Results: {limit}",
+            query=query, limit=limit, **log_fields,
         )
 
         try:
@@ -49,6 +66,7 @@ class SpotifyClient:
             token = self._ensure_token()
             headers = {"Authorization": f"Bearer {token}"}
             params = {"q": query, "type": "track", "limit": min(limit, 5)}
+            self._charge_quota(1)
             resp = requests.get(
                 "https://api.spotify.com/v1/search",
                 headers=headers,
@@ -76,40 +94,48 @@ class SpotifyClient:
                 )
 
             elapsed_ms = (time.time() - start) * 1000
-            self.api_logger.info(
-                f"API_Success | API: Spotify Search | Results: {len(results)} | Time: {elapsed_ms:.0f}ms",
-                extra={**log_extra, "event_tag": "API_Success", "results_count": len(results)}
+            log_event(
+                self.api_logger, logging.INFO, "API_Success",
+                "API: Spotify Search | Results: {results_count} | Time: {elapsed_ms:.0f}ms",
+                results_count=len(results), elapsed_ms=elapsed_ms, **log_fields,
             )
             return results
 
         except requests.exceptions.HTTPError as exc:
             status_code = exc.response.status_code if exc.response else "Unknown"
             reason = exc.response.reason if exc.response else str(exc)
-            self.api_logger.warning(
-                f"API_Failure | API: Spotify Search | Error: HTTPError {status_code} | "
-                f"Reason: {reason}",
-                extra={**log_extra, "event_tag": "API_Failure", "error_type": "HTTPError"}
+            log_event(
+                self.api_logger, logging.WARNING, "API_Failure",
+                "API: Spotify Search | Error: HTTPError {status_code} | Reason: {reason}",
+                status_code=status_code, reason=reason, error_type="HTTPError", **log_fields,
             )
             raise
         except Exception as exc:
-            self.api_logger.warning(
-                f"API_Failure | API: Spotify Search | Error: {type(exc).__name__}: {str(exc)[:100]}",
-                extra={**log_extra, "event_tag": "API_Failure", "error_type": type(exc).__name__}
+            log_event(
+                self.api_logger, logging.WARNING, "API_Failure",
+                "API: Spotify Search | Error: {error_type}: {error:.100}",
+                error_type=type(exc).__name__, error=str(exc), **log_fields,
             )
             raise
 
     def fetch_track(self, track_id: str, step_number: Optional[int] = None) -> Dict[str, Any]:
-        log_extra = {"event_tag": "API_Call", "api_name": "Spotify", "method": "fetch", "step": step_number}
-        step_info = f" | Step {step_number}" if step_number is not None else ""
-        self.api_logger.info(
-            f"API_Call{step_info} | API: Spotify Fetch | Track ID: {track_id}",
-            extra=log_extra
+        key = request_key(self.provider_name, "fetch", {"id": track_id})
+        return cached_call(self.response_cache, self.provider_name, key, lambda: run_shared(self.single_flight, key, lambda: self._fetch_track(track_id, step_number)))
+
+    def _fetch_track(self, track_id: str, step_number: Optional[int] = None) -> Dict[str, Any]:
+        log_fields = {"api_name": "Spotify", "method": "fetch", "step": step_number}
+        log_event(
+            self.api_logger, logging.INFO, "API_Call",
+            ("Step {step} | " if step_number is not None else "")
+            + "API: Spotify Fetch | Track ID: {track_id}",
+            track_id=track_id, **log_fields,
         )
 
         try:
             start = time.time()
             token = self._ensure_token()
             headers = {"Authorization": f"Bearer {token}"}
+            self._charge_quota(1)
             resp = requests.get(
                 f"https://api.spotify.com/v1/tracks/{track_id}",
                 headers=headers,
@@ -132,16 +158,17 @@ class SpotifyClient:
             }
 
             elapsed_ms = (time.time() - start) * 1000
-            self.api_logger.info(
-                f"API_Success | API: Spotify Fetch | Track: \"{details.get('title', 'N/A')[:50]}\" | "
-                f"Time: {elapsed_ms:.0f}ms",
-                extra={**log_extra, "event_tag": "API_Success"}
+            log_event(
+                self.api_logger, logging.INFO, "API_Success",
+                "API: Spotify Fetch | Track: \"{title:.50}\" | Time: {elapsed_ms:.0f}ms",
+                title=details.get("title", "N/A"), elapsed_ms=elapsed_ms, **log_fields,
             )
             return details
 
         except Exception as exc:
-            self.api_logger.warning(
-                f"API_Failure | API: Spotify Fetch | Track ID: {track_id} | Error: {type(exc).__name__}: {str(exc)[:100]}",
-                extra={**log_extra, "event_tag": "API_Failure", "error_type": type(exc).__name__}
+            log_event(
+                self.api_logger, logging.WARNING, "API_Failure",
+                "API: Spotify Fetch | Track ID: {track_id} | Error: {error_type}: {error:.100}",
+                track_id=track_id, error_type=type(exc).__name__, error=str(exc), **log_fields,
             )
             raise
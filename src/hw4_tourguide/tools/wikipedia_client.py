@@ -5,22 +5,39 @@ Uses keyless APIs: MediaWiki search + extracts; DuckDuckGo Instant Answer as fal
 
 from typing import Dict, Any, List, Optional
 import requests
+import logging
 import time
 
-from hw4_tourguide.logger import get_logger
+from hw4_tourguide.logger import get_logger, log_event
+from hw4_tourguide.tools.response_cache import cached_call
+from hw4_tourguide.tools.single_flight import request_key, run_shared
 
 
 class WikipediaClient:
-    def __init__(self, timeout: float = 10.0):
+    provider_name = "wikipedia"
+
+    def __init__(self, timeout: float = 10.0, quota_ledger: Optional[Any] = None, single_flight: Optional[Any] = None, response_cache: Optional[Any] = None):
         self.timeout = timeout
+        self.quota_ledger = quota_ledger
+        self.single_flight = single_flight
+        self.response_cache = response_cache
         self.api_logger = get_logger("api")
 
+    def _charge_quota(self, units: int) -> None:
+        if self.quota_ledger is not None:
+            self.quota_ledger.consume(self.provider_name, units)
+
     def search_articles(self, query: str, limit: int = 3, step_number: Optional[int] = None) -> List[Dict[str, Any]]:
-        log_extra = {"event_tag": "API_Call", "api_name": "Wikipedia", "method": "search", "step": step_number}
-        step_info = f" | Step {step_number}" if step_number is not None else ""
-        self.api_logger.info(
-            f"API_Call{step_info} | API: Wikipedia Search | Query: \"{query[:60]}\" | Max Results: {limit}",
-            extra=log_extra
+        key = request_key(self.provider_name, "search", {"q": query, "limit": limit})
+        return cached_call(self.response_cache, self.provider_name, key, lambda: run_shared(self.single_flight, key, lambda: self._search_articles(query, limit, step_number)))
+
+    def _search_articles(self, query: str, limit: int = 3, step_number: Optional[int] = None) -> List[Dict[str, Any]]:
+        log_fields = {"api_name": "Wikipedia", "method": "search", "step": step_number}
+        log_event(
+            self.api_logger, logging.INFO, "API_Call",
+            ("Step {step} | " if step_number is not None else "")
+            + "API: Wikipedia Search | Query: \"{query:.60}\" | Max Results: {limit}",
+            query=query, limit=limit, **log_fields,
         )
 
         try:
@@ -33,6 +50,7 @@ class WikipediaClient:
                 "srlimit": min(limit, 10),
             }
             headers = {"User-Agent": "hw4_tourguide/1.0 (student project)"}
+            self._charge_quota(1)
             resp = requests.get(
                 "https://en.wikipedia.org/w/api.php",
                 params=params,
@@ -58,31 +76,39 @@ class WikipediaClient:
                 )
 
             elapsed_ms = (time.time() - start) * 1000
-            self.api_logger.info(
-                f"API_Success | API: Wikipedia Search | Results: {len(results)} | Time: {elapsed_ms:.0f}ms",
-                extra={**log_extra, "event_tag": "API_Success", "results_count": len(results)}
+            log_event(
+                self.api_logger, logging.INFO, "API_Success",
+                "API: Wikipedia Search | Results: {results_count} | Time: {elapsed_ms:.0f}ms",
+                results_count=len(results), elapsed_ms=elapsed_ms, **log_fields,
             )
             return results
 
         except requests.exceptions.HTTPError as exc:
-            self.api_logger.warning(
-                f"API_Failure | API: Wikipedia Search | Error: HTTPError {exc.response.status_code}",
-                extra={**log_extra, "event_tag": "API_Failure", "error_type": "HTTPError"}
+            log_event(
+                self.api_logger, logging.WARNING, "API_Failure",
+                "API: Wikipedia Search | Error: HTTPError {status_code}",
+                status_code=exc.response.status_code, error_type="HTTPError", **log_fields,
             )
             raise
         except Exception as exc:
-            self.api_logger.warning(
-                f"API_Failure | API: Wikipedia Search | Error: {type(exc).__name__}: {str(exc)[:100]}",
-                extra={**log_extra, "event_tag": "API_Failure", "error_type": type(exc).__name__}
+            log_event(
+                self.api_logger, logging.WARNING, "API_Failure",
+                "API: Wikipedia Search | Error: {error_type}: {error:.100}",
+                error_type=type(exc).__name__, error=str(exc), **log_fields,
             )
             raise
 
     def fetch_article(self, article_id: str, step_number: Optional[int] = None) -> Dict[str, Any]:
-        log_extra = {"event_tag": "API_Call", "api_name": "Wikipedia", "method": "fetch", "step": step_number}
-        step_info = f" | Step {step_number}" if step_number is not None else ""
-        self.api_logger.info(
-            f"API_Call{step_info} | API: Wikipedia Fetch | Article ID: {article_id}",
-            extra=log_extra
+        key = request_key(self.provider_name, "fetch", {"id": article_id})
+        return cached_call(self.response_cache, self.provider_name, key, lambda: run_shared(self.single_flight, key, lambda: self._fetch_article(article_id, step_number)))
+
+    def _fetch_article(self, article_id: str, step_number: Optional[int] = None) -> Dict[str, Any]:
+        log_fields = {"api_name": "Wikipedia", "method": "fetch", "step": step_number}
+        log_event(
+            self.api_logger, logging.INFO, "API_Call",
+            ("Step {step} | " if step_number is not None else "")
+            + "API: Wikipedia Fetch | Article ID: {article_id}",
+            article_id=article_id, **log_fields,
         )
 
         try:
@@ -97,6 +123,7 @@ class WikipediaClient:
                 "inprop": "url",
             }
             headers = {"User-Agent": "hw4_tourguide/1.0 (student project)"}
+            self._charge_quota(1)
             resp = requests.get(
                 "https://en.wikipedia.org/w/api.php",
                 params=params,
@@ -119,32 +146,48 @@ class WikipediaClient:
             }
 
             elapsed_ms = (time.time() - start) * 1000
-            self.api_logger.info(
-                f"API_Success | API: Wikipedia Fetch | Article: \"{details.get('title', 'N/A')[:50]}\" | "
-                f"Time: {elapsed_ms:.0f}ms",
-                extra={**log_extra, "event_tag": "API_Success"}
+            log_event(
+                self.api_logger, logging.INFO, "API_Success",
+                "API: Wikipedia Fetch | Article: \"{title:.50}\" | Time: {elapsed_ms:.0f}ms",
+                title=details.get("title", "N/A"), elapsed_ms=elapsed_ms, **log_fields,
             )
             return details
 
         except Exception as exc:
-            self.api_logger.warning(
-                f"API_Failure | API: Wikipedia Fetch | Article ID: {article_id} | Error: {type(exc).__name__}: {str(exc)[:100]}",
-                extra={**log_extra, "event_tag": "API_Failure", "error_type": type(exc).__name__}
+            log_event(
+                self.api_logger, logging.WARNING, "API_Failure",
+                "API: Wikipedia Fetch | Article ID: {article_id} | "
+                "Error: {error_type}: {error:.100}",
+                article_id=article_id, error_type=type(exc).__name__, error=str(exc), **log_fields,
             )
             raise
 
 
 class DuckDuckGoClient:
-    def __init__(self, timeout: float = 10.0):
+    provider_name = "duckduckgo"
+
+    def __init__(self, timeout: float = 10.0, quota_ledger: Optional[Any] = None, single_flight: Optional[Any] = None, response_cache: Optional[Any] = None):
         self.timeout = timeout
+        self.quota_ledger = quota_ledger
+        self.single_flight = single_flight
+        self.response_cache = response_cache
         self.api_logger = get_logger("api")
 
+    def _charge_quota(self, units: int) -> None:
+        if self.quota_ledger is not None:
+            self.quota_ledger.consume(self.provider_name, units)
+
     def search_articles(self, query: str, limit: int = 3, step_number: Optional[int] = None) -> List[Dict[str, Any]]:
-        log_extra = {"event_tag": "API_Call", "api_name": "DuckDuckGo", "method": "search", "step": step_number}
-        step_info = f" | Step {step_number}" if step_number is not None else ""
-        self.api_logger.info(
-            f"API_Call{step_info} | API: DuckDuckGo Search | Query: \"{query[:60]}\" | Max Results: {limit}",
-            extra=log_extra
+        key = request_key(self.provider_name, "search", {"q": query, "limit": limit})
+        return cached_call(self.response_cache, self.provider_name, key, lambda: run_shared(self.single_flight, key, lambda: self._search_articles(query, limit, step_number)))
+
+    def _search_articles(self, query: str, limit: int = 3, step_number: Optional[int] = None) -> List[Dict[str, Any]]:
+        log_fields = {"api_name": "DuckDuckGo", "method": "search", "step": step_number}
+        log_event(
+            self.api_logger, logging.INFO, "API_Call",
+            ("Step {step} | " if step_number is not None else "")
+            + "API: DuckDuckGo Search | Query: \"{query:.60}\" | Max Results: {limit}",
+            query=query, limit=limit, **log_fields,
         )
 
         try:
@@ -152,6 +195,7 @@ class DuckDuckGoClient:
             # DDG Instant Answer returns a single best result; we wrap it as a list.
             params = {"q": query, "format": "json", "no_redirect": 1, "no_html": 1}
             headers = {"User-Agent": "hw4_tourguide/1.0 (student project)"}
+            self._charge_quota(1)
             resp = requests.get("https://api.duckduckgo.com/", params=params, timeout=self.timeout, headers=headers)
             resp.raise_for_status()
             data = resp.json()
@@ -179,26 +223,29 @@ class DuckDuckGoClient:
                     )
 
             elapsed_ms = (time.time() - start) * 1000
-            self.api_logger.info(
-                f"API_Success | API: DuckDuckGo Search | Results: {len(results)} | Time: {elapsed_ms:.0f}ms",
-                extra={**log_extra, "event_tag": "API_Success", "results_count": len(results)}
+            log_event(
+                self.api_logger, logging.INFO, "API_Success",
+                "API: DuckDuckGo Search | Results: {results_count} | Time: {elapsed_ms:.0f}ms",
+                results_count=len(results), elapsed_ms=elapsed_ms, **log_fields,
             )
             return results
 
         except Exception as exc:
-            self.api_logger.warning(
-                f"API_Failure | API: DuckDuckGo Search | Error: {type(exc).__name__}: {str(exc)[:100]}",
-                extra={**log_extra, "event_tag": "API_Failure", "error_type": type(exc).__name__}
+            log_event(
+                self.api_logger, logging.WARNING, "API_Failure",
+                "API: DuckDuckGo Search | Error: {error_type}: {error:.100}",
+                error_type=type(exc).__name__, error=str(exc), **log_fields,
             )
             raise
 
     def fetch_article(self, article_id: str, step_number: Optional[int] = None) -> Dict[str, Any]:
         # For DDG, fetch is effectively the same as search result
-        log_extra = {"event_tag": "API_Call", "api_name": "DuckDuckGo", "method": "fetch", "step": step_number}
-        step_info = f" | Step {step_number}" if step_number is not None else ""
-        self.api_logger.info(
-            f"API_Call{step_info} | API: DuckDuckGo Fetch | Article ID: {article_id}",
-            extra=log_extra
+        log_fields = {"api_name": "DuckDuckGo", "method": "fetch", "step": step_number}
+        log_event(
+            self.api_logger, logging.INFO, "API_Call",
+            ("Step {step} | " if step_number is not None else "")
+            + "API: DuckDuckGo Fetch | Article ID: {article_id}",
+            article_id=article_id, **log_fields,
         )
 
         return {
@@ -5,23 +5,44 @@ Uses API key (no OAuth), supports search + video details fetch with minimal fiel
 
 from typing import Dict, Any, List, Optional
 import requests
+import logging
 import time
 
-from hw4_tourguide.logger import get_logger
+from hw4_tourguide.logger import get_logger, log_event
+from hw4_tourguide.tools.response_cache import cached_call
+from hw4_tourguide.tools.single_flight import request_key, run_shared
+
+# YouTube Data API v3 quota cost per request (search.list / videos.list)
+SEARCH_QUOTA_UNITS = 100
+FETCH_QUOTA_UNITS = 1
 
 
 class YouTubeClient:
-    def __init__(self, api_key: str, timeout: float = 10.0):
+    provider_name = "youtube"
+
+    def __init__(self, api_key: str, timeout: float = 10.0, quota_ledger: Optional[Any] = None, single_flight: Optional[Any] = None, response_cache: Optional[Any] = None):
         self.api_key = api_key
         self.timeout = timeout
+        self.quota_ledger = quota_ledger
+        self.single_flight = single_flight
+        self.response_cache = response_cache
         self.api_logger = get_logger("api")
 
+    def _charge_quota(self, units: int) -> None:
+        if self.quota_ledger is not None:
+            self.quota_ledger.consume(self.provider_name, units)
+
     def search_videos(self, query: str, limit: int = 3, location: Optional[Dict[str, float]] = None, radius_km: Optional[float] = None, step_number: Optional[int] = None) -> List[Dict[str, Any]]:
-        log_extra = {"event_tag": "API_Call", "api_name": "YouTube", "method": "search", "step": step_number}
-        step_info = f" | Step {step_number}" if step_number is not None else ""
-        self.api_logger.info(
-            f"API_Call{step_info} | API: YouTube Search | Query: \"{query[:60]}\" | Max Results: {limit}",
-            extra=log_extra
+        key = request_key(self.provider_name, "search", {"q": query, "limit": limit, "location": location, "radius_km": radius_km})
+        return cached_call(self.response_cache, self.provider_name, key, lambda: run_shared(self.single_flight, key, lambda: self._search_videos(query, limit, location, radius_km, step_number)))
+
+    def _search_videos(self, query: str, limit: int = 3, location: Optional[Dict[str, float]] = None, radius_km: Optional[float] = None, step_number: Optional[int] = None) -> List[Dict[str, Any]]:
+        log_fields = {"api_name": "YouTube", "method": "search", "step": step_number}
+        log_event(
+            self.api_logger, logging.INFO, "API_Call",
+            ("Step {step} | " if step_number is not None else "")
+            + "API: YouTube Search | Query: \"{query:.60}\" | Max Results: {limit}",
+            query=query, limit=limit, **log_fields,
         )
 
         try:
@@ -37,6 +58,7 @@ class YouTubeClient:
             if location and radius_km:
                 params["location"] = f"{location.get('lat')},{location.get('lng')}"
                 params["locationRadius"] = f"{radius_km}km"
+            self._charge_quota(SEARCH_QUOTA_UNITS)
             resp = requests.get(
                 "https://www.googleapis.com/youtube/v3/search",
                 params=params,
@@ -62,35 +84,42 @@ class YouTubeClient:
                 )
 
             elapsed_ms = (time.time() - start) * 1000
-            self.api_logger.info(
-                f"API_Success | API: YouTube Search | Results: {len(results)} | Time: {elapsed_ms:.0f}ms | "
-                f"Quota: ~{len(results) * 100} units",
-                extra={**log_extra, "event_tag": "API_Success", "results_count": len(results), "quota_cost": len(results) * 100}
+            log_event(
+                self.api_logger, logging.INFO, "API_Success",
+                "API: YouTube Search | Results: {results_count} | Time: {elapsed_ms:.0f}ms | "
+                "Quota: ~{quota_cost} units",
+                results_count=len(results), elapsed_ms=elapsed_ms, quota_cost=len(results) * 100, **log_fields,
             )
             return results
 
         except requests.exceptions.HTTPError as exc:
             status_code = exc.response.status_code if exc.response else "Unknown"
             reason = exc.response.reason if exc.response else str(exc)
-            self.api_logger.warning(
-                f"API_Failure | API: YouTube Search | Error: HTTPError {status_code} | "
-                f"Reason: {reason}",
-                extra={**log_extra, "event_tag": "API_Failure", "error_type": "HTTPError"}
+            log_event(
+                self.api_logger, logging.WARNING, "API_Failure",
+                "API: YouTube Search | Error: HTTPError {status_code} | Reason: {reason}",
+                status_code=status_code, reason=reason, error_type="HTTPError", **log_fields,
             )
             raise
         except Exception as exc:
-            self.api_logger.warning(
-                f"API_Failure | API: YouTube Search | Error: {type(exc).__name__}: {str(exc)[:100]}",
-                extra={**log_extra, "event_tag": "API_Failure", "error_type": type(exc).__name__}
+            log_event(
+                self.api_logger, logging.WARNING, "API_Failure",
+                "API: YouTube Search | Error: {error_type}: {error:.100}",
+                error_type=type(exc).__name__, error=str(exc), **log_fields,
             )
             raise
 
     def fetch_video(self, video_id: str, step_number: Optional[int] = None) -> Dict[str, Any]:
-        log_extra = {"event_tag": "API_Call", "api_name": "YouTube", "method": "fetch", "step": step_number}
-        step_info = f" | Step {step_number}" if step_number is not None else ""
-        self.api_logger.info(
-            f"API_Call{step_info} | API: YouTube Fetch | Video ID: {video_id}",
-            extra=log_extra
+        key = request_key(self.provider_name, "fetch", {"id": video_id})
+        return cached_call(self.response_cache, self.provider_name, key, lambda: run_shared(self.single_flight, key, lambda: self._fetch_video(video_id, step_number)))
+
+    def _fetch_video(self, video_id: str, step_number: Optional[int] = None) -> Dict[str, Any]:
+        log_fields = {"api_name": "YouTube", "method": "fetch", "step": step_number}
+        log_event(
+            self.api_logger, logging.INFO, "API_Call",
+            ("Step {step} | " if step_number is not None else "")
+            + "API: YouTube Fetch | Video ID: {video_id}",
+            video_id=video_id, **log_fields,
         )
 
         try:
@@ -100,6 +129,7 @@ class YouTubeClient:
                 "id": video_id,
                 "key": self.api_key,
             }
+            self._charge_quota(FETCH_QUOTA_UNITS)
             resp = requests.get(
                 "https://www.googleapis.com/youtube/v3/videos",
                 params=params,
@@ -125,16 +155,18 @@ class YouTubeClient:
             }
 
             elapsed_ms = (time.time() - start) * 1000
-            self.api_logger.info(
-                f"API_Success | API: YouTube Fetch | Video: \"{details.get('title', 'N/A')[:50]}\" | "
-                f"Time: {elapsed_ms:.0f}ms | Quota: ~1 unit",
-                extra={**log_extra, "event_tag": "API_Success", "api_name": "YouTube"}
+            log_event(
+                self.api_logger, logging.INFO, "API_Success",
+                "API: YouTube Fetch | Video: \"{title:.50}\" | Time: {elapsed_ms:.0f}ms | "
+                "Quota: ~1 unit",
+                title=details.get("title", "N/A"), elapsed_ms=elapsed_ms, **log_fields,
             )
             return details
 
         except Exception as exc:
-            self.api_logger.warning(
-                f"API_Failure | API: YouTube Fetch | Video ID: {video_id} | Error: {type(exc).__name__}: {str(exc)[:100]}",
-                extra={**log_extra, "event_tag": "API_Failure", "api_name": "YouTube", "error_type": type(exc).__name__}
+            log_event(
+                self.api_logger, logging.WARNING, "API_Failure",
+                "API: YouTube Fetch | Video ID: {video_id} | Error: {error_type}: {error:.100}",
+                video_id=video_id, error_type=type(exc).__name__, error=str(exc), **log_fields,
             )
             raise
@@ -0,0 +1,227 @@
+"""
+Span tracing for one pipeline run (route -> step -> agent -> query/search/fetch/LLM -> judge).
+
+A Tracer records finished spans in memory; the active span lives in a
+ContextVar, so instrumented code just calls `tracing.span(name, **attrs)`:
+it opens a child of whatever span is active and is a no-op when no trace is
+running (tests, replay, tools). Worker threads do not inherit context, so
+callables handed to executors are wrapped with `tracing.wrap(fn)`, which
+re-activates the submitting thread's span in the worker.
+
+Exports (written to the run's logs directory):
+- Chrome trace-event JSON (`trace.json`): open in Perfetto / chrome://tracing;
+  one row per thread, nested by time.
+- OTLP JSON (`trace.otlp.json`): the OTLP/HTTP JSON encoding of
+  ExportTraceServiceRequest, with parent/child span IDs.
+
+Memory is bounded by `max_spans`; spans beyond it are counted in `dropped`.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_FORMATS = ("chrome", "otlp", "both")
+
+_CURRENT: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("hw4_tourguide_span", default=None)
+
+
+class Span:
+    __slots__ = (
+        "tracer", "trace_id", "span_id", "parent_id", "name", "attributes",
+        "start_ns", "end_ns", "_start_perf_ns", "thread_id", "thread_name", "error", "_token",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        thread = threading.current_thread()
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self._start_perf_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.thread_id = thread.ident or 0
+        self.thread_name = thread.name
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[str] = None) -> None:
+        if self.end_ns is not None:
+            return
+        # Wall-clock start + monotonic duration: immune to clock steps mid-span
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._start_perf_ns)
+        if error:
+            self.error = error
+        self.tracer._finish(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or self.start_ns) - self.start_ns) / 1e6
+
+    def __enter__(self) -> "Span":
+        self._token = _CURRENT.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _CURRENT.reset(self._token)
+        self.end(error=f"{exc_type.__name__}: {exc}" if exc_type else None)
+
+
+class Tracer:
+    def __init__(self, max_spans: int = 100_000, service_name: str = "hw4_tourguide") -> None:
+        self.max_spans = max(1, int(max_spans))
+        self.service_name = service_name
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """Start a span without activating it (see `activate`); a span without parent starts a new trace."""
+        trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        return Span(self, name, trace_id, parent.span_id if parent else None, attributes)
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def finished(self) -> List[Span]:
+        with self._lock:
+            return list(self.spans)
+
+    # --- Exporters ---
+    def to_chrome(self) -> Dict[str, Any]:
+        spans = self.finished()
+        origin = min((s.start_ns for s in spans), default=0)
+        events: List[Dict[str, Any]] = []
+        threads: Dict[int, str] = {}
+        for s in sorted(spans, key=lambda s: s.start_ns):
+            threads.setdefault(s.thread_id, s.thread_name)
+            args = {k: _jsonable(v) for k, v in s.attributes.items()}
+            args.update(span_id=s.span_id, parent_id=s.parent_id)
+            if s.error:
+                args["error"] = s.error
+            events.append({
+                "name": s.name,
+                "cat": s.name.split(".")[0],
+                "ph": "X",
+                "ts": (s.start_ns - origin) / 1000.0,
+                "dur": ((s.end_ns or s.start_ns) - s.start_ns) / 1000.0,
+                "pid": os.getpid(),
+                "tid": s.thread_id,
+                "args": args,
+            })
+        for tid, thread_name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": thread_name}})
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"service": self.service_name, "start_unix_ns": origin, "dropped_spans": self.dropped},
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        otlp_spans = []
+        for s in self.finished():
+            record: Dict[str, Any] = {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                "attributes": [_otlp_attribute(k, v) for k, v in s.attributes.items()]
+                + [_otlp_attribute("thread.name", s.thread_name)],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            }
+            if s.parent_id:
+                record["parentSpanId"] = s.parent_id
+            otlp_spans.append(record)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "hw4_tourguide.tracing"}, "spans": otlp_spans}],
+            }]
+        }
+
+    def write(self, directory: Path, fmt: str = "chrome") -> List[Path]:
+        """Write the trace as `trace.json` (chrome) and/or `trace.otlp.json` (otlp) under directory."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        written: List[Path] = []
+        if fmt in ("chrome", "both"):
+            written.append(_write_json(directory / "trace.json", self.to_chrome()))
+        if fmt in ("otlp", "both"):
+            written.append(_write_json(directory / "trace.otlp.json", self.to_otlp()))
+        return written
+
+
+# --- Context helpers used by instrumented code ---
+def current_span() -> Optional[Span]:
+    return _CURRENT.get()
+
+
+def span(name: str, **attributes: Any) -> Any:
+    """Context manager for a child of the active span; a no-op (yields None) when nothing is being traced."""
+    parent = _CURRENT.get()
+    if parent is None:
+        return nullcontext(None)
+    return parent.tracer.start_span(name, parent=parent, **attributes)
+
+
+def activate(span_: Span) -> contextvars.Token:
+    return _CURRENT.set(span_)
+
+
+def deactivate(token: contextvars.Token) -> None:
+    _CURRENT.reset(token)
+
+
+def wrap(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind fn to the caller's active span so it is the parent inside an executor thread."""
+    parent = _CURRENT.get()
+    if parent is None:
+        return fn
+
+    def run_in_span(*args: Any, **kwargs: Any) -> Any:
+        token = _CURRENT.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _CURRENT.reset(token)
+
+    return run_in_span
+
+
+def _jsonable(value: Any) -> Any:
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        wrapped = {"boolValue": value}
+    elif isinstance(value, int):
+        wrapped = {"intValue": str(value)}
+    elif isinstance(value, float):
+        wrapped = {"doubleValue": value}
+    else:
+        wrapped = {"stringValue": str(value)}
+    return {"key": key, "value": wrapped}
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> Path:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(data, separators=(",", ":")))
+    os.replace(tmp, path)
+    return path
@@ -1,55 +1,195 @@
 """
-Lightweight schema validation hooks for agent results and judge decisions.
-Uses existing JSON schema files from docs/contracts but only enforces required keys
-to avoid heavy dependencies.
+Schema validation hooks for agent results and judge decisions.
+
+The JSON schemas ship inside the package (`hw4_tourguide/contracts`, mirrored
+in docs/contracts) and are loaded through importlib.resources, so validation
+no longer depends on the working directory. Each schema is parsed and
+compiled once per process into nested check closures covering the subset of
+JSON Schema the contracts use: type, enum, properties, required,
+additionalProperties and items. A valid document is checked without
+building paths or error objects; messages are only formatted on failure.
+
+Policy is best-effort, as before: results missing required top-level keys
+are dropped; other violations (wrong type, unknown enum value, ...) are
+logged once per distinct message and counted, unless `strict=True`, which
+drops them too.
 """
 
 import json
-from pathlib import Path
-from typing import Any, Dict, List
+import threading
+import time
+from functools import lru_cache
+from importlib import resources
+from typing import Any, Callable, Dict, List, Optional
 
 from hw4_tourguide.logger import get_logger
 
+Check = Callable[[Any], Optional[str]]
+
+_TYPES = {
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+    "null": type(None),
+}
+_MAX_REPORTED = 256
+
+
+@lru_cache(maxsize=None)
+def load_schema(name: str) -> Dict[str, Any]:
+    """Parse `<name>_schema.json` from the packaged contracts (cached per process)."""
+    try:
+        text = resources.files("hw4_tourguide.contracts").joinpath(f"{name}_schema.json").read_text()
+        return json.loads(text)
+    except (FileNotFoundError, ModuleNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+@lru_cache(maxsize=None)
+def compiled_schema(name: str) -> Check:
+    return compile_schema(load_schema(name))
+
+
+def compile_schema(schema: Dict[str, Any]) -> Check:
+    """Compile a JSON-schema subset into a check returning None (valid) or the first error message."""
+    type_names = schema.get("type") or []
+    if isinstance(type_names, str):
+        type_names = [type_names]
+    py_types = tuple(t for name in type_names for t in _flatten(_TYPES.get(name, ())))
+    # bool is an int subclass; only accept it where "boolean" is allowed
+    reject_bool = bool(py_types) and "boolean" not in type_names
+    expected = "|".join(type_names)
+    enum = tuple(schema["enum"]) if "enum" in schema else None
+    properties = {key: compile_schema(sub) for key, sub in schema.get("properties", {}).items()}
+    required = tuple(schema.get("required", ()))
+    additional = schema.get("additionalProperties", True)
+    closed = additional is False
+    additional_check = compile_schema(additional) if isinstance(additional, dict) else None
+    items_check = compile_schema(schema["items"]) if isinstance(schema.get("items"), dict) else None
+
+    def check(value: Any) -> Optional[str]:
+        if py_types and (not isinstance(value, py_types) or (reject_bool and isinstance(value, bool))):
+            return f"expected {expected}, got {type(value).__name__}"
+        if enum is not None and value not in enum:
+            return f"{value!r} not in {list(enum)}"
+        if isinstance(value, dict):
+            for key in required:
+                if key not in value:
+                    return f"missing required '{key}'"
+            for key, item in value.items():
+                sub = properties.get(key)
+                if sub is None:
+                    if closed:
+                        return f"unexpected property '{key}'"
+                    sub = additional_check
+                    if sub is None:
+                        continue
+                error = sub(item)
+                if error is not None:
+                    return f"{key}: {error}"
+        elif items_check is not None and isinstance(value, list):
+            for index, item in enumerate(value):
+                error = items_check(item)
+                if error is not None:
+                    return f"[{index}]: {error}"
+        return None
+
+    return check
+
+
+def _flatten(types: Any) -> tuple:
+    return types if isinstance(types, tuple) else (types,)
+
 
 class Validator:
-    def __init__(self):
+    def __init__(self, metrics: Optional[Any] = None, strict: bool = False):
         self.logger = get_logger("validator")
-        self.schemas = {
-            "agent_result": Path("docs/contracts/agent_result_schema.json"),
-            "judge_decision": Path("docs/contracts/judge_decision_schema.json"),
-        }
+        self.metrics = metrics
+        self.strict = strict
+        # Compiled once per process; constructing more Validators is free
+        self._agent_check = compiled_schema("agent_result")
+        self._judge_check = compiled_schema("judge_decision")
+        self._agent_required = tuple(load_schema("agent_result").get("required", ()))
+        self._judge_required = tuple(load_schema("judge_decision").get("required", ()))
+        # One Validator is shared by the orchestrator's worker threads
+        self._lock = threading.Lock()
+        self._reported: set = set()
+        self.calls = 0
+        self.total_time_s = 0.0
 
     def validate_agent_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        schema = self._load_schema("agent_result")
-        required = schema.get("required", [])
+        start = time.perf_counter()
         filtered: List[Dict[str, Any]] = []
         for res in results:
-            missing = [k for k in required if k not in res]
+            if not isinstance(res, dict):
+                self._report("Agent result", f"expected object, got {type(res).__name__}")
+                continue
+            missing = [k for k in self._agent_required if k not in res]
             if missing:
                 self.logger.warning(
                     f"Agent result missing required fields {missing}",
                     extra={"event_tag": "Validator"},
                 )
                 continue
+            error = self._agent_check(res)
+            if error is not None:
+                self._report(f"Agent result ({res.get('agent_type')})", error)
+                if self.strict:
+                    continue
             filtered.append(res)
+        self._record_time(start)
         return filtered
 
     def validate_judge_decision(self, decision: Dict[str, Any]) -> Dict[str, Any]:
-        schema = self._load_schema("judge_decision")
-        required = schema.get("required", [])
-        missing = [k for k in required if k not in decision]
+        start = time.perf_counter()
+        missing = [k for k in self._judge_required if k not in decision]
         if missing:
             self.logger.warning(
                 f"Judge decision missing required fields {missing}",
                 extra={"event_tag": "Validator"},
             )
+        else:
+            error = self._judge_check(decision)
+            if error is not None:
+                self._report("Judge decision", error)
+        self._record_time(start)
         return decision
 
     def _load_schema(self, name: str) -> Dict[str, Any]:
-        path = self.schemas.get(name)
-        if not path or not path.exists():
-            return {}
+        return load_schema(name)
+
+    def _report(self, kind: str, error: str) -> None:
+        self._increment_counter("validator.violations")
+        key = f"{kind}: {error}"
+        with self._lock:
+            if key in self._reported:
+                return
+            if len(self._reported) < _MAX_REPORTED:
+                self._reported.add(key)
+        self.logger.warning(
+            f"Schema_Violation | {key}",
+            extra={"event_tag": "Validator"},
+        )
+
+    def _record_time(self, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.calls += 1
+            self.total_time_s += elapsed
+        if not self.metrics:
+            return
+        try:
+            self.metrics.record_latency("validator.validate_ms", elapsed * 1000)
+        except Exception:
+            pass
+
+    def _increment_counter(self, name: str) -> None:
+        if not self.metrics:
+            return
         try:
-            return json.loads(path.read_text())
+            self.metrics.increment_counter(name)
         except Exception:
-            return {}
+            pass
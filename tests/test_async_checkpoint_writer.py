@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from hw4_tourguide.file_interface import AsyncCheckpointWriter
+
+
+class _GatedWriter(AsyncCheckpointWriter):
+    """Writer thread waits for `gate` so tests can fill the queue deterministically."""
+
+    def __init__(self, *args, **kwargs):
+        self.gate = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def _run(self):
+        self.gate.wait(5)
+        super()._run()
+
+
+class _Metrics:
+    def __init__(self):
+        self.counters, self.gauges, self.latencies = {}, {}, []
+
+    def increment_counter(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    def record_latency(self, name, value):
+        self.latencies.append(name)
+
+
+@pytest.mark.unit
+def test_writes_are_coalesced_readable_before_disk_and_flushed_on_close(tmp_path):
+    metrics = _Metrics()
+    writer = _GatedWriter(base_dir=tmp_path, metrics=metrics)
+    writer.write("tid", "02_a.json", {"v": 1})
+    writer.write("tid", "02_a.json", {"v": 2})
+    writer.write("tid", "03_b.json", {"v": 3})
+    assert not (tmp_path / "tid").exists()
+    assert writer.read("tid", "02_a.json") == {"v": 2}
+    assert [p.name for p in writer.list("tid")] == ["02_a.json", "03_b.json"]
+    writer.gate.set()
+    writer.close()
+    assert writer.read("tid", "02_a.json") == {"v": 2}
+    assert metrics.counters["checkpoint.coalesced"] == 1
+    assert metrics.gauges["checkpoint.queue_depth"] == 0
+    assert metrics.latencies.count("checkpoint.write_ms") == 2
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("policy,kept", [("drop_oldest", ["1", "2"]), ("drop_newest", ["0", "1"])])
+def test_full_queue_applies_drop_policy(tmp_path, policy, kept):
+    writer = _GatedWriter(base_dir=tmp_path, max_queue=2, drop_policy=policy)
+    for i in range(3):
+        writer.write("tid", f"{i}.json", {"i": i})
+    writer.gate.set()
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert writer.dropped == 1
+    assert sorted(p.stem for p in writer.list("tid")) == kept
+
+
+@pytest.mark.unit
+def test_default_policy_blocks_instead_of_dropping(tmp_path):
+    writer = _GatedWriter(base_dir=tmp_path, max_queue=1)
+    assert writer.drop_policy == "block"
+    writer.write("tid", "0.json", {"i": 0})
+    blocked = threading.Thread(target=writer.write, args=("tid", "1.json", {"i": 1}))
+    blocked.start()
+    blocked.join(0.05)
+    assert blocked.is_alive()
+    writer.gate.set()
+    blocked.join(5)
+    writer.close()
+    assert writer.dropped == 0
+    assert sorted(p.stem for p in writer.list("tid")) == ["0", "1"]
+
+
+@pytest.mark.unit
+def test_unknown_drop_policy_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        AsyncCheckpointWriter(base_dir=tmp_path, drop_policy="spill")
@@ -0,0 +1,61 @@
+import pytest
+
+from hw4_tourguide.file_interface import CheckpointWriter, stage_level
+
+STAGES = [
+    "00_route.json",
+    "02_agent_search_video_step_1.json",
+    "03_agent_fetch_song_step_1.json",
+    "04_judge_decision_step_1.json",
+    "05_final_output.json",
+]
+
+
+class _Metrics:
+    def __init__(self):
+        self.counters = {}
+
+    def increment_counter(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "level,expected",
+    [
+        ("off", []),
+        ("final", ["05_final_output.json"]),
+        ("decisions", ["00_route.json", "04_judge_decision_step_1.json", "05_final_output.json"]),
+        ("full", STAGES),
+    ],
+)
+def test_levels_select_stages(tmp_path, level, expected):
+    writer = CheckpointWriter(base_dir=tmp_path, level=level)
+    for stage in STAGES:
+        writer.write("tid", stage, {"stage": stage})
+    assert [p.name for p in writer.list("tid")] == expected
+    assert stage_level("01_scheduler_queue.json") == "full"
+
+
+@pytest.mark.unit
+def test_full_sampling_keeps_whole_steps_and_counts_bytes(tmp_path):
+    metrics = _Metrics()
+    writer = CheckpointWriter(base_dir=tmp_path, full_sample_rate=0.5, metrics=metrics)
+    for step in range(1, 41):
+        for stage in ("02_agent_search_video", "02_agent_search_song", "03_agent_fetch_video"):
+            writer.write("tid", f"{stage}_step_{step}.json", {"step": step})
+        writer.write("tid", f"04_judge_decision_step_{step}.json", {"step": step})
+    names = [p.name for p in writer.list("tid")]
+    kept = {n.rsplit("_", 1)[1] for n in names if n.startswith("02_agent_search_video")}
+    assert 5 < len(kept) < 35
+    assert all(f"02_agent_search_song_step_{k}" in names for k in kept)
+    assert sum(n.startswith("04") for n in names) == 40
+    on_disk = sum(p.stat().st_size for p in (tmp_path / "tid").iterdir())
+    assert writer.bytes_written == on_disk == metrics.counters["checkpoint.bytes_written"]
+    assert metrics.counters["checkpoint.skipped"] == (40 - len(kept)) * 3
+
+
+@pytest.mark.unit
+def test_unknown_level_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        CheckpointWriter(base_dir=tmp_path, level="verbose")
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from hw4_tourguide.checkpoint_store import SEGMENT_FILENAME, SegmentCheckpointBackend, directory_to_segment, segment_to_directory
+from hw4_tourguide.file_interface import CheckpointWriter
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("compression", ["none", "gzip"])
+def test_checkpoint_writer_reads_and_lists_through_segment(tmp_path, compression):
+    writer = CheckpointWriter(base_dir=tmp_path, backend=SegmentCheckpointBackend(tmp_path, compression=compression))
+    writer.write("tid", "02_agent_search_video_step_1.json", {"q": ["a"]})
+    writer.write("tid", "04_judge_decision_step_1.json", {"v": 1})
+    writer.write("tid", "04_judge_decision_step_1.json", {"v": 2})
+    (tmp_path / "tid" / "00_route.json").write_text(json.dumps({"tasks": []}))
+
+    assert sorted(p.name for p in (tmp_path / "tid").iterdir()) == ["00_route.json", "checkpoints.seg"]
+    assert writer.read("tid", "04_judge_decision_step_1.json") == {"v": 2}
+    assert writer.read("tid", "00_route.json") == {"tasks": []}
+    assert [p.name for p in writer.list("tid")] == [
+        "00_route.json", "02_agent_search_video_step_1.json", "04_judge_decision_step_1.json",
+    ]
+    reopened = SegmentCheckpointBackend(tmp_path)
+    assert reopened.read("tid", "02_agent_search_video_step_1.json") == {"q": ["a"]}
+    assert reopened.stages("tid", prefix="04", step=1) == ["04_judge_decision_step_1.json"]
+    with pytest.raises(FileNotFoundError):
+        writer.read("tid", "03_missing.json")
+
+
+@pytest.mark.unit
+def test_truncated_tail_is_ignored(tmp_path):
+    backend = SegmentCheckpointBackend(tmp_path)
+    backend.append("tid", "a.json", {"ok": True})
+    backend.append("tid", "b.json", {"ok": False})
+    seg = backend.segment_path("tid")
+    seg.write_bytes(seg.read_bytes()[:-3])
+    assert SegmentCheckpointBackend(tmp_path).stages("tid") == ["a.json"]
+
+
+@pytest.mark.unit
+def test_round_trip_between_layouts(tmp_path):
+    src = tmp_path / "dir" / "tid"
+    src.mkdir(parents=True)
+    for i in range(3):
+        (src / f"02_stage_step_{i}.json").write_text(json.dumps({"i": i}, indent=2))
+    backend = SegmentCheckpointBackend(tmp_path / "seg", compression="gzip")
+    assert directory_to_segment(tmp_path / "dir", "tid", backend, remove=True) == 3
+    assert not list(src.glob("*.json"))
+    assert segment_to_directory(backend, "tid", tmp_path / "out") == 3
+    assert json.loads((tmp_path / "out" / "tid" / "02_stage_step_2.json").read_text()) == {"i": 2}
+
+
+@pytest.mark.unit
+def test_append_after_interrupted_write_truncates_corrupt_tail(tmp_path):
+    SegmentCheckpointBackend(tmp_path).append("tid", "a.json", {"v": 1})
+    path = tmp_path / "tid" / SEGMENT_FILENAME
+    with open(path, "ab") as handle:
+        handle.write(b"CKP1\x00")  # partial header from an interrupted append
+    SegmentCheckpointBackend(tmp_path).append("tid", "b.json", {"v": 2})
+    reopened = SegmentCheckpointBackend(tmp_path)
+    assert reopened.stages("tid") == ["a.json", "b.json"]
+    assert reopened.read("tid", "b.json") == {"v": 2}
@@ -105,6 +105,40 @@ def test_cli_logging_and_metrics(monkeypatch, tmp_path):
     assert code == 0
 
 
+@pytest.mark.unit
+def test_cli_failed_run_still_writes_trace(monkeypatch, tmp_path):
+    import json
+
+    config = {
+        "scheduler": {"interval": 0.1},
+        "orchestrator": {"max_workers": 1},
+        "agents": {"use_llm_for_queries": False},
+        "judge": {},
+        "output": {"checkpoint_dir": str(tmp_path / "checkpoints"), "checkpoints_enabled": False},
+        "route_provider": {"cache_dir": str(tmp_path), "api_retry_attempts": 1, "api_timeout": 0.1},
+        "metrics": {"enabled": True, "file": str(tmp_path / "metrics.json"), "update_interval": 0.01, "tracing": {"enabled": True}},
+        "circuit_breaker": {"enabled": False},
+    }
+
+    class _FailingOrchestrator:
+        def __init__(self, *args, **kwargs): pass
+        def run(self):
+            raise RuntimeError("worker pool exploded")
+
+    monkeypatch.setattr(cli, "setup_logging", lambda *args, **kwargs: None)
+    monkeypatch.setattr(cli, "Scheduler", mock.MagicMock())
+    monkeypatch.setattr(cli, "Orchestrator", _FailingOrchestrator)
+    monkeypatch.setattr(cli, "_select_route_provider", lambda c, m, l, cp_dir, metrics: mock.MagicMock(get_route=lambda o, d: {"tasks": [], "metadata": {}}))
+    monkeypatch.setattr(cli, "_build_agents", lambda *a, **k: {})
+    monkeypatch.setattr(cli, "JudgeAgent", mock.MagicMock())
+
+    args = SimpleNamespace(origin="A", destination="B", mode="cached", output=str(tmp_path / "out.json"))
+    assert cli.run_pipeline(config, args, mock.MagicMock()) == 1
+    events = json.loads((tmp_path / "logs" / "trace.json").read_text())["traceEvents"]
+    route = next(e for e in events if e.get("name") == "route")
+    assert "worker pool exploded" in route["args"]["error"]
+
+
 @pytest.mark.unit
 def test_cli_main_live_fallback(monkeypatch):
     # Force live mode with missing key -> stub provider path
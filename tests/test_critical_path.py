@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from hw4_tourguide import __main__ as cli
+from hw4_tourguide.critical_path import analyze_run, percentile
+
+
+def _span(sid, parent, name, start, end, **attrs):
+    return {"name": name, "ph": "X", "ts": start * 1000.0, "dur": (end - start) * 1000.0,
+            "pid": 1, "tid": 1, "args": dict(attrs, span_id=sid, parent_id=parent)}
+
+
+def _write_trace(run_dir, events):
+    (run_dir / "logs").mkdir(parents=True)
+    (run_dir / "logs" / "trace.json").write_text(json.dumps({"traceEvents": events}))
+
+
+@pytest.mark.unit
+def test_step_critical_path_follows_slowest_agent(tmp_path):
+    _write_trace(tmp_path, [
+        _span("r", None, "route", 0, 400),
+        _span("s1", "r", "step", 0, 300, step=1, transaction_id="t", queue_wait_ms=20.0),
+        _span("a1", "s1", "agent", 5, 100, agent="song"),
+        _span("a2", "s1", "agent", 5, 250, agent="video"),
+        _span("q", "a2", "query_gen", 5, 105, agent="video"),
+        _span("l", "q", "llm", 10, 100, purpose="query_generation"),
+        _span("x1", "a2", "search", 105, 160, agent="video", query_index=1),
+        _span("x2", "a2", "search", 160, 200, agent="video", query_index=2),
+        _span("f", "a2", "fetch", 200, 245, agent="video"),
+        _span("j", "s1", "judge", 250, 290),
+        _span("s2", "r", "step", 100, 150, step=2, transaction_id="t", queue_wait_ms=0.0),
+    ])
+    report = analyze_run(tmp_path)
+    step1 = report["steps"][0]
+    assert step1["critical_agent"] == "video" and step1["total_ms"] == 320.0
+    segments = {s["segment"]: s for s in step1["critical_path"]}
+    assert segments["video.llm_query_gen"]["ms"] == 90.0 and segments["video.llm_query_gen"]["provider"] == "llm"
+    assert segments["video.search[2]"]["provider"] == "youtube"
+    assert segments["judge"]["ms"] == 40.0 and segments["step.other"]["ms"] == 10.0
+    assert sum(s["ms"] for s in step1["critical_path"]) == pytest.approx(320.0)
+    assert report["route"]["slowest_step"] == 1
+    top = report["p95_contributors"][0]
+    assert (top["segment"], top["ms"]) == ("video.search", 95.0)
+
+
+@pytest.mark.unit
+def test_log_fallback_and_cli(tmp_path, capsys):
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "system.log").write_text(
+        "x | INFO | main | Orchestrator_Task_Complete | Orchestrator_Task_Complete | TID: t | Step 1 | Total Time: 120ms | Queue Depth: 0\n"
+        "x | INFO | main | Orchestrator_Task_Complete | Orchestrator_Task_Complete | TID: t | Step 2 | Total Time: 80ms | Queue Depth: 0\n"
+    )
+    out = tmp_path / "report.json"
+    assert cli.analyze_main([str(tmp_path), "--output", str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert report["source"] == "logs" and report["route"]["p95_ms"] == 120.0
+    assert cli.analyze_main([str(tmp_path / "missing")]) == 1
+    assert percentile([1, 2, 3, 4], 50) == 2
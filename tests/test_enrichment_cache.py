@@ -0,0 +1,109 @@
+from queue import Queue
+
+import pytest
+
+from hw4_tourguide.enrichment_cache import EnrichmentCache
+from hw4_tourguide.orchestrator import Orchestrator
+from hw4_tourguide.tools.spatial_store import SpatialStore, haversine_m
+
+
+class _Clock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Agent:
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, task):
+        self.calls += 1
+        return {"agent_type": "video", "status": "ok", "metadata": {"title": task["location_name"]}, "timestamp": "t"}
+
+
+class _Judge:
+    def evaluate(self, task, agent_results):
+        return {"transaction_id": task["transaction_id"], "overall_score": 80, "individual_scores": {}, "chosen_agent": "video", "timestamp": "t"}
+
+
+def _task(tid, step, lat, lng):
+    return {"transaction_id": tid, "step_number": step, "location_name": f"Step {step}", "coordinates": {"lat": lat, "lng": lng}}
+
+
+@pytest.mark.unit
+def test_spatial_store_nearest_respects_radius_and_age(tmp_path):
+    clock = _Clock()
+    store = SpatialStore(tmp_path / "s.sqlite", cell_meters=50, time_func=clock)
+    store.put("ns", 42.3601, -71.0589, {"name": "a"})
+    store.put("ns", 42.3700, -71.0589, {"name": "b"})
+    hit = store.nearest("ns", 42.3602, -71.0589, radius_m=50)
+    assert hit["value"] == {"name": "a"}
+    assert hit["distance_m"] == pytest.approx(haversine_m(42.3602, -71.0589, 42.3601, -71.0589))
+    assert store.nearest("ns", 42.3650, -71.0589, radius_m=50) is None
+    assert store.nearest("other", 42.3601, -71.0589, radius_m=50) is None
+    clock.now += 100
+    assert store.nearest("ns", 42.3601, -71.0589, radius_m=50, max_age_seconds=60) is None
+    assert store.prune(60) == 2
+
+
+@pytest.mark.unit
+def test_spatial_store_query_uses_both_cell_bounds_and_wraps_antimeridian(tmp_path):
+    from hw4_tourguide.tools.spatial_store import _NEAREST_SQL
+
+    store = SpatialStore(tmp_path / "s.sqlite", cell_meters=50)
+    store.put("ns", 10.0, -179.9999, {"name": "east of the antimeridian"})
+    hit = store.nearest("ns", 10.0, 179.9999, radius_m=50)
+    assert hit["value"]["name"] == "east of the antimeridian" and hit["distance_m"] < 50
+    plan = " ".join(
+        str(row[-1]) for row in store._connect().execute("EXPLAIN QUERY PLAN " + _NEAREST_SQL, ("ns", 0, 0, 1, 0.0))
+    )
+    assert "cell_y=? AND cell_x>? AND cell_x<?" in plan
+
+
+@pytest.mark.unit
+def test_orchestrator_reuses_nearby_step_enrichment(tmp_path):
+    cache = EnrichmentCache(SpatialStore(tmp_path / "e.sqlite"), radius_m=100)
+    agent = _Agent()
+    q = Queue()
+    for t in (_task("run1", 1, 42.3601, -71.0589), None):
+        q.put(t)
+    Orchestrator(queue=q, agents={"video": agent}, judge=_Judge(), max_workers=1, enrichment_cache=cache).run()
+
+    q = Queue()
+    for t in (_task("run2", 1, 42.3602, -71.0589), _task("run2", 2, 42.40, -71.10), None):
+        q.put(t)
+    results = Orchestrator(queue=q, agents={"video": agent}, judge=_Judge(), max_workers=1, enrichment_cache=cache).run()
+    reused = next(r for r in results if r["step_number"] == 1)
+    assert reused["enrichment_cache"]["transaction_id"] == "run1"
+    assert reused["judge"]["transaction_id"] == "run2"
+    assert "enrichment_cache" not in next(r for r in results if r["step_number"] == 2)
+    assert agent.calls == 2
+
+
+@pytest.mark.unit
+def test_failed_steps_are_not_cached(tmp_path):
+    cache = EnrichmentCache(SpatialStore(tmp_path / "e.sqlite"))
+    task = _task("tid", 1, 42.36, -71.05)
+    outputs = {"video": {"agent_type": "video", "status": "unavailable"}}
+    assert not cache.store_result(task, outputs, {"chosen_agent": "video"})
+    assert not cache.store_result(task, outputs, {"chosen_agent": None})
+    assert cache.lookup(task) is None
+
+
+@pytest.mark.unit
+def test_expired_entries_are_pruned_on_open_and_every_n_stores(tmp_path):
+    clock = _Clock()
+    store = SpatialStore(tmp_path / "e.sqlite", time_func=clock)
+    cache = EnrichmentCache(store, max_age_seconds=60, prune_every=2)
+    store.put("enrichment", 42.0, -71.0, {"old": True})
+    clock.now += 120
+    assert EnrichmentCache(store, max_age_seconds=60).store.count("enrichment") == 0  # pruned on open
+
+    outputs = {"video": {"agent_type": "video", "status": "ok"}}
+    assert cache.store_result(_task("t", 1, 42.1, -71.0), outputs, {"chosen_agent": "video"})
+    clock.now += 120
+    assert cache.store_result(_task("t", 2, 42.2, -71.0), outputs, {"chosen_agent": "video"})
+    assert store.count("enrichment") == 1  # second store triggered a prune of the first
@@ -0,0 +1,61 @@
+import pytest
+
+from hw4_tourguide.route_provider import GoogleMapsProvider
+from hw4_tourguide.tools.geocode_cache import NAMESPACE, GeocodeCache
+from hw4_tourguide.tools.spatial_store import SpatialStore
+
+
+class _Resp:
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        return None
+
+    def json(self):
+        return self._data
+
+
+GEOCODE = {"status": "OK", "results": [{"formatted_address": "Main St, Boston, MA", "address_components": []}]}
+
+
+@pytest.mark.unit
+def test_nearby_point_answered_locally_and_hit_rate_tracked(tmp_path):
+    cache = GeocodeCache(path=tmp_path / "g.sqlite", radius_m=10)
+    assert cache.lookup(42.36010, -71.05890) is None
+    cache.store_result(42.36010, -71.05890, {"location_name": "Main St", "address": "Main St, Boston"})
+    # ~5 m north: same answer; ~50 m north: miss
+    assert cache.lookup(42.36015, -71.05890)["location_name"] == "Main St"
+    assert cache.lookup(42.36055, -71.05890) is None
+    assert cache.hits == 1 and cache.misses == 2
+    assert cache.hit_rate() == pytest.approx(1 / 3)
+
+
+@pytest.mark.unit
+def test_provider_uses_persistent_cache_across_instances(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr("requests.get", lambda url, *a, **k: calls.append(url) or _Resp(GEOCODE))
+    first = GoogleMapsProvider(api_key="k", checkpoints_enabled=False, geocode_cache=GeocodeCache(path=tmp_path / "g.sqlite"))
+    assert first._reverse_geocode(42.3601, -71.0589)["location_name"] == "Main St"
+    second = GoogleMapsProvider(api_key="k", checkpoints_enabled=False, geocode_cache=GeocodeCache(path=tmp_path / "g.sqlite"))
+    assert second._reverse_geocode(42.36012, -71.05891)["address"] == "Main St, Boston, MA"
+    assert len(calls) == 1
+    assert second.geocode_cache.hit_rate() == 1.0
+
+
+@pytest.mark.unit
+def test_expired_entries_are_pruned_on_open_and_every_n_stores(tmp_path):
+    now = [1_700_000_000.0]
+    store = SpatialStore(tmp_path / "g.sqlite", time_func=lambda: now[0])
+    store.put(NAMESPACE, 42.0, -71.0, {"location_name": "old"})
+    store.put("enrichment", 42.0, -71.0, {"other": True})
+    now[0] += 120
+    cache = GeocodeCache(store=store, max_age_seconds=60, prune_every=2)
+    assert store.count(NAMESPACE) == 0  # pruned on open
+    assert store.count("enrichment") == 1  # other namespaces are left alone
+
+    cache.store_result(42.1, -71.0, {"location_name": "A"})
+    now[0] += 120
+    cache.store_result(42.2, -71.0, {"location_name": "B"})
+    assert store.count(NAMESPACE) == 1  # second store triggered a prune of the first
+    cache.close()
@@ -0,0 +1,62 @@
+import json
+import random
+
+import pytest
+
+from hw4_tourguide.tools.histogram import LatencyHistogram, bucket_bounds, bucket_index
+from hw4_tourguide.tools.metrics_collector import MetricsCollector
+
+
+@pytest.mark.unit
+def test_bucket_index_is_contiguous_and_bounded():
+    for value in (0, 1, 127, 128, 255, 256, 1_000, 123_456, 3_600_000_000):
+        low, high = bucket_bounds(bucket_index(value))
+        assert low <= value <= high
+        assert high - low <= max(1, value // 64)
+    assert bucket_index(3_600_000_000) < 2_000
+
+
+@pytest.mark.unit
+def test_percentiles_within_relative_error():
+    rng = random.Random(7)
+    values = [rng.uniform(1, 5_000) for _ in range(20_000)]
+    hist = LatencyHistogram()
+    for v in values:
+        hist.record(v)
+    ordered = sorted(values)
+    for q, label in ((50, "p50"), (90, "p90"), (99, "p99"), (99.9, "p999")):
+        exact = ordered[int(q / 100 * len(ordered)) - 1]
+        assert hist.summary()[label] == pytest.approx(exact, rel=0.02)
+    summary = hist.summary()
+    assert summary["count"] == 20_000
+    assert summary["min"] == pytest.approx(min(values), abs=1e-3)
+    assert summary["max"] == pytest.approx(max(values), abs=1e-3)
+
+
+@pytest.mark.unit
+def test_reservoir_and_merge():
+    a, b = LatencyHistogram(reservoir_size=5), LatencyHistogram()
+    for v in range(100):
+        a.record(float(v))
+        b.record(float(v + 100))
+    assert len(a.summary()["sample"]) == 5
+    a.merge(b)
+    assert a.count == 200 and a.max_ms == 199.0 and a.min_ms == 0.0
+    assert a.percentile(50) == pytest.approx(99.5, rel=0.02)
+
+
+@pytest.mark.unit
+def test_metrics_json_size_is_constant(tmp_path):
+    MetricsCollector.reset()
+    path = tmp_path / "metrics.json"
+    m = MetricsCollector(path=str(path), update_interval=10)
+    for i in range(1_000):
+        m.record_latency("judge.scoring_ms", float(i % 50))
+    m.flush()
+    small = path.stat().st_size
+    for i in range(50_000):
+        m.record_latency("judge.scoring_ms", float(i % 50))
+    m.flush()
+    MetricsCollector.reset()
+    assert abs(path.stat().st_size - small) < 16
+    assert "values" not in json.loads(path.read_text())["latencies"]["judge.scoring_ms"]
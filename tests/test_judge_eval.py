@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from hw4_tourguide.checkpoint_store import SegmentCheckpointBackend
+from hw4_tourguide.judge_eval import evaluate_corpus, iter_corpus_steps
+
+
+def _step(tid, n, chosen="video"):
+    return {
+        "transaction_id": tid,
+        "step_number": n,
+        "location": "Boston Common",
+        "instructions": "Walk through Boston Common",
+        "agents": {
+            "video": {"agent_type": "video", "status": "ok", "metadata": {"title": "Boston Common tour", "description": "park"}},
+            "song": {"agent_type": "song", "status": "ok", "metadata": {"title": "Song", "artist": "A", "album": "B"}},
+            "knowledge": {"agent_type": "knowledge", "status": "unavailable", "metadata": {}},
+        },
+        "judge": {"chosen_agent": chosen},
+    }
+
+
+def _corpus(root):
+    run = root / "run_a"
+    (run / "checkpoints" / "t1").mkdir(parents=True)
+    steps = [_step("t1", 1), _step("t1", 2, chosen="song")]
+    (run / "final_route.json").write_text(json.dumps(steps))
+    # Duplicate of the final output, must not be double counted
+    (run / "checkpoints" / "t1" / "05_final_output.json").write_text(json.dumps(steps))
+    SegmentCheckpointBackend(root / "run_b" / "checkpoints").append("t2", "04_judge_decision_step_1.json", _step("t2", 1))
+    replay = dict(_step("t3", 1), replayed=True)
+    (root / "run_a" / "replay_x").mkdir()
+    (root / "run_a" / "replay_x" / "final_route.json").write_text(json.dumps([replay]))
+
+
+@pytest.mark.unit
+def test_corpus_stream_dedups_and_skips_replays(tmp_path):
+    _corpus(tmp_path)
+    records = list(iter_corpus_steps(tmp_path))
+    assert sorted((r["tid"], r["step"]) for r in records) == [("t1", 1), ("t1", 2), ("t2", 1)]
+    assert {r["original"] for r in records} == {"video", "song"}
+
+
+@pytest.mark.unit
+def test_corpus_stream_dedups_per_run_and_skips_missing_tids(tmp_path, caplog):
+    for run in ("run_a", "run_b"):
+        (tmp_path / run).mkdir()
+        (tmp_path / run / "final_route.json").write_text(json.dumps([_step("t1", 1), dict(_step(None, 2))]))
+    from hw4_tourguide.logger import get_logger
+
+    logger = get_logger("judge_eval")
+    # Earlier setup_logging calls may leave the package logger non-propagating or above WARNING
+    caplog.set_level("WARNING", logger=logger.name)
+    logger.addHandler(caplog.handler)
+    try:
+        records = list(iter_corpus_steps(tmp_path))
+    finally:
+        logger.removeHandler(caplog.handler)
+    # The same tid in two run directories is kept twice; only in-run duplicates are dropped
+    assert [(r["tid"], r["step"]) for r in records] == [("t1", 1), ("t1", 1)]
+    skipped = {r.getMessage() for r in caplog.records if "without transaction_id" in r.getMessage()}
+    assert len(skipped) == 2  # one warning per run file (deduplicated in case the record also propagates)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("processes", [1, 2])
+def test_evaluate_corpus_reports_agreement_and_distribution(tmp_path, processes):
+    _corpus(tmp_path)
+    report = evaluate_corpus(
+        tmp_path,
+        variants={"base": {"presence": 0.3, "quality": 0.3, "relevance": 0.4},
+                  "quality_only": {"presence": 0.0, "quality": 1.0, "relevance": 0.0}},
+        processes=processes,
+        chunk_size=1,
+    )
+    assert report["steps"] == 3
+    assert report["original_choice_distribution"] == {"video": 2, "song": 1}
+    base = report["variants"]["base"]
+    assert sum(base["choice_distribution"].values()) == 3
+    assert base["agreement_with_original"] == pytest.approx(2 / 3, abs=1e-3)
+    assert set(report["pairwise_agreement"]) == {"base|quality_only"}
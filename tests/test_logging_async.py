@@ -0,0 +1,75 @@
+"""
+Tests for queue-based (async) logging.
+
+Verifies:
+- Records reach system.log / module files once the queue is flushed
+- Module files only receive their own loggers' records
+- A full queue drops and counts INFO records instead of blocking
+"""
+
+import logging
+from pathlib import Path
+
+import pytest
+
+from hw4_tourguide.logger import (
+    _DroppingQueueHandler,
+    flush_logging,
+    get_logger,
+    logging_stats,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+def _config(enabled: bool = True) -> dict:
+    return {
+        "level": "INFO",
+        "format": "%(levelname)s | %(name)s | %(event_tag)s | %(message)s",
+        "console_enabled": False,
+        "async_logging": {"enabled": enabled, "queue_size": 100},
+        "modules": {"agents": {"enabled": True}, "judge": {"enabled": True}},
+    }
+
+
+@pytest.mark.unit
+def test_async_logging_writes_after_flush(tmp_path: Path):
+    setup_logging(_config(), reset_existing=True, log_base_dir=tmp_path)
+    try:
+        get_logger("agent.video").info("Video hello %s", "world", extra={"event_tag": "Agent"})
+        get_logger("judge").warning("Judge careful")
+        flush_logging()
+
+        system_log = (tmp_path / "logs" / "system.log").read_text()
+        agents_log = (tmp_path / "logs" / "agents.log").read_text()
+        judge_log = (tmp_path / "logs" / "judge.log").read_text()
+        assert "Video hello world" in system_log and "Judge careful" in system_log
+        assert "Video hello world" in agents_log and "Judge careful" not in agents_log
+        assert "Judge careful" in judge_log and "Video hello" not in judge_log
+        assert "Judge careful" in (tmp_path / "logs" / "errors.log").read_text()
+        assert logging_stats()["async"] is True
+    finally:
+        shutdown_logging()
+    assert logging_stats()["async"] is False
+
+
+@pytest.mark.unit
+def test_sync_logging_has_no_listener(tmp_path: Path):
+    logger = setup_logging(_config(enabled=False), reset_existing=True, log_base_dir=tmp_path)
+    get_logger("main").info("Sync line")
+    assert not any(isinstance(h, _DroppingQueueHandler) for h in logger.handlers)
+    assert "Sync line" in (tmp_path / "logs" / "system.log").read_text()
+
+
+@pytest.mark.unit
+def test_full_queue_drops_info_and_counts():
+    import queue
+
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=1), block_timeout=0.0)
+    record = logging.LogRecord("hw4_tourguide.api", logging.INFO, __file__, 1, "msg", None, None)
+    handler.emit(record)
+    handler.emit(record)
+    warning = logging.LogRecord("hw4_tourguide.api", logging.WARNING, __file__, 1, "warn", None, None)
+    handler.emit(warning)
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
@@ -0,0 +1,94 @@
+"""
+Tests for structured hot-path events (log_event).
+
+Verifies:
+- Messages are rendered lazily (not at all when the level is disabled)
+- Per-event sampling / rate limits, with WARNING+ always kept
+- The JSON-lines sink carries raw fields that analysis tools can read
+"""
+
+import json
+import logging
+from pathlib import Path
+
+import pytest
+
+from hw4_tourguide.critical_path import analyze_run
+from hw4_tourguide.logger import (
+    _EventSampler,
+    flush_logging,
+    get_logger,
+    log_event,
+    logging_stats,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+class _CountingField:
+    def __init__(self) -> None:
+        self.renders = 0
+
+    def __format__(self, spec: str) -> str:
+        self.renders += 1
+        return "rendered"
+
+
+def _config(**events) -> dict:
+    return {
+        "level": "INFO",
+        "format": "%(event_tag)s | %(message)s",
+        "console_enabled": False,
+        "modules": {},
+        "events": {"jsonl_file": "logs/events.jsonl", **events},
+    }
+
+
+@pytest.mark.unit
+def test_log_event_renders_lazily(tmp_path: Path):
+    setup_logging(_config(), reset_existing=True, log_base_dir=tmp_path)
+    logger = get_logger("agent.video")
+    field = _CountingField()
+    log_event(logger, logging.DEBUG, "Agent_Search", "Query: {q}", q=field)
+    assert field.renders == 0
+    log_event(logger, logging.INFO, "Agent_Search", "Query: {q:.3} | Scores: {scores:.1f}", q=field, scores={"video": 1.25})
+    assert field.renders == 1
+    text = (tmp_path / "logs" / "system.log").read_text()
+    assert "Agent_Search | Agent_Search | Query: rendered | Scores: video: 1.2" in text
+
+
+@pytest.mark.unit
+def test_sampling_and_rate_limits_keep_failures():
+    sampler = _EventSampler({"API_Call": 0.25}, {"Scheduler_Emit": 1})
+    kept = [sampler.allow("API_Call", logging.INFO) for _ in range(8)]
+    assert kept.count(True) == 2 and kept[0] is True
+    assert all(sampler.allow("API_Call", logging.WARNING) for _ in range(3))
+    assert [sampler.allow("Scheduler_Emit", logging.INFO) for _ in range(3)].count(True) == 1
+    assert sampler.allow("Agent_Search", logging.INFO)
+    assert sampler.suppressed == {"API_Call": 6, "Scheduler_Emit": 2}
+
+
+@pytest.mark.unit
+def test_jsonl_sink_feeds_critical_path(tmp_path: Path):
+    config = _config(sampling={"API_Call": 0.0})
+    config["async_logging"] = {"enabled": True}
+    setup_logging(config, reset_existing=True, log_base_dir=tmp_path)
+    try:
+        logger = get_logger("orchestrator")
+        for step, ms in ((1, 120.0), (2, 80.0)):
+            log_event(
+                logger, logging.INFO, "Orchestrator_Task_Complete",
+                "TID: {transaction_id} | Step {step} | Total Time: {task_time_ms:.0f}ms",
+                transaction_id="t", step=step, task_time_ms=ms,
+            )
+        log_event(get_logger("api"), logging.INFO, "API_Call", "Query: {query}", query="x")
+        flush_logging()
+        assert logging_stats()["sampled_out"] == {"API_Call": 1}
+    finally:
+        shutdown_logging()
+
+    records = [json.loads(line) for line in (tmp_path / "logs" / "events.jsonl").read_text().splitlines()]
+    assert [r["fields"]["step"] for r in records] == [1, 2]
+    assert records[0]["message"].startswith("Orchestrator_Task_Complete | TID: t | Step 1")
+    report = analyze_run(tmp_path)
+    assert report["source"] == "logs" and report["route"]["p95_ms"] == 120.0
@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+from queue import Queue
+
+import pytest
+
+from hw4_tourguide.orchestrator import Orchestrator
+from hw4_tourguide.output_writer import OutputWriter, StepStreamWriter
+from hw4_tourguide.polyline import decode_polyline, sample_route, thin
+from hw4_tourguide.route_provider import GoogleMapsProvider, WindowedTasks
+
+
+def _straight_steps(n, step_km=10.0):
+    # Steps heading north along a meridian, ~step_km each, 10 minutes each
+    deg = step_km / 111.195
+    return [
+        {
+            "start_location": {"lat": 40.0 + i * deg, "lng": -100.0},
+            "end_location": {"lat": 40.0 + (i + 1) * deg, "lng": -100.0},
+            "duration": {"value": 600},
+            "html_instructions": f"Continue {i}",
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.unit
+def test_decode_polyline_reference_example():
+    points = decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+    assert points == [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+
+@pytest.mark.unit
+def test_sample_route_by_distance_and_time():
+    steps = _straight_steps(3)  # ~30 km, 30 minutes
+    by_km = sample_route(steps, every_m=5000)
+    assert len(by_km) == 6
+    assert by_km[0]["distance_m"] == pytest.approx(5000, rel=1e-3)
+    assert by_km[-1]["step_index"] == 2
+    by_min = sample_route(steps, every_s=600)
+    assert [round(s["elapsed_s"]) for s in by_min] == [600, 1200, 1800]
+    assert len(thin(by_km, 3)) == 3 and thin(by_km, 3)[-1] is by_km[-1]
+
+
+@pytest.mark.unit
+def test_long_route_mode_samples_and_coalesces(monkeypatch):
+    provider = GoogleMapsProvider(api_key="k", checkpoints_enabled=False, max_steps=8, long_route=True, sample_every_km=5, window_size=3)
+    monkeypatch.setattr(provider, "_reverse_geocode", lambda lat, lng: {"location_name": f"Exit {int((lat - 40.0) * 11.1195)}", "address": "a"})
+    data = {"status": "OK", "routes": [{"legs": [{"steps": _straight_steps(20)}]}]}
+    payload = provider._convert_response(data, "A", "B", "tid", time.time())
+    tasks = payload["tasks"]
+    assert isinstance(tasks, WindowedTasks)
+    assert payload["metadata"]["long_route"]["sampled_points"] == 40
+    emitted = list(tasks)
+    names = [t["location_name"] for t in emitted]
+    assert len(names) == len(set(names)) < 40
+    assert [t["step_number"] for t in emitted] == list(range(1, len(emitted) + 1))
+    assert any(t.get("coalesced_points", 1) > 1 for t in emitted)
+    assert tasks.count == len(emitted) and not hasattr(tasks, "__len__")
+
+    strict = GoogleMapsProvider(api_key="k", checkpoints_enabled=False, max_steps=8)
+    with pytest.raises(ValueError):
+        strict._convert_response(data, "A", "B", "tid", time.time())
+
+
+@pytest.mark.unit
+def test_long_route_checkpoint_is_streamed_as_tasks_are_emitted(tmp_path, monkeypatch):
+    provider = GoogleMapsProvider(api_key="k", checkpoint_dir=tmp_path, max_steps=8, long_route=True, sample_every_km=5, window_size=3)
+    monkeypatch.setattr(provider, "_reverse_geocode", lambda lat, lng: {"location_name": f"Exit {int((lat - 40.0) * 11.1195)}", "address": "a"})
+    data = {"status": "OK", "routes": [{"legs": [{"steps": _straight_steps(20)}]}]}
+    tasks = provider._convert_response(data, "A", "B", "tid", time.time())["tasks"]
+    path = tmp_path / "tid" / "00_route.json"
+    assert not path.exists()
+    emitted = list(tasks)
+    checkpoint = json.loads(path.read_text())
+    assert checkpoint["tasks"] == emitted
+    assert checkpoint["metadata"]["long_route"]["sampled_points"] == 40
+
+
+@pytest.mark.unit
+def test_step_stream_writer_iterates_steps_in_order(tmp_path):
+    stream = StepStreamWriter(tmp_path / "steps.jsonl")
+    for n in (3, 1, 2):
+        stream.write({"step_number": n, "location": f"L{n}", "judge": {}})
+    writer = OutputWriter(tmp_path / "out.json", tmp_path / "out.md", tmp_path / "out.csv")
+    assert [step["step_number"] for step in stream] == [1, 2, 3]
+    writer.write_json(stream)
+    writer.write_report(stream)
+    assert [step["step_number"] for step in json.loads((tmp_path / "out.json").read_text())] == [1, 2, 3]
+    assert (tmp_path / "out.md").read_text().index("L1") < (tmp_path / "out.md").read_text().index("L3")
+
+
+@pytest.mark.unit
+def test_orchestrator_window_bounds_in_flight_and_streams_results():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    class _Agent:
+        def run(self, task):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return {"agent_type": "video", "status": "ok", "metadata": {}, "timestamp": "t"}
+
+    class _Judge:
+        def evaluate(self, task, results):
+            return {"transaction_id": "tid", "overall_score": 1, "individual_scores": {}, "timestamp": "t"}
+
+    q = Queue()
+    for i in range(8):
+        q.put({"transaction_id": "tid", "step_number": i + 1, "location_name": f"L{i}"})
+    q.put(None)
+    streamed = []
+    results = Orchestrator(queue=q, agents={"video": _Agent()}, judge=_Judge(), max_workers=8, max_in_flight=2, on_result=streamed.append).run()
+    assert results == [] and sorted(r["step_number"] for r in streamed) == list(range(1, 9))
+    assert peak[0] <= 2
+
+
+@pytest.mark.unit
+def test_scheduler_reports_unknown_total_for_windowed_routes(caplog):
+    from hw4_tourguide.scheduler import Scheduler
+
+    tasks = WindowedTasks(
+        [{"i": i} for i in range(5)],
+        geocode=lambda sample: {"location_name": f"L{sample['i'] // 2}"},
+        build_task=lambda idx, sample, geocoded: {"transaction_id": "tid", "location_name": geocoded["location_name"]},
+        window_size=2,
+    )
+    q = Queue()
+    with caplog.at_level("INFO"):
+        Scheduler(tasks=tasks, interval=0, queue=q, checkpoints_enabled=False).run()
+    emitted = [q.get() for _ in range(q.qsize() - 1)]
+    assert [t["step_number"] for t in emitted] == [1, 2, 3] and tasks.count == 3
+    assert "Step 3/?: L2" in caplog.text
@@ -1,9 +1,10 @@
 import json
+import threading
 import time
 from pathlib import Path
 import pytest
 
-from hw4_tourguide.tools.metrics_collector import MetricsCollector
+from hw4_tourguide.tools.metrics_collector import MetricsCollector, ShardedMetricsCollector
 
 
 @pytest.mark.unit
@@ -33,3 +34,66 @@ def test_metrics_collector_auto_flush(tmp_path):
     m.stop()
     data = json.loads(path.read_text())
     assert data["counters"]["api_calls.spotify"] == 1
+
+
+@pytest.mark.unit
+def test_sharded_collector_merges_thread_shards(tmp_path):
+    MetricsCollector.reset()
+    m = ShardedMetricsCollector(path=str(tmp_path / "m.json"), update_interval=10)
+
+    def worker(n):
+        for _ in range(100):
+            m.increment_counter("api_calls.youtube")
+            m.record_latency("agent.video.search_ms", float(n))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    live = m.get_all()["counters"].get("api_calls.youtube", 0)
+    for t in threads:
+        t.join()
+    m.increment_counter("api_calls.youtube", 5)
+    data = m.get_all()
+    assert live <= 805
+    assert data["counters"]["api_calls.youtube"] == 805
+    assert data["latencies"]["agent.video.search_ms"]["count"] == 800
+    assert len(m._shards) == 1  # finished threads were folded into the base
+    assert m.get_all() == data
+    MetricsCollector.reset()
+
+
+@pytest.mark.unit
+def test_sharded_collector_gauge_last_writer_wins(tmp_path):
+    MetricsCollector.reset()
+    m = ShardedMetricsCollector(path=str(tmp_path / "m.json"), update_interval=10)
+    m.set_gauge("queue.depth", 1)
+    t = threading.Thread(target=m.set_gauge, args=("queue.depth", 7))
+    t.start()
+    t.join()
+    assert m.get_all()["gauges"]["queue.depth"] == 7
+    m.set_gauge("queue.depth", 2)
+    assert m.get_all()["gauges"]["queue.depth"] == 2
+    MetricsCollector.reset()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("cls", [MetricsCollector, ShardedMetricsCollector])
+def test_flush_skips_unchanged_and_appends_timeseries(tmp_path, cls):
+    path = tmp_path / "metrics.json"
+    series = tmp_path / "series.jsonl"
+    m = cls(path=str(path), update_interval=10, timeseries_path=str(series))
+    assert m.flush() is True  # first flush writes even when empty
+    assert m.flush() is False
+    m.increment_counter("scheduler.tasks_emitted")
+    m.record_latency("judge.scoring_ms", 12.0)
+    assert m.flush() is True
+    assert m.flush() is False
+    assert m.flush(force=True) is True
+    m.stop()
+    rows = [json.loads(line) for line in series.read_text().splitlines()]
+    assert len(rows) == 3
+    assert rows[-1]["counters"] == {"scheduler.tasks_emitted": 1}
+    assert rows[-1]["latencies"]["judge.scoring_ms"]["count"] == 1
+    assert m.flushes_skipped >= 2
+    assert json.loads(path.read_text())["counters"]["scheduler.tasks_emitted"] == 1
+    assert not list(tmp_path.glob(".*.tmp"))
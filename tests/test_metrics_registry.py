@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from hw4_tourguide.tools.metrics_collector import MetricsCollector, ShardedMetricsCollector
+from hw4_tourguide.tools.metrics_registry import MetricsRegistry
+
+
+@pytest.mark.unit
+def test_collectors_are_independent_per_run(tmp_path):
+    first = MetricsCollector(path=str(tmp_path / "a.json"), update_interval=10)
+    second = MetricsCollector(path=str(tmp_path / "b.json"), update_interval=10)
+    assert first is not second
+    first.increment_counter("api_calls.youtube", 2)
+    second.increment_counter("api_calls.youtube", 5)
+    first.stop()
+    second.stop()
+    assert json.loads((tmp_path / "a.json").read_text())["counters"]["api_calls.youtube"] == 2
+    assert json.loads((tmp_path / "b.json").read_text())["counters"]["api_calls.youtube"] == 5
+
+
+@pytest.mark.unit
+def test_registry_aggregates_live_and_retired_runs(tmp_path):
+    registry = MetricsRegistry(max_finished=1)
+    with registry.scoped("run-1", path=str(tmp_path / "r1.json"), update_interval=10) as m1:
+        assert isinstance(m1, ShardedMetricsCollector)
+        m1.increment_counter("scheduler.tasks_emitted", 3)
+        m1.record_latency("judge.scoring_ms", 10.0)
+    m2 = registry.create("run-2", sharded=False, path=str(tmp_path / "r2.json"), update_interval=10)
+    m2.increment_counter("scheduler.tasks_emitted", 4)
+    m2.record_latency("judge.scoring_ms", 30.0)
+
+    view = registry.aggregate()
+    assert registry.names() == ["run-2"]
+    assert view["counters"]["scheduler.tasks_emitted"] == 7
+    assert view["latencies"]["judge.scoring_ms"]["count"] == 2
+    assert view["runs"]["run-2"]["live"] is True
+    assert view["runs"]["run-1"]["counters"] == {"scheduler.tasks_emitted": 3}
+    assert json.loads((tmp_path / "r1.json").read_text())["counters"] == {"scheduler.tasks_emitted": 3}
+
+    registry.create("run-3", path=str(tmp_path / "r3.json"), update_interval=10)
+    registry.close()
+    assert list(registry.aggregate()["runs"]) == ["run-3"]  # only max_finished summaries kept
+    assert registry.aggregate()["counters"]["scheduler.tasks_emitted"] == 7
+
+
+@pytest.mark.unit
+def test_registry_rejects_duplicate_names(tmp_path):
+    registry = MetricsRegistry()
+    registry.create("tid-1", path=str(tmp_path / "m.json"), update_interval=10)
+    with pytest.raises(ValueError):
+        registry.create("tid-1", path=str(tmp_path / "m.json"), update_interval=10)
+    registry.close()
+    assert registry.retire("tid-1") is None
+
+
+@pytest.mark.unit
+def test_registry_labels_runs_independently_of_their_keys(tmp_path):
+    registry = MetricsRegistry()
+    registry.create("key-1", label="run_dir", path=str(tmp_path / "a.json"), update_interval=10)
+    registry.create("key-2", label="run_dir", path=str(tmp_path / "b.json"), update_interval=10)
+    assert {run["label"] for run in registry.aggregate()["runs"].values()} == {"run_dir"}
+    assert registry.retire("key-1")["label"] == "run_dir"
+    registry.close()
+    assert registry.aggregate()["runs"]["key-2"]["label"] == "run_dir"
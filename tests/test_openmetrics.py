@@ -0,0 +1,99 @@
+import socket
+import urllib.request
+
+import pytest
+
+from hw4_tourguide.tools.metrics_collector import MetricsCollector
+from hw4_tourguide.tools.metrics_registry import MetricsRegistry
+from hw4_tourguide.tools.openmetrics import OpenMetricsExporter, metric_name, render
+
+
+def _collector(tmp_path, name="run-1"):
+    m = MetricsCollector(path=str(tmp_path / f"{name}.json"), update_interval=10, name=name)
+    m.increment_counter("api_calls.youtube", 3)
+    m.set_gauge("queue.depth", 2)
+    m.set_gauge("judge.last_choice", "video")
+    for v in (4.0, 40.0, 400.0):
+        m.record_latency("agent.video.search_ms", v)
+    return m
+
+
+@pytest.mark.unit
+def test_render_counters_gauges_histograms(tmp_path):
+    m = _collector(tmp_path)
+    text = render([m])
+    m.stop()
+    assert metric_name("agent.video.search_ms") == "tourguide_agent_video_search_ms"
+    assert "# TYPE tourguide_api_calls_youtube counter" in text
+    assert 'tourguide_api_calls_youtube_total{run="run-1"} 3' in text
+    assert 'tourguide_queue_depth{run="run-1"} 2' in text
+    assert "judge_last_choice" not in text
+    assert 'tourguide_agent_video_search_ms_bucket{run="run-1",le="5.0"} 1' in text
+    assert 'tourguide_agent_video_search_ms_bucket{run="run-1",le="+Inf"} 3' in text
+    assert 'tourguide_agent_video_search_ms_count{run="run-1"} 3' in text
+    assert 'tourguide_agent_video_search_ms_quantiles{run="run-1",quantile="0.99"}' in text
+    assert text.endswith("# EOF\n")
+
+
+@pytest.mark.unit
+def test_buckets_respect_le_and_quantile_labels_are_literal(tmp_path):
+    m = MetricsCollector(path=str(tmp_path / "m.json"), update_interval=10, name="r")
+    m.record_latency("step_ms", 5.005)  # its histogram bucket starts below 5ms but ends above it
+    m.record_latency("step_ms", 0.9)
+    text = render([m])
+    m.stop()
+    assert 'tourguide_step_ms_bucket{run="r",le="1.0"} 1' in text
+    assert 'tourguide_step_ms_bucket{run="r",le="5.0"} 1' in text
+    assert 'tourguide_step_ms_bucket{run="r",le="10.0"} 2' in text
+    labels = [line.split('quantile="')[1].split('"')[0] for line in text.splitlines() if 'quantile="' in line]
+    assert labels == ["0.5", "0.9", "0.99", "0.999"]
+
+
+@pytest.mark.unit
+def test_registry_families_are_grouped(tmp_path):
+    registry = MetricsRegistry()
+    for name in ("a", "b"):
+        registry.create(name, path=str(tmp_path / f"{name}.json"), update_interval=10).increment_counter("api_calls.youtube")
+    text = OpenMetricsExporter(registry).render()
+    registry.close()
+    assert text.count("# TYPE tourguide_api_calls_youtube counter") == 1
+    assert 'run="a"' in text and 'run="b"' in text
+
+
+@pytest.mark.unit
+def test_textfile_and_http_exposition(tmp_path):
+    m = _collector(tmp_path)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    exporter = OpenMetricsExporter(m, textfile=tmp_path / "prom" / "metrics.prom", port=port, interval=10).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+            body = resp.read().decode()
+            assert resp.headers["Content-Type"].startswith("application/openmetrics-text")
+        assert "tourguide_api_calls_youtube_total" in body
+    finally:
+        exporter.stop()
+        m.stop()
+    assert (tmp_path / "prom" / "metrics.prom").read_text().endswith("# EOF\n")
+    assert not list((tmp_path / "prom").glob(".*.tmp"))
+
+
+@pytest.mark.unit
+def test_busy_port_is_logged_and_run_continues(tmp_path, caplog):
+    m = _collector(tmp_path)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(1)
+        exporter = OpenMetricsExporter(m, textfile=tmp_path / "metrics.prom", port=sock.getsockname()[1], interval=10)
+        exporter.logger.addHandler(caplog.handler)
+        caplog.set_level("WARNING", logger=exporter.logger.name)
+        try:
+            exporter.start()
+        finally:
+            exporter.logger.removeHandler(caplog.handler)
+    exporter.stop()
+    m.stop()
+    assert exporter.port == 0 and exporter._server is None
+    assert "OpenMetrics_Bind_Failed" in caplog.text
+    assert (tmp_path / "metrics.prom").read_text().endswith("# EOF\n")
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from hw4_tourguide import polyline
+from hw4_tourguide.polyline import assign_steps, cumulative_distances, decode_polyline, sample_polyline
+from hw4_tourguide.route_provider import GoogleMapsProvider
+
+REFERENCE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+@pytest.mark.unit
+def test_sample_polyline_spaces_points_by_distance_and_time():
+    total_m = cumulative_distances(decode_polyline(REFERENCE))[-1]
+    by_km = sample_polyline(REFERENCE, every_m=100_000, total_seconds=3600)
+    assert len(by_km) == int(total_m // 100_000) + 1
+    assert by_km[0]["distance_m"] == pytest.approx(100_000, rel=1e-6)
+    assert (by_km[-1]["lat"], by_km[-1]["lng"]) == (43.252, -126.453)
+    by_time = sample_polyline(REFERENCE, every_s=900, total_seconds=3600)
+    assert [round(s["elapsed_s"]) for s in by_time] == [900, 1800, 2700, 3600]
+    steps = [{"distance": {"value": total_m / 2}}, {"distance": {"value": total_m / 2}}]
+    assert [s["step_index"] for s in assign_steps(by_time, steps)] == [0, 0, 1, 1]
+
+
+@pytest.mark.unit
+def test_sample_all_routes_falls_back_to_overview_polyline(monkeypatch):
+    provider = GoogleMapsProvider(api_key="k", checkpoints_enabled=False, long_route=True, sample_all_routes=True, sample_every_km=100)
+    monkeypatch.setattr(provider, "_reverse_geocode", lambda lat, lng: {"location_name": f"{lat:.1f}", "address": "a"})
+    steps = [
+        {"end_location": {"lat": 40.7, "lng": -120.95}, "distance": {"value": 260_000}, "html_instructions": "North"},
+        {"end_location": {"lat": 43.252, "lng": -126.453}, "distance": {"value": 560_000}, "html_instructions": "West"},
+    ]
+    data = {"status": "OK", "routes": [{"overview_polyline": {"points": REFERENCE},
+                                        "legs": [{"duration": {"value": 3600}, "steps": steps}]}]}
+    payload = provider._convert_response(data, "A", "B", "tid", time.time())
+    assert payload["metadata"]["long_route"]["sampled_points"] > len(steps)
+    tasks = list(payload["tasks"])
+    assert tasks[0]["instructions"].startswith("North") and tasks[-1]["instructions"].startswith("West")
+
+
+@pytest.mark.unit
+def test_numpy_and_python_paths_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    fast = sample_polyline(REFERENCE, every_m=25_000, total_seconds=3600)
+    monkeypatch.setattr(polyline, "HAS_NUMPY", False)
+    slow = sample_polyline(REFERENCE, every_m=25_000, total_seconds=3600)
+    assert len(fast) == len(slow)
+    for a, b in zip(fast, slow):
+        assert a["lat"] == pytest.approx(b["lat"]) and a["distance_m"] == pytest.approx(b["distance_m"])
+
+
+@pytest.mark.unit
+def test_numpy_decoder_and_route_sampler_match_pure_python(monkeypatch):
+    pytest.importorskip("numpy")
+    encoded = ["", "??", REFERENCE, "_ibE_seK_seK_seK", "}_ilF`~zbM~b@nBfBzD"]
+    for text in encoded:
+        lats, lngs = polyline._decode_numpy(text)
+        expected = polyline._decode_python(text)
+        assert lats.tolist() == pytest.approx([p[0] for p in expected])
+        assert lngs.tolist() == pytest.approx([p[1] for p in expected])
+    steps = [
+        {"polyline": {"points": "_p~iF~ps|U_ulLnnqC"}, "duration": {"value": 1800}},
+        {"polyline": {"points": "_flwFn`faV_mqNvxq`@"}, "duration": {"value": 2400}},
+        {"start_location": {"lat": 43.252, "lng": -126.453}, "end_location": {"lat": 43.5, "lng": -126.6}, "duration": {"value": 600}},
+    ]
+    fast = [polyline.sample_route(steps, every_m=20_000), polyline.sample_route(steps, every_s=300)]
+    monkeypatch.setattr(polyline, "HAS_NUMPY", False)
+    slow = [polyline.sample_route(steps, every_m=20_000), polyline.sample_route(steps, every_s=300)]
+    for fast_samples, slow_samples in zip(fast, slow):
+        assert len(fast_samples) == len(slow_samples) > 2
+        for a, b in zip(fast_samples, slow_samples):
+            assert a["step_index"] == b["step_index"]
+            assert (a["lat"], a["lng"]) == pytest.approx((b["lat"], b["lng"]), abs=1e-6)
+            assert (a["distance_m"], a["elapsed_s"]) == pytest.approx((b["distance_m"], b["elapsed_s"]))
@@ -0,0 +1,81 @@
+import pytest
+
+from hw4_tourguide.agents.video_agent import VideoAgent
+from hw4_tourguide.tools.quota_ledger import QuotaLedger, QuotaExceededError
+from hw4_tourguide.tools.youtube_client import YouTubeClient
+
+
+class _Clock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.unit
+def test_ledger_charges_and_denies_over_budget(tmp_path):
+    ledger = QuotaLedger(path=tmp_path / "q.sqlite", daily_budgets={"youtube": 250})
+    assert ledger.try_consume("youtube", 100)
+    assert ledger.try_consume("youtube", 100)
+    assert not ledger.try_consume("youtube", 100)
+    assert ledger.used("youtube") == 200
+    assert ledger.remaining("youtube") == 50
+    with pytest.raises(QuotaExceededError):
+        ledger.consume("youtube", 100)
+    # Unbudgeted providers are recorded but never denied
+    assert ledger.try_consume("wikipedia", 5)
+    assert ledger.remaining("wikipedia") is None
+    assert ledger.snapshot()["wikipedia"]["used"] == 5
+
+
+@pytest.mark.unit
+def test_ledger_shared_between_instances_and_resets_daily(tmp_path):
+    clock = _Clock()
+    path = tmp_path / "q.sqlite"
+    a = QuotaLedger(path=path, daily_budgets={"llm_tokens": 1000}, time_func=clock)
+    b = QuotaLedger(path=path, daily_budgets={"llm_tokens": 1000}, time_func=clock)
+    a.record("llm_tokens", 950)
+    assert b.used("llm_tokens") == 950
+    assert b.mode("llm_tokens") == QuotaLedger.REDUCED
+    b.record("llm_tokens", 50)
+    assert a.mode("llm_tokens") == QuotaLedger.EXHAUSTED
+    clock.now += 86400
+    assert a.mode("llm_tokens") == QuotaLedger.NORMAL
+
+
+@pytest.mark.unit
+def test_youtube_client_charges_ledger_before_request(tmp_path, monkeypatch):
+    ledger = QuotaLedger(path=tmp_path / "q.sqlite", daily_budgets={"youtube": 150})
+    calls = []
+
+    class _Resp:
+        def raise_for_status(self):
+            return None
+
+        def json(self):
+            return {"items": [{"id": {"videoId": "v1"}, "snippet": {"title": "T"}}]}
+
+    monkeypatch.setattr("requests.get", lambda *a, **k: calls.append(1) or _Resp())
+    client = YouTubeClient(api_key="k", quota_ledger=ledger)
+    assert client.search_videos("boston", limit=1)[0]["id"] == "v1"
+    with pytest.raises(QuotaExceededError):
+        client.search_videos("boston", limit=1)
+    assert len(calls) == 1
+
+
+@pytest.mark.unit
+def test_agent_degrades_when_quota_exhausted(tmp_path):
+    ledger = QuotaLedger(path=tmp_path / "q.sqlite", daily_budgets={"youtube": 100})
+    ledger.record("youtube", 100)
+
+    class _Client:
+        provider_name = "youtube"
+
+        def search_videos(self, **kwargs):  # pragma: no cover - must not be called
+            raise AssertionError("search should be skipped")
+
+    agent = VideoAgent(config={"search_limit": 1}, client=_Client(), quota_ledger=ledger)
+    result = agent.run({"transaction_id": "tid", "step_number": 1, "location_name": "MIT", "search_hint": "MIT", "route_context": "Boston"})
+    assert result["status"] == "unavailable"
+    assert "quota" in result["reasoning"]
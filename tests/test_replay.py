@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from hw4_tourguide import __main__ as cli
+from hw4_tourguide.file_interface import CheckpointWriter
+from hw4_tourguide.replay import ReplayEngine, find_checkpoint_dir, load_steps
+
+
+def _record_run(base):
+    writer = CheckpointWriter(base_dir=base)
+    tasks = [
+        {"transaction_id": "tid", "step_number": i, "location_name": f"Place {i}", "instructions": f"Go {i}",
+         "coordinates": {"lat": 42.0, "lng": -71.0}}
+        for i in (1, 2)
+    ]
+    writer.write("tid", "00_route.json", {"tasks": tasks, "metadata": {"transaction_id": "tid"}})
+    for i in (1, 2):
+        writer.write("tid", f"02_agent_search_video_step_{i}.json", [{"id": "v"}])
+        writer.write("tid", f"03_agent_fetch_video_step_{i}.json", {"title": f"Video {i}", "url": "https://youtu.be/x", "reasoning": "r"})
+        writer.write("tid", f"02_agent_search_song_step_{i}.json", [])
+    # Step 2's knowledge result is only known from the judge decision (level "decisions")
+    writer.write("tid", "04_judge_decision_step_2.json", {
+        "step_number": 2, "agents": {"knowledge": {"agent_type": "knowledge", "status": "ok",
+                                                   "metadata": {"title": "Article"}, "reasoning": "k", "timestamp": "t", "error": None}},
+    })
+    return writer
+
+
+@pytest.mark.unit
+def test_load_steps_rebuilds_agent_results(tmp_path):
+    steps = load_steps(_record_run(tmp_path / "checkpoints"), "tid")
+    assert [s["task"]["location_name"] for s in steps] == ["Place 1", "Place 2"]
+    assert steps[0]["agents"]["video"]["status"] == "ok"
+    assert steps[0]["agents"]["video"]["metadata"]["title"] == "Video 1"
+    assert steps[0]["agents"]["song"]["status"] == "unavailable"
+    assert {"title": "", "url": ""}.items() <= steps[0]["agents"]["song"]["metadata"].items()
+    assert sorted(steps[1]["agents"]) == ["knowledge", "song", "video"]
+    assert find_checkpoint_dir("tid", tmp_path) == tmp_path / "checkpoints"
+    with pytest.raises(FileNotFoundError):
+        load_steps(CheckpointWriter(base_dir=tmp_path), "missing")
+
+
+@pytest.mark.unit
+def test_replay_engine_rejudges_every_step_in_parallel(tmp_path):
+    class _Judge:
+        scoring_mode = "heuristic"
+
+        def evaluate(self, task, results):
+            return {"transaction_id": task["transaction_id"], "chosen_agent": "video", "overall_score": 1.0,
+                    "individual_scores": {r["agent_type"]: 1.0 for r in results}, "timestamp": "t"}
+
+    results = ReplayEngine(_record_run(tmp_path), _Judge(), max_workers=2).run("tid")
+    assert [r["step_number"] for r in results] == [1, 2]
+    assert all(r["replayed"] and r["judge"]["chosen_agent"] == "video" for r in results)
+
+
+@pytest.mark.unit
+def test_replay_cli_writes_outputs(tmp_path, monkeypatch):
+    _record_run(tmp_path / "checkpoints")
+    out = tmp_path / "replay"
+    monkeypatch.setattr("sys.argv", ["hw4_tourguide", "replay", "tid", "--checkpoints", str(tmp_path / "checkpoints"),
+                                     "--output", str(out), "--weights", "presence=0.6,quality=0.2,relevance=0.2"])
+    assert cli.main() == 0
+    written = json.loads((out / "final_route.json").read_text())
+    assert [s["step_number"] for s in written] == [1, 2]
+    assert written[0]["judge"]["chosen_agent"] == "video"
+    assert cli.replay_main(["missing", "--checkpoints", str(tmp_path / "checkpoints")]) == 1
+
+
+@pytest.mark.unit
+def test_replay_weights_override_configured_weights(tmp_path, monkeypatch):
+    _record_run(tmp_path / "checkpoints")
+    config = tmp_path / "settings.yaml"
+    config.write_text("judge:\n  heuristic_weights:\n    presence: 0.5\n    quality: 0.1\n    relevance: 0.4\n")
+    seen = {}
+    real_judge = cli.JudgeAgent
+
+    def _judge(config, **kwargs):
+        seen.update(config["heuristic_weights"])
+        return real_judge(config=config, **kwargs)
+
+    monkeypatch.setattr(cli, "JudgeAgent", _judge)
+    assert cli.replay_main(["tid", "--checkpoints", str(tmp_path / "checkpoints"), "--config", str(config),
+                            "--output", str(tmp_path / "replay"), "--weights", "quality=0.2"]) == 0
+    assert seen == {"presence": 0.5, "quality": 0.2, "relevance": 0.4}
@@ -0,0 +1,132 @@
+import pytest
+
+from hw4_tourguide.tools.response_cache import ResponseCache
+from hw4_tourguide.tools.wikipedia_client import WikipediaClient
+
+
+class _Clock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.unit
+def test_hit_within_ttl_and_negative_entries_expire_sooner(tmp_path):
+    clock = _Clock()
+    cache = ResponseCache(path=tmp_path / "r.sqlite", ttl_seconds={"wikipedia": 3600}, negative_ttl_seconds=60, time_func=clock)
+    calls = []
+    fetch = lambda: calls.append(1) or [{"title": "MIT"}]
+    assert cache.get_or_fetch("wikipedia", "k", fetch) == [{"title": "MIT"}]
+    assert cache.get_or_fetch("wikipedia", "k", fetch) == [{"title": "MIT"}]
+    assert len(calls) == 1
+
+    empty_calls = []
+    empty = lambda: empty_calls.append(1) or []
+    cache.get_or_fetch("wikipedia", "none", empty)
+    cache.get_or_fetch("wikipedia", "none", empty)
+    assert len(empty_calls) == 1
+    clock.now += 120
+    cache.get_or_fetch("wikipedia", "none", empty)
+    assert len(empty_calls) == 2
+    assert len(calls) == 1
+
+
+@pytest.mark.unit
+def test_stale_entry_served_while_refreshing_in_background(tmp_path):
+    clock = _Clock()
+    cache = ResponseCache(path=tmp_path / "r.sqlite", ttl_seconds={"youtube": 10}, time_func=clock)
+    cache.put("youtube", "k", [{"id": "old"}])
+    clock.now += 60
+    assert cache.get_or_fetch("youtube", "k", lambda: [{"id": "new"}]) == [{"id": "old"}]
+    cache.wait_for_refreshes()
+    assert cache.get_or_fetch("youtube", "k", lambda: [{"id": "newer"}]) == [{"id": "new"}]
+
+
+@pytest.mark.unit
+def test_size_bound_evicts_least_recently_used(tmp_path):
+    clock = _Clock()
+    cache = ResponseCache(path=tmp_path / "r.sqlite", max_bytes=250, time_func=clock)
+    for i in range(5):
+        clock.now += 1
+        cache.put("spotify", f"k{i}", [{"name": "x" * 60}])
+    stats = cache.stats()
+    assert stats["bytes"] <= 250
+    assert stats["entries"] < 5
+    assert cache._get("k4") is not None
+    assert cache._get("k0") is None
+
+
+@pytest.mark.unit
+def test_hits_touch_lru_in_batches_and_before_eviction(tmp_path):
+    clock = _Clock()
+    cache = ResponseCache(path=tmp_path / "r.sqlite", max_bytes=250, time_func=clock)
+    for i in range(3):
+        clock.now += 1
+        cache.put("spotify", f"k{i}", [{"name": "x" * 60}])
+    clock.now += 1
+    assert cache._get("k0") is not None
+    # The hit is buffered, not written
+    row = cache._conn.execute("SELECT accessed_at FROM responses WHERE key = 'k0'").fetchone()
+    assert row[0] < clock.now and cache._touched == {"k0": clock.now}
+    clock.now += 1
+    cache.put("spotify", "k3", [{"name": "x" * 60}])
+    # k0 was hit after k1 was stored, so k1 is the least recently used
+    assert cache._get("k0") is not None and cache._get("k1") is None
+
+
+@pytest.mark.unit
+def test_running_size_matches_table_after_replace_and_evict(tmp_path):
+    clock = _Clock()
+    cache = ResponseCache(path=tmp_path / "r.sqlite", max_bytes=250, time_func=clock)
+    for i in (0, 1, 1, 2, 3, 3):
+        clock.now += 1
+        cache.put("spotify", f"k{i}", [{"name": "x" * (40 + i)}])
+    assert cache._total_bytes == cache.stats()["bytes"] <= 250
+    cache.close()
+    reopened = ResponseCache(path=tmp_path / "r.sqlite", max_bytes=250, time_func=clock)
+    reopened.put("spotify", "k4", [{"name": "y"}])
+    assert reopened._total_bytes == reopened.stats()["bytes"]
+
+
+@pytest.mark.unit
+def test_sqlite_errors_fall_through_to_fetch(tmp_path):
+    class _Metrics:
+        counters = {}
+
+        def increment_counter(self, name, value=1):
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    metrics = _Metrics()
+    cache = ResponseCache(path=tmp_path, metrics=metrics)  # a directory cannot be opened as a database
+    calls = []
+    fetch = lambda: calls.append(1) or [{"title": "MIT"}]
+    assert cache.get_or_fetch("wikipedia", "k", fetch) == [{"title": "MIT"}]
+    assert cache.get_or_fetch("wikipedia", "k", fetch) == [{"title": "MIT"}]
+    assert len(calls) == 2
+    assert metrics.counters["response_cache.errors"] == 4  # one read and one write per call
+
+    (tmp_path / "file").write_text("")
+    unwritable = ResponseCache(path=tmp_path / "file" / "r.sqlite", metrics=metrics)  # mkdir fails with OSError
+    assert unwritable.get_or_fetch("wikipedia", "k", fetch) == [{"title": "MIT"}]
+    assert metrics.counters["response_cache.errors"] == 6
+
+
+@pytest.mark.unit
+def test_client_skips_network_on_cache_hit(tmp_path, monkeypatch):
+    calls = []
+
+    class _Resp:
+        def raise_for_status(self):
+            return None
+
+        def json(self):
+            return {"query": {"search": [{"title": "MIT", "pageid": 1, "snippet": "s"}]}}
+
+    monkeypatch.setattr("requests.get", lambda *a, **k: calls.append(1) or _Resp())
+    cache = ResponseCache(path=tmp_path / "r.sqlite")
+    first = WikipediaClient(response_cache=cache).search_articles("MIT", limit=1)
+    second = WikipediaClient(response_cache=cache).search_articles("MIT", limit=1)
+    assert first == second
+    assert len(calls) == 1
@@ -0,0 +1,133 @@
+import json
+
+import pytest
+
+from hw4_tourguide.route_corpus import RouteCorpus, normalize_place
+from hw4_tourguide.route_provider import CachedRouteProvider, GoogleMapsProvider
+
+
+class _Clock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _payload(name, start=None, end=None):
+    return {
+        "tasks": [{"step_number": 1, "location_name": name, "coordinates": {"lat": 0, "lng": 0}, "instructions": "go"}],
+        "metadata": {"origin": "o", "destination": "d", "start_location": start, "end_location": end},
+    }
+
+
+@pytest.mark.unit
+def test_exact_fuzzy_and_geocoded_matches(tmp_path):
+    corpus = RouteCorpus(tmp_path)
+    corpus.store("Boston, MA", "MIT", _payload("a", {"lat": 42.355, "lng": -71.065}, {"lat": 42.360, "lng": -71.094}))
+    corpus.store("Harvard Square", "Fenway Park", _payload("b"))
+    assert normalize_place("Boston, MA, USA") == "boston ma"
+
+    reloaded = RouteCorpus(tmp_path)
+    assert reloaded.load("boston ma", "mit")["tasks"][0]["location_name"] == "a"
+    assert reloaded.load("Harvard Sq", "Fenway Park") is None
+    assert reloaded.load("Harvard Sq", "Fenway Park", fuzzy=True)["tasks"][0]["location_name"] == "b"
+    assert reloaded.load("42.3551,-71.0652", "42.3601,-71.0941")["tasks"][0]["location_name"] == "a"
+    assert reloaded.lookup("Chicago", "Denver") is None
+
+
+@pytest.mark.unit
+def test_written_back_routes_expire(tmp_path):
+    clock = _Clock()
+    corpus = RouteCorpus(tmp_path, time_func=clock)
+    corpus.store("A town", "B city", _payload("a"), ttl_seconds=60)
+    assert corpus.lookup("A town", "B city") is not None
+    clock.now += 120
+    assert corpus.lookup("A town", "B city") is None
+
+
+@pytest.mark.unit
+def test_concurrent_writers_merge_index_entries(tmp_path):
+    # Two corpora with their own cached index stand in for two processes
+    first, second = RouteCorpus(tmp_path), RouteCorpus(tmp_path)
+    assert first.lookup("A town", "B city") is None and second.lookup("C town", "D city") is None
+    first.store("A town", "B city", _payload("a"))
+    second.store("C town", "D city", _payload("c"))
+    index = json.loads((tmp_path / "index.json").read_text())
+    assert set(index) == {"a town|b city", "c town|d city"}
+    assert all(e["file"].startswith("live_") for e in index.values())
+    assert second.load("A town", "B city")["tasks"][0]["location_name"] == "a"
+
+
+@pytest.mark.unit
+def test_cached_provider_selects_matching_route_and_strict_miss_raises(tmp_path):
+    for name, origin in (("first", "Alpha"), ("second", "Boston, MA")):
+        doc = _payload(name)
+        doc["metadata"].update({"origin": origin, "destination": "MIT"})
+        (tmp_path / f"{name}.json").write_text(json.dumps(doc))
+    provider = CachedRouteProvider(cache_dir=tmp_path, checkpoints_enabled=False)
+    assert provider.get_route("Boston MA", "MIT")["tasks"][0]["location_name"] == "second"
+    strict = CachedRouteProvider(cache_dir=tmp_path, checkpoints_enabled=False, strict_match=True)
+    with pytest.raises(FileNotFoundError):
+        strict.get_route("Chicago", "Denver")
+    index = json.loads((tmp_path / "index.json").read_text())
+    assert {e["file"] for e in index.values()} == {"first.json", "second.json"}
+    assert all(e["legacy"] for e in index.values())
+    # Later processes use the persisted entry without re-parsing the file
+    (tmp_path / "first.json").write_text("not json")
+    assert RouteCorpus(tmp_path).lookup("Alpha", "MIT")[0].name == "first.json"
+
+
+@pytest.mark.unit
+def test_live_provider_writes_back_and_reuses_route(tmp_path, monkeypatch):
+    calls = []
+    directions = {
+        "status": "OK",
+        "routes": [{"legs": [{"distance": {"text": "1 mi"}, "duration": {"text": "2 mins"},
+                              "start_location": {"lat": 1.0, "lng": 2.0}, "end_location": {"lat": 1.1, "lng": 2.1},
+                              "steps": [{"end_location": {"lat": 1.1, "lng": 2.1}, "html_instructions": "Go"}]}]}],
+    }
+
+    class _Resp:
+        def __init__(self, data):
+            self._data = data
+
+        def raise_for_status(self):
+            return None
+
+        def json(self):
+            return self._data
+
+    def fake_get(url, *a, **k):
+        calls.append(url)
+        if "directions" in url:
+            return _Resp(directions)
+        return _Resp({"status": "OK", "results": [{"formatted_address": "Main St, Town", "address_components": []}]})
+
+    monkeypatch.setattr("requests.get", fake_get)
+    provider = GoogleMapsProvider(api_key="k", checkpoints_enabled=False, route_corpus=RouteCorpus(tmp_path), corpus_ttl_seconds=3600)
+    first = provider.get_route("A", "B")
+    second = provider.get_route("A", "B")
+    assert len(calls) == 2
+    provider.get_route("A", "C")
+    assert sum("directions" in url for url in calls) == 2
+    assert second["tasks"][0]["location_name"] == first["tasks"][0]["location_name"]
+    assert second["metadata"]["transaction_id"] != first["metadata"]["transaction_id"]
+    assert second["tasks"][0]["transaction_id"] == second["metadata"]["transaction_id"]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "recorded, query",
+    [
+        (("Portland, OR", "Seattle, WA"), ("Portland, ME", "Seattle, WA")),
+        (("Boston, MA", "Cambridge, MA"), ("Boston, MA", "Cambridge, MD")),
+        (("Springfield, IL", "Chicago, IL"), ("Springfield, MO", "Chicago, IL")),
+    ],
+)
+def test_state_suffix_near_misses_never_match(tmp_path, recorded, query):
+    corpus = RouteCorpus(tmp_path)
+    corpus.store(*recorded, _payload("recorded"))
+    assert corpus.lookup(*query) is None
+    assert corpus.lookup(*query, fuzzy=True) is None
+    assert corpus.lookup(*recorded) is not None
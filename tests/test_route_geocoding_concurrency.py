@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from hw4_tourguide.route_provider import GoogleMapsProvider, ProgressiveTasks
+
+
+def _directions(n):
+    steps = [
+        {"end_location": {"lat": 42.0 + i * 0.01, "lng": -71.0}, "html_instructions": f"Step {i}"}
+        for i in range(1, n + 1)
+    ]
+    return {"status": "OK", "routes": [{"legs": [{"distance": {"text": "1 mi"}, "duration": {"text": "2 mins"}, "steps": steps}]}]}
+
+
+@pytest.mark.unit
+def test_concurrent_geocoding_preserves_step_order(monkeypatch):
+    provider = GoogleMapsProvider(api_key="k", checkpoints_enabled=False, geocode_workers=4)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fake_geocode(lat, lng):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        # Later steps finish first
+        time.sleep(0.05 * (43.0 - lat))
+        with lock:
+            active[0] -= 1
+        return {"location_name": f"{lat:.2f}", "address": "addr"}
+
+    monkeypatch.setattr(provider, "_reverse_geocode", fake_geocode)
+    payload = provider._convert_response(_directions(4), "A", "B", "tid", time.time())
+    assert [t["step_number"] for t in payload["tasks"]] == [1, 2, 3, 4]
+    assert [t["location_name"] for t in payload["tasks"]] == ["42.01", "42.02", "42.03", "42.04"]
+    assert peak[0] > 1
+
+
+@pytest.mark.unit
+def test_progressive_mode_releases_first_step_before_last_geocode(monkeypatch):
+    provider = GoogleMapsProvider(api_key="k", checkpoints_enabled=False, geocode_workers=2, progressive_geocoding=True)
+    release_last = threading.Event()
+
+    def fake_geocode(lat, lng):
+        if lat > 42.015:
+            release_last.wait(2)
+        return {"location_name": f"{lat:.2f}", "address": "addr"}
+
+    monkeypatch.setattr(provider, "_reverse_geocode", fake_geocode)
+    tasks = provider._convert_response(_directions(2), "A", "B", "tid", time.time())["tasks"]
+    assert isinstance(tasks, ProgressiveTasks)
+    assert len(tasks) == 2
+    it = iter(tasks)
+    assert next(it)["step_number"] == 1
+    assert not release_last.is_set()
+    release_last.set()
+    assert next(it)["step_number"] == 2
+    assert list(it) == []
+    assert [t["step_number"] for t in tasks.tasks] == [1, 2]
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from hw4_tourguide.tools.single_flight import SingleFlight, request_key
+from hw4_tourguide.tools.wikipedia_client import WikipediaClient
+
+
+def _run_concurrently(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def _wait_for_coalesced(sf, n, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while sf.coalesced < n:
+        if time.monotonic() > deadline:
+            pytest.fail(f"only {sf.coalesced} of {n} callers coalesced within {timeout}s")
+        time.sleep(0.001)
+
+
+@pytest.mark.unit
+def test_request_key_is_order_independent_and_ignores_none():
+    a = request_key("youtube", "search", {"query": "MIT", "limit": 3, "location": None})
+    b = request_key("youtube", "search", {"limit": 3, "query": "MIT"})
+    assert a == b
+    assert a != request_key("spotify", "search", {"limit": 3, "query": "MIT"})
+
+
+@pytest.mark.unit
+def test_concurrent_identical_calls_share_one_execution():
+    sf = SingleFlight()
+    release = threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        release.wait(2)
+        return [{"id": "v1"}]
+
+    threads = _run_concurrently(5, lambda: results.append(sf.do("k", slow)))
+    _wait_for_coalesced(sf, 4)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1
+    assert results == [[{"id": "v1"}]] * 5
+    results[0][0]["id"] = "mutated"
+    assert results[1][0]["id"] == "v1"
+    assert sf.in_flight() == 0
+
+
+@pytest.mark.unit
+def test_leader_exception_propagates_to_followers():
+    sf = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        release.wait(2)
+        raise RuntimeError("boom")
+
+    def call():
+        try:
+            sf.do("k", failing)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    threads = _run_concurrently(3, call)
+    _wait_for_coalesced(sf, 2)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert errors == ["boom"] * 3
+
+
+@pytest.mark.unit
+def test_client_coalesces_identical_searches(monkeypatch):
+    sf = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    class _Resp:
+        def raise_for_status(self):
+            return None
+
+        def json(self):
+            return {"query": {"search": [{"title": "MIT", "pageid": 1, "snippet": "s"}]}}
+
+    def fake_get(*a, **k):
+        calls.append(1)
+        release.wait(2)
+        return _Resp()
+
+    monkeypatch.setattr("requests.get", fake_get)
+    client = WikipediaClient(single_flight=sf)
+    threads = _run_concurrently(4, lambda: client.search_articles("MIT", limit=1))
+    _wait_for_coalesced(sf, 3)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1
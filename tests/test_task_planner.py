@@ -0,0 +1,54 @@
+import pytest
+
+from hw4_tourguide.task_planner import TaskPlanner
+
+
+def _task(step, name, lat, lng=-71.0):
+    return {
+        "transaction_id": "tid",
+        "step_number": step,
+        "location_name": name,
+        "coordinates": {"lat": lat, "lng": lng},
+        "instructions": f"Step {step}",
+    }
+
+
+@pytest.mark.unit
+def test_plan_clusters_same_name_within_radius():
+    tasks = [
+        _task(1, "Main St", 42.0),
+        _task(2, "main st ", 42.0005),  # ~55 m away
+        _task(3, "Main St", 42.01),  # ~1.1 km away: new cluster
+        _task(4, "Elm St", 42.0005),
+        _task(5, "Unknown Location", 42.0),
+        _task(6, "Unknown Location", 42.0),
+    ]
+    planner = TaskPlanner(merge_radius_m=100)
+    planned = planner.plan(tasks)
+    assert [t["step_number"] for t in planned] == [1, 3, 4, 5, 6]
+    assert [t["step_number"] for t in planner.members[1]] == [2]
+
+
+@pytest.mark.unit
+def test_expand_fans_out_representative_result():
+    tasks = [_task(1, "Main St", 42.0), _task(2, "Main St", 42.0002), _task(3, "Elm St", 42.1)]
+    planner = TaskPlanner(merge_radius_m=100)
+    planned = planner.plan(tasks)
+    results = [
+        {"step_number": t["step_number"], "location": t["location_name"], "instructions": t["instructions"],
+         "agents": {"video": {"status": "ok"}}, "judge": {"chosen_agent": "video"}}
+        for t in planned
+    ]
+    expanded = planner.expand(results)
+    assert [r["step_number"] for r in expanded] == [1, 2, 3]
+    assert expanded[1]["coalesced_with"] == 1 and expanded[1]["instructions"] == "Step 2"
+    assert expanded[1]["judge"] == expanded[0]["judge"] and expanded[1]["judge"] is not expanded[0]["judge"]
+
+
+@pytest.mark.unit
+def test_zero_radius_and_lazy_sources_pass_through():
+    tasks = [_task(1, "Main St", 42.0), _task(2, "Main St", 42.0)]
+    assert TaskPlanner(merge_radius_m=0).plan(tasks) is tasks
+    lazy = iter(tasks)
+    planner = TaskPlanner()
+    assert planner.plan(lazy) is lazy and planner.expand([{"step_number": 1}]) == [{"step_number": 1}]
@@ -0,0 +1,64 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from hw4_tourguide import tracing
+from hw4_tourguide.tracing import Tracer
+
+
+@pytest.mark.unit
+def test_span_is_noop_without_active_trace():
+    with tracing.span("search") as span:
+        assert span is None
+    assert tracing.current_span() is None
+
+
+@pytest.mark.unit
+def test_parent_child_ids_cross_threads():
+    tracer = Tracer()
+    route = tracer.start_span("route")
+    token = tracing.activate(route)
+    try:
+        def step(n):
+            with tracing.span("step", step=n) as s:
+                with tracing.span("agent", agent="video"):
+                    pass
+                return s.span_id, threading.current_thread().name
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            step_ids = [r[0] for r in pool.map(tracing.wrap(step), [1, 2])]
+    finally:
+        tracing.deactivate(token)
+    route.end()
+
+    spans = {s.span_id: s for s in tracer.finished()}
+    steps = [spans[i] for i in step_ids]
+    assert all(s.parent_id == route.span_id and s.trace_id == route.trace_id for s in steps)
+    agents = [s for s in spans.values() if s.name == "agent"]
+    assert sorted(a.parent_id for a in agents) == sorted(step_ids)
+
+
+@pytest.mark.unit
+def test_errors_and_exports(tmp_path):
+    tracer = Tracer(max_spans=2)
+    with tracer.start_span("route", origin="A") as route:
+        with pytest.raises(ValueError):
+            with tracing.span("fetch", agent="song"):
+                raise ValueError("boom")
+        with tracing.span("judge"):
+            pass
+    assert tracer.dropped == 1  # route finished after the cap was hit
+
+    paths = tracer.write(tmp_path, "both")
+    assert [p.name for p in paths] == ["trace.json", "trace.otlp.json"]
+    chrome = json.loads((tmp_path / "trace.json").read_text())
+    complete = [e for e in chrome["traceEvents"] if e["ph"] == "X"]
+    assert {e["name"] for e in complete} == {"fetch", "judge"}
+    assert complete[0]["args"]["error"] == "ValueError: boom"
+    assert complete[0]["args"]["parent_id"] == route.span_id
+    otlp = json.loads((tmp_path / "trace.otlp.json").read_text())
+    spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert spans[0]["status"]["code"] == 2 and spans[0]["parentSpanId"] == route.span_id
+    assert {"key": "agent", "value": {"stringValue": "song"}} in spans[0]["attributes"]
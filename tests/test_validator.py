@@ -8,3 +8,105 @@ def test_validator_logs_missing_fields(caplog):
     v.validate_agent_results([{"agent_type": "video"}])
     v.validate_judge_decision({"transaction_id": "tid"})
     # Best-effort logging only; no exceptions should be raised
+
+
+def _agent(**overrides):
+    result = {"agent_type": "video", "status": "ok", "metadata": {"title": "t", "url": "u"},
+              "reasoning": "r", "timestamp": "2025-01-01T00:00:00Z", "error": None}
+    result.update(overrides)
+    return result
+
+
+class _Metrics:
+    def __init__(self):
+        self.counters, self.latencies = {}, []
+
+    def increment_counter(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_latency(self, name, value):
+        self.latencies.append(name)
+
+
+@pytest.mark.unit
+def test_compiled_schema_checks_types_and_enums():
+    from hw4_tourguide.validators import compiled_schema
+
+    check = compiled_schema("agent_result")
+    assert compiled_schema("agent_result") is check  # compiled once per process
+    assert check(_agent()) is None
+    assert "not in" in check(_agent(status="pending"))
+    assert check(_agent(metadata={"title": "t", "url": "u", "view_count": True})).startswith("metadata: view_count")
+    assert check(_agent(extra=1)) == "unexpected property 'extra'"
+    assert "citations: [0]" in check(_agent(metadata={"title": "t", "url": "u", "citations": [{"title": "x"}]}))
+
+
+@pytest.mark.unit
+def test_violations_are_counted_timed_and_dropped_only_when_strict(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # schemas come from package resources, not the CWD
+    metrics = _Metrics()
+    lenient = Validator(metrics=metrics)
+    kept = lenient.validate_agent_results([_agent(), _agent(status="pending"), {"agent_type": "song"}])
+    assert len(kept) == 2
+    assert len(Validator(strict=True).validate_agent_results([_agent(), _agent(status="pending")])) == 1
+    lenient.validate_judge_decision({"transaction_id": "t", "overall_score": "high", "individual_scores": {}, "timestamp": "t"})
+    assert metrics.counters["validator.violations"] == 2
+    assert metrics.latencies == ["validator.validate_ms"] * 2 and lenient.calls == 2
+
+
+@pytest.mark.unit
+def test_shared_validator_counts_and_reports_once_across_threads():
+    import threading
+
+    validator = Validator()
+    warnings = []
+    validator.logger = type("_Logger", (), {"warning": lambda self, msg, **kwargs: warnings.append(msg)})()
+
+    def _work():
+        for _ in range(200):
+            validator.validate_agent_results([_agent(status="pending")])
+
+    threads = [threading.Thread(target=_work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert validator.calls == 1600
+    assert len(warnings) == 1
+
+
+@pytest.mark.unit
+def test_packaged_contracts_match_docs():
+    import json
+    from pathlib import Path
+
+    from hw4_tourguide.validators import load_schema
+
+    for path in Path("docs/contracts").glob("*_schema.json"):
+        assert load_schema(path.name[: -len("_schema.json")]) == json.loads(path.read_text())
+
+
+@pytest.mark.unit
+def test_real_agent_and_judge_output_has_no_violations():
+    from hw4_tourguide.agents.video_agent import VideoAgent
+    from hw4_tourguide.judge import JudgeAgent
+    from hw4_tourguide.logger import get_logger
+
+    class _Client:
+        def search_videos(self, query, limit, **kwargs):
+            return [{"id": "v1", "title": f"Tour of {query}", "url": "https://example.com/v1", "view_count": 10}]
+
+        def fetch_video(self, video_id, **kwargs):
+            return {"id": video_id, "title": "Tour of Boston", "url": "https://example.com/v1"}
+
+    task = {"transaction_id": "tid", "step_number": 1, "location_name": "Boston", "address": "Boston, MA"}
+    agent = VideoAgent(config={"retry_attempts": 1, "use_geosearch": False}, client=_Client())
+    results = [agent.run(task)]
+    decision = JudgeAgent({"llm_scoring": {"enabled": False}}, get_logger("judge")).evaluate(task, results)
+    assert isinstance(decision["timestamp"], str)
+
+    metrics = _Metrics()
+    validator = Validator(metrics=metrics, strict=True)
+    assert validator.validate_agent_results(results) == results
+    validator.validate_judge_decision(decision)
+    assert metrics.counters.get("validator.violations", 0) == 0